@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Compares building /v1/postcode/{postcode}/feed with build_postcode_feed() against the per-row lookups
+and postcode_distances table it replaced, on a synthetic database with busy postcodes. --latency-ms adds a delay to every
+contributions read to stand in for a DynamoDB round trip.
+
+    uv run python benchmarks/feed.py --latency-ms 5
+"""
+import argparse
+import math
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_interface import SQLiteDatabase
+from models import PostcodeFeedResponse, ParkingSubmission, SaferSuburb, CurrentLocation, ParkingFacility
+from routes.postcodes import build_postcode_feed
+from spatial_index import PostcodeSpatialIndex, EARTH_RADIUS_METERS
+
+CREATE_TABLES = Path(__file__).resolve().parents[2] / "data" / "create_tables.sql"
+# postcode_distances is gone from the build, the old path still needs it
+CREATE_INDEXES = """
+    CREATE TABLE postcode_distances (primary_postcode TEXT, secondary_postcode TEXT, distance_meters REAL);
+    CREATE INDEX idx_postcode_risk_postcode ON postcode_risk(postcode);
+    CREATE INDEX idx_postcode_distances_primary ON postcode_distances(primary_postcode, distance_meters);
+"""
+
+
+class SimulatedLatencyDatabase(SQLiteDatabase):
+    def __init__(self, *args, latency: float = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latency = latency
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_parking_by_postcode(self, postcode):
+        self._round_trip()
+        return super().get_parking_by_postcode(postcode)
+
+    def get_facilities_for_parking(self, parking_id):
+        self._round_trip()
+        return super().get_facilities_for_parking(parking_id)
+
+    def get_facilities_for_parkings(self, parkings):
+        self._round_trip()
+        return super().get_facilities_for_parkings(parkings)
+
+    def get_parking_counts(self, postcodes):
+        self._round_trip()
+        return super().get_parking_counts(postcodes)
+
+
+def haversine(a, b):
+    lat1, long1, lat2, long2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((long2 - long1) / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(h))
+
+
+def build_database(path: Path, postcodes: int, submissions: int, seed: int):
+    rng = random.Random(seed)
+    codes = [str(3000 + i) for i in range(postcodes)]
+    # Scattered over roughly the area of Victoria
+    coordinates = {code: (rng.uniform(-39, -34), rng.uniform(141, 150)) for code in codes}
+    with sqlite3.connect(path) as conn:
+        conn.executescript(CREATE_TABLES.read_text())
+        conn.executescript(CREATE_INDEXES)
+        conn.executemany(
+            "INSERT INTO postcode_risk (postcode, locality, local_government_area, postcode_risk, lat, long) VALUES (?, ?, ?, ?, ?, ?)",
+            [(code, f"SUBURB {code}", f"LGA {int(code) % 40}", rng.random(), *coordinates[code]) for code in codes]
+        )
+        # Every pair, like the table the ETL used to build
+        conn.executemany(
+            "INSERT INTO postcode_distances (primary_postcode, secondary_postcode, distance_meters) VALUES (?, ?, ?)",
+            [
+                (code, other, haversine(coordinates[code], coordinates[other]))
+                for code in codes
+                for other in codes
+                if other != code
+            ]
+        )
+        for code in codes:
+            for n in range(rng.randint(0, submissions)):
+                cursor = conn.execute("""
+                    INSERT INTO user_contribution (address, suburb, postcode, type, lighting, cctv)
+                    VALUES (?, ?, ?, 'secure', ?, ?)
+                """, (f"{n} MAIN STREET", f"SUBURB {code}", code, rng.randint(1, 4), rng.random() < 0.5))
+                conn.executemany(
+                    "INSERT INTO user_contribution_facilities (parking_id, facility_id) VALUES (?, ?)",
+                    [(cursor.lastrowid, fid) for fid in rng.sample(range(1, 7), rng.randint(0, 3))]
+                )
+    return codes
+
+
+def per_row_feed(db, postcode):
+    """The feed as it used to be assembled, one read per submission and per nearby suburb"""
+    target = db.fetch_all("""
+        SELECT postcode, locality AS suburb, postcode_risk AS risk_score
+        FROM postcode_risk
+        WHERE postcode = :postcode
+        LIMIT 1
+    """, {"postcode": postcode})
+    if not target:
+        return None
+    risk_score = target[0]["risk_score"]
+
+    submissions = db.get_parking_by_postcode(postcode)
+    for submission in submissions:
+        submission["facilities"] = db.get_facilities_for_parking(submission["parking_id"])
+
+    max_risk = 0.5 if risk_score > 0.5 else 0.2 if risk_score > 0.2 else risk_score
+    nearest = db.fetch_all("""
+        SELECT pd.secondary_postcode as postcode, pr.locality as suburb, pr.local_government_area as lga,
+               pd.distance_meters as distance_in_meters, pr.postcode_risk as risk_score
+        FROM postcode_distances pd
+        JOIN postcode_risk pr ON pd.secondary_postcode = pr.postcode
+        WHERE pd.primary_postcode = :postcode AND pr.postcode_risk < :max_risk
+        ORDER BY pd.distance_meters ASC
+        LIMIT 20
+    """, {"postcode": postcode, "max_risk": max_risk})
+    for suburb in nearest:
+        suburb["parking_count"] = len(db.get_parking_by_postcode(suburb["postcode"]))
+
+    return PostcodeFeedResponse(
+        current=CurrentLocation(postcode=postcode, suburb=target[0]["suburb"], risk_score=risk_score),
+        parking_submissions=[
+            ParkingSubmission(
+                **{k: v for k, v in s.items() if k != "facilities"},
+                facilities=[ParkingFacility(**f) for f in s["facilities"]]
+            )
+            for s in submissions
+        ],
+        nearest_safer_suburbs=[SaferSuburb(**suburb) for suburb in nearest]
+    )
+
+
+def timed(fn, postcodes):
+    samples = []
+    for postcode in postcodes:
+        start = time.perf_counter()
+        fn(postcode)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p99": samples[int(len(samples) * 0.99)]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--postcodes", type=int, default=700)
+    parser.add_argument("--submissions", type=int, default=40, help="Most contributions in one postcode")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Simulated round trip per contributions read")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "feed.db"
+        codes = build_database(path, args.postcodes, args.submissions, args.seed)
+        db = SimulatedLatencyDatabase(str(path), latency=args.latency_ms / 1000)
+        spatial_index = PostcodeSpatialIndex.load(db)
+
+        rng = random.Random(args.seed)
+        postcodes = [rng.choice(codes) for _ in range(args.requests)]
+
+        # Both must produce the same feed, only counts differ where the old one was capped at 20
+        for postcode in postcodes[:50]:
+            before, after = per_row_feed(db, postcode), build_postcode_feed(db, spatial_index, postcode)
+            assert before.parking_submissions == after.parking_submissions
+            assert [s.postcode for s in before.nearest_safer_suburbs] == [s.postcode for s in after.nearest_safer_suburbs]
+
+        print(f"{args.requests} feeds over {args.postcodes} postcodes, {args.latency_ms}ms per contributions read\n")
+        results = {
+            "before": timed(lambda p: per_row_feed(db, p), postcodes),
+            "after": timed(lambda p: build_postcode_feed(db, spatial_index, p), postcodes),
+        }
+
+        print(f"{'':<8}{'mean ms':>12}{'p50 ms':>12}{'p99 ms':>12}")
+        for name, result in results.items():
+            print(f"{name:<8}{result['mean']:>12.2f}{result['p50']:>12.2f}{result['p99']:>12.2f}")
+        db.pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
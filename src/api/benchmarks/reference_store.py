@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Compares answering the reference routes (risk rankings, LGA rollups, risk compare, models) from
+ReferenceStore against the SQL they used to run on every request, on a built hotspot.db. risk_top_deep
+is a page thousands of rows in, by OFFSET in SQL and by cursor from the store. Also prints how much
+memory the store holds.
+
+    uv run python benchmarks/reference_store.py --db ../data/hotspot.db
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_interface import SQLiteDatabase
+from reference_store import ReferenceStore
+
+SEARCHES = [None, None, "mel", "north", "3", "yarra", "park"]
+POSTCODE_SORTS = {"postcode": "postcode", "suburb": "locality", "lga": "local_government_area", "risk_score": "postcode_risk"}
+LGA_SORTS = {"lga": "lga", "postcode_count": "postcode_count", "avg_risk": "avg_risk"}
+MODEL_SORTS = {"model_risk": "model_risk", "total": "total", "brand": "brand", "model": "model"}
+
+
+def sql_top_postcodes(db, search, column, descending, offset, limit):
+    where = "WHERE postcode LIKE :search OR locality LIKE :search OR local_government_area LIKE :search" if search else ""
+    params = {"search": f"%{search}%", "limit": limit, "offset": offset}
+    total = db.fetch_all(f"SELECT COUNT(*) as count FROM postcode_risk {where}", params)[0]["count"]
+    items = db.fetch_all(f"""
+        SELECT postcode, locality AS suburb, local_government_area AS lga, postcode_risk AS risk_score
+        FROM postcode_risk {where}
+        ORDER BY {POSTCODE_SORTS[column]} {"DESC" if descending else "ASC"}
+        LIMIT :limit OFFSET :offset
+    """, params)
+    return items, total
+
+
+def sql_lga_rollups(db, search, column, descending):
+    where = "WHERE local_government_area LIKE '%' || :q || '%'" if search else ""
+    return db.fetch_all(f"""
+        SELECT local_government_area AS lga, COUNT(*) AS postcode_count, ROUND(AVG(postcode_risk), 6) AS avg_risk,
+               MIN(postcode_risk) AS min_risk, MAX(postcode_risk) AS max_risk
+        FROM postcode_risk {where}
+        GROUP BY local_government_area
+        ORDER BY {LGA_SORTS[column]} {"DESC" if descending else "ASC"}
+    """, {"q": search})
+
+
+def sql_compare(db, postcode):
+    base = db.fetch_all("""
+        SELECT postcode, locality AS suburb, local_government_area AS lga, motorcycle_theft_rate, postcode_risk AS risk_score
+        FROM postcode_risk WHERE postcode = :pc LIMIT 1
+    """, {"pc": postcode})
+    defaults = db.fetch_all("SELECT * FROM default_risk LIMIT 1")
+    return base, defaults
+
+
+def sql_list_models(db, brand, column, descending, offset, limit):
+    where = "AND brand LIKE '%' || :brand || '%'" if brand else ""
+    return db.fetch_all(f"""
+        SELECT brand, model, total, percentage, model_risk FROM model_risk
+        WHERE total >= 0 {where}
+        ORDER BY {MODEL_SORTS[column]} {"DESC" if descending else "ASC"}
+        LIMIT :limit OFFSET :offset
+    """, {"brand": brand, "limit": limit, "offset": offset})
+
+
+def workloads(db, store, rng, requests):
+    postcodes = [row["postcode"] for row in db.fetch_all("SELECT postcode FROM postcode_risk")]
+    cases = {name: [] for name in ("risk_top", "risk_top_deep", "lga_rollups", "risk_compare", "list_models")}
+    for _ in range(requests):
+        search, descending = rng.choice(SEARCHES), rng.random() < 0.5
+        column, offset = rng.choice(list(POSTCODE_SORTS)), rng.choice([0, 20, 200])
+        cases["risk_top"].append((
+            lambda s=search, c=column, d=descending, o=offset: sql_top_postcodes(db, s, c, d, o, 20),
+            lambda s=search, c=column, d=descending, o=offset: store.top_postcodes(s, c, d, offset=o, limit=20)
+        ))
+        # Deep into an unfiltered ranking, OFFSET against picking up from a cursor's (value, row id)
+        offset = rng.randrange(2000, 3400)
+        _, _, after = store.top_postcodes(None, column, descending, offset=offset - 1, limit=1)
+        cases["risk_top_deep"].append((
+            lambda c=column, d=descending, o=offset: sql_top_postcodes(db, None, c, d, o, 20),
+            lambda c=column, d=descending, a=after: store.top_postcodes(None, c, d, limit=20, after=a)
+        ))
+        column = rng.choice(list(LGA_SORTS))
+        cases["lga_rollups"].append((
+            lambda s=search, c=column, d=descending: sql_lga_rollups(db, s, c, d),
+            lambda s=search, c=column, d=descending: store.lga_rollups(s, c, d)
+        ))
+        postcode = rng.choice(postcodes)
+        cases["risk_compare"].append((
+            lambda p=postcode: sql_compare(db, p),
+            lambda p=postcode: (store.postcode(p), store.defaults)
+        ))
+        brand, column = rng.choice([None, "honda", "yamaha"]), rng.choice(list(MODEL_SORTS))
+        cases["list_models"].append((
+            lambda b=brand, c=column, d=descending: sql_list_models(db, b, c, d, 0, 100),
+            lambda b=brand, c=column, d=descending: store.list_models(b, None, 0, c, d, offset=0, limit=100)
+        ))
+    return cases
+
+
+def timed(calls):
+    samples = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p99": samples[int(len(samples) * 0.99)]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=str(Path(__file__).resolve().parents[2] / "data" / "hotspot.db"))
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    db = SQLiteDatabase(args.db)
+    start = time.perf_counter()
+    store = ReferenceStore.load(db)
+    print(f"Loaded {store.postcodes.size} postcodes and {store.models.size} models in {(time.perf_counter() - start) * 1000:.1f}ms")
+    for table, size in store.memory_usage().items():
+        print(f"  {table:<16}{size / 1024:>10.1f} KiB")
+
+    print(f"\n{args.requests} calls each\n")
+    print(f"{'':<26}{'mean ms':>12}{'p50 ms':>12}{'p99 ms':>12}")
+    for name, calls in workloads(db, store, random.Random(args.seed), args.requests).items():
+        for path, index in (("sql", 0), ("store", 1)):
+            result = timed([call[index] for call in calls])
+            print(f"{name + ' ' + path:<26}{result['mean']:>12.3f}{result['p50']:>12.3f}{result['p99']:>12.3f}")
+    db.pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Compares scoring random (postcode, brand, model) rows with RiskScorer against looking each row up
+one at a time in ReferenceStore, on a built hotspot.db. A share of the rows use postcodes and models
+that aren't in the reference tables, or no motorcycle at all, so the default_risk fallbacks are
+exercised too.
+
+    uv run python benchmarks/scoring.py --db ../data/hotspot.db --rows 1000000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_interface import SQLiteDatabase
+from reference_store import ReferenceStore, model_name_key
+from scoring import RiskScorer
+
+
+def rows(store, rng, count):
+    postcodes = sorted(set(store.postcodes.columns["postcode"])) + ["0000", "9998"]
+    bikes = list(zip(store.models.columns["brand"], store.models.columns["model"])) + [("Honda", "Nothing"), (None, None)]
+    picked = [rng.choice(bikes) for _ in range(count)]
+    return [rng.choice(postcodes) for _ in range(count)], [bike[0] for bike in picked], [bike[1] for bike in picked]
+
+
+def row_at_a_time(store, postcodes, brands, models):
+    """What scoring looks like without the vectorised path, one dict lookup per row"""
+    postcode_default = store.defaults["postcode_default_risk"]
+    model_default = store.defaults["model_default_risk"]
+    model_risk = {}
+    for brand, model, risk in zip(store.models.columns["brand"], store.models.columns["model"], store.models.columns["model_risk"]):
+        model_risk.setdefault(model_name_key(brand, model), risk)
+    combined = []
+    for postcode, brand, model in zip(postcodes, brands, models):
+        base = store.postcode(postcode.strip())
+        p = base["risk_score"] if base else postcode_default
+        m = model_risk.get(model_name_key(brand, model), model_default) if brand and model else 0.0
+        combined.append(1 - (1 - p) * (1 - m))
+    return combined
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=str(Path(__file__).resolve().parents[2] / "data" / "hotspot.db"))
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    db = SQLiteDatabase(args.db)
+    store = ReferenceStore.load(db)
+    db.pool.close_all()
+    start = time.perf_counter()
+    scorer = RiskScorer.from_store(store)
+    print(f"Built scorer in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    postcodes, brands, models = rows(store, random.Random(args.seed), args.rows)
+    print(f"\n{args.rows} rows\n")
+    print(f"{'':<16}{'seconds':>12}{'rows/s':>14}")
+    results = {}
+    for name, score in (("vectorised", lambda: scorer.score(postcodes, brands, models)["combined_risk"].tolist()),
+                        ("row at a time", lambda: row_at_a_time(store, postcodes, brands, models))):
+        start = time.perf_counter()
+        results[name] = score()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<16}{elapsed:>12.3f}{args.rows / elapsed:>14,.0f}")
+
+    worst = max(abs(a - b) for a, b in zip(*results.values()))
+    print(f"\nLargest difference between the two: {worst:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Compares /v1/search served from the in-memory SuburbSearchIndex with the SQL query it replaced.
+
+    SQLITE_DB_PATH=../data/hotspot.db uv run python benchmarks/search.py
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_interface import get_database
+from search_index import SuburbSearchIndex
+
+SQL = """
+    SELECT locality as suburb, postcode, local_government_area as lga, postcode_risk as risk_score
+    FROM postcode_risk
+    WHERE locality LIKE '%' || :q || '%' OR postcode LIKE '%' || :q || '%'
+    LIMIT 20
+"""
+
+
+def keystrokes(index: SuburbSearchIndex, count: int):
+    """Every prefix a user would type on the way to a locality, plus postcode prefixes"""
+    queries = []
+    for entry in index.entries[:count]:
+        suburb = entry["suburb"]
+        queries.extend(suburb[:n] for n in range(1, len(suburb) + 1))
+        queries.extend(entry["postcode"][:n] for n in range(1, 5))
+    return queries
+
+
+def timed(fn, queries):
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    samples.sort()
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p99": samples[int(len(samples) * 0.99)]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suburbs", type=int, default=200, help="Number of suburbs to type out")
+    args = parser.parse_args()
+
+    db = get_database()
+    start = time.perf_counter()
+    index = SuburbSearchIndex.load(db)
+    print(f"Built index over {len(index)} suburbs in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    queries = keystrokes(index, args.suburbs)
+    print(f"Running {len(queries)} queries\n")
+
+    results = {
+        "sqlite": timed(lambda q: db.fetch_all(SQL, {"q": q}), queries),
+        "index": timed(lambda q: index.search(q, limit=20), queries),
+    }
+
+    print(f"{'':<8}{'mean us':>12}{'p50 us':>12}{'p99 us':>12}")
+    for name, result in results.items():
+        print(f"{name:<8}{result['mean']:>12.1f}{result['p50']:>12.1f}{result['p99']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,618 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
+from functools import lru_cache, partial
 import os
+import re
 import sqlite3
+import string
+import sys
+import threading
+import time
 import uuid
+from pathlib import Path
+
+
+# Tables the API writes to. In read-only mode these live in a separate writable file so the
+# reference database can be opened immutable.
+WRITABLE_TABLES = ("user_contribution", "user_contribution_facilities", "user_contribution_counts")
+
+
+class SQLiteConnectionPool:
+    """
+    Keeps one SQLite connection per worker thread for the lifetime of the process.
+
+    FastAPI runs sync routes on a threadpool, so every query made while serving a request
+    reuses the same connection instead of paying for connect/close on each statement.
+
+    With read_only=True the reference database is opened with mode=ro&immutable=1, which skips
+    file locking and change detection entirely so every worker shares the OS page cache. Only
+    use it when nothing modifies the file while the process is running (hotspot.db is rebuilt
+    on each deploy). If writable_path is given, that file becomes the main database and the
+    reference database is attached to it as "reference"; unqualified table names resolve to
+    main first, so writes to WRITABLE_TABLES land in the writable file.
+    """
+    def __init__(
+        self,
+        db_path: str,
+        read_only: bool = False,
+        writable_path: Optional[str] = None,
+        mmap_size: int = 0,
+        cache_size_kb: int = 0
+    ):
+        self.db_path = db_path
+        self.read_only = read_only
+        self.writable_path = writable_path if read_only else None
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: Dict[threading.Thread, sqlite3.Connection] = {}
+        self._writable_prepared = False
+        self.connects = 0
+        self.reuses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections are only ever used by the thread that opened them, but close_all()
+        # runs from the main thread on shutdown.
+        if not self.read_only:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            schemas = ["main"]
+        else:
+            reference_uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro&immutable=1"
+            if self.writable_path:
+                conn = sqlite3.connect(Path(self.writable_path).resolve().as_uri(), uri=True, check_same_thread=False)
+                conn.execute("ATTACH DATABASE ? AS reference", (reference_uri,))
+                schemas = ["reference"]
+            else:
+                conn = sqlite3.connect(reference_uri, uri=True, check_same_thread=False)
+                schemas = ["main"]
+
+        for schema in schemas:
+            if self.mmap_size:
+                conn.execute(f"PRAGMA {schema}.mmap_size = {int(self.mmap_size)}")
+            if self.cache_size_kb:
+                # Negative values are interpreted by SQLite as KiB rather than pages
+                conn.execute(f"PRAGMA {schema}.cache_size = -{int(self.cache_size_kb)}")
+
+        conn.row_factory = sqlite3.Row
+        if self.writable_path:
+            self._prepare_writable(conn)
+        return conn
+
+    def _prepare_writable(self, conn: sqlite3.Connection):
+        """Creates WRITABLE_TABLES in the writable file using the schema from the reference build"""
+        with self._lock:
+            if self._writable_prepared:
+                return
+            existing = {row["name"] for row in conn.execute("SELECT name FROM main.sqlite_master")}
+            placeholders = ", ".join("?" for _ in WRITABLE_TABLES)
+            statements = conn.execute(f"""
+                SELECT name, sql FROM reference.sqlite_master
+                WHERE tbl_name IN ({placeholders}) AND sql IS NOT NULL
+                ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 ELSE 2 END
+            """, WRITABLE_TABLES).fetchall()
+            created = set()
+            for statement in statements:
+                if statement["name"] not in existing:
+                    conn.execute(statement["sql"])
+                    created.add(statement["name"])
+            # A writable file from before the counts table existed already has contributions to count
+            if "user_contribution_counts" in created:
+                conn.execute("""
+                    INSERT INTO main.user_contribution_counts (postcode, count)
+                    SELECT postcode, COUNT(*) FROM main.user_contribution GROUP BY postcode
+                """)
+            conn.commit()
+            self._writable_prepared = True
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            with self._lock:
+                self.reuses += 1
+            return conn
+
+        conn = self._connect()
+        self._local.conn = conn
+        with self._lock:
+            # Worker threads can be retired by the threadpool, close whatever they left behind
+            for thread in [t for t in self._connections if not t.is_alive()]:
+                self._connections.pop(thread).close()
+            self._connections[threading.current_thread()] = conn
+            self.connects += 1
+        return conn
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._connections),
+                "connects": self.connects,
+                "reuses": self.reuses
+            }
+
+    def close_all(self):
+        with self._lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+# The query cache is off unless QUERY_CACHE_ENTRIES is set, most reads are already answered from
+# memory loaded at startup
+QUERY_CACHE_MAX_BYTES = 32 * 1024 * 1024
+# How often a cache checks whether hotspot.db has been rebuilt underneath it
+BUILD_CHECK_INTERVAL = 30.0
+BUILD_ID_QUERY = "SELECT value FROM build_info WHERE key = 'build_id'"
+# Contributions change between requests, and build_info is how changes are noticed
+_UNCACHEABLE_TABLES = re.compile(
+    r"\b(" + "|".join(WRITABLE_TABLES + ("build_info",)) + r")\b", re.IGNORECASE
+)
+
+
+def _result_size(rows: List[Dict[str, Any]]) -> int:
+    """Rough bytes held by a result, the column names are shared between rows so aren't counted"""
+    return sys.getsizeof(rows) + sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+        for row in rows
+    )
+
+
+class QueryCache:
+    """
+    Process-wide LRU of fetch_all results for the reference tables, keyed on the whitespace
+    normalised SQL and its parameters. Bounded by both entries and (approximate) bytes, the least
+    recently used results are evicted first. Anything touching WRITABLE_TABLES is never cached.
+
+    hotspot.db is only replaced by a rebuild, so every check_interval seconds the build id is read
+    again and the cache is cleared if it changed. A database without a build id is treated as its
+    own build, so the cache still works but is only cleared by a restart.
+    """
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int = QUERY_CACHE_MAX_BYTES,
+        check_interval: float = BUILD_CHECK_INTERVAL
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Any, Tuple[List[Dict[str, Any]], int]]" = OrderedDict()
+        self._bytes = 0
+        self._build_id: Optional[str] = None
+        self._checked_at: Optional[float] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.bypasses = 0
+
+    def _key(self, query: str, params: Optional[Dict[str, Any]]):
+        normalised = " ".join(query.split())
+        if normalised.split(" ", 1)[0].upper() not in ("SELECT", "WITH") or _UNCACHEABLE_TABLES.search(normalised):
+            return None
+        key = (normalised, tuple(sorted((params or {}).items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _check_build(self, fetch_all):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            rows = fetch_all(BUILD_ID_QUERY)
+            build_id = rows[0]["value"] if rows else None
+        except sqlite3.Error:
+            build_id = None
+        with self._lock:
+            if build_id != self._build_id:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._bytes = 0
+                self._build_id = build_id
+
+    def fetch(self, fetch_all, query: str, params: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """fetch_all(query, params), answered from the cache when it can be"""
+        key = self._key(query, params)
+        if key is None:
+            with self._lock:
+                self.bypasses += 1
+            return fetch_all(query, params)
+
+        self._check_build(fetch_all)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if cached is not None:
+            # Callers are free to modify what they get back
+            return [dict(row) for row in cached[0]]
+
+        rows = fetch_all(query, params)
+        size = _result_size(rows)
+        if size > self.max_bytes:
+            return rows
+        stored = [dict(row) for row in rows]
+        with self._lock:
+            if key in self._entries:
+                return rows
+            self._entries[key] = (stored, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "bypasses": self.bypasses
+            }
+
+
+# The trigram tokenizer can only match queries of at least this many characters
+TRIGRAM_LENGTH = 3
+
+
+def _fts_phrase(text: str) -> str:
+    """Quotes user input as a single FTS5 phrase so punctuation and operators are matched literally"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _addresses_by_postcode(fetch_all, postcode: str, query: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Address autocomplete shared by both database implementations. Addresses are clustered by postcode
+    at build time, so the trigram index is only searched over the rowid range of the one postcode.
+
+    Matches that start a word (a street number or street name) rank first, then earlier matches.
+    FTS5's bm25 rank isn't used because it reads every posting list in the index to weigh the terms.
+    """
+    query = " ".join(query.split()) if query else None
+
+    if query and len(query) >= TRIGRAM_LENGTH:
+        return fetch_all("""
+            SELECT f.address, f.suburb, f.postcode
+            FROM victorian_addresses_postcodes p
+            JOIN victorian_addresses_fts f ON f.rowid BETWEEN p.first_rowid AND p.last_rowid
+            WHERE p.postcode = :postcode
+              AND victorian_addresses_fts MATCH :match
+            ORDER BY
+                instr(' ' || LOWER(f.address), ' ' || LOWER(:query)) = 0,
+                instr(LOWER(f.address), LOWER(:query)),
+                f.address
+            LIMIT 20
+        """, {"postcode": postcode, "query": query, "match": _fts_phrase(query)})
+    elif query:
+        return fetch_all("""
+            SELECT address, suburb, postcode
+            FROM victorian_addresses
+            WHERE postcode = :postcode
+              AND LOWER(address) LIKE '%' || LOWER(:query) || '%'
+            ORDER BY address
+            LIMIT 20
+        """, {"postcode": postcode, "query": query})
+    else:
+        return fetch_all("""
+            SELECT address, suburb, postcode
+            FROM victorian_addresses
+            WHERE postcode = :postcode
+            ORDER BY address
+            LIMIT 20
+        """, {"postcode": postcode})
+
+
+# Submissions are usually retried or repeated for the same handful of addresses
+VERIFIED_ADDRESS_CACHE_SIZE = 4096
+
+# SQLite's UPPER() only folds ASCII, match it exactly so keys line up with the ones built in create_indexes.sql
+_ASCII_UPPER = str.maketrans(string.ascii_lowercase, string.ascii_uppercase)
+
+
+def normalise_address_key(value: str) -> str:
+    """Upper cased, whitespace collapsed form of an address or suburb, as stored in address_key/suburb_key"""
+    value = " ".join(value.split())
+    # Nearly every address is ASCII already, where upper() gives the same answer far quicker than translate()
+    return value.upper() if value.isascii() else value.translate(_ASCII_UPPER)
+
+
+def _verify_address(fetch_all, address_key: str, suburb_key: str, postcode: str) -> Optional[Dict[str, Any]]:
+    results = fetch_all("""
+        SELECT address, suburb, postcode
+        FROM victorian_addresses
+        WHERE postcode = :postcode
+          AND suburb_key = :suburb_key
+          AND address_key = :address_key
+        LIMIT 1
+    """, {
+        "address_key": address_key,
+        "suburb_key": suburb_key,
+        "postcode": postcode
+    })
+    return results[0] if results else None
+
+
+def _load_facilities(fetch_all) -> Dict[int, Dict[str, Any]]:
+    """The facilities catalogue only changes with a rebuild, so it's read once and kept in memory"""
+    return {
+        row["facility_id"]: row
+        for row in fetch_all("SELECT facility_id, facility_name FROM facilities ORDER BY facility_id")
+    }
+
+
+def _resolve_facilities(catalogue: Dict[int, Dict[str, Any]], facility_ids) -> List[Dict[str, Any]]:
+    return [dict(catalogue[fid]) for fid in sorted({int(fid) for fid in facility_ids}) if fid in catalogue]
+
+
+DEFAULT_CONTRIBUTIONS_TABLE = 'user_contributions_v2'
+
+
+def contribution_location_key(address: str, suburb: str) -> str:
+    """Sort key of a contribution within its postcode, there is one item per verified address"""
+    return f"{normalise_address_key(suburb)}#{normalise_address_key(address)}"
+
+
+def contributions_table_definition(table_name: str) -> Dict[str, Any]:
+    """
+    create_table() arguments for the DynamoDB table behind PersistentDatabase.
+
+    Items are keyed by postcode and contribution_location_key(), so the contribution for an address
+    is a get_item. created_at-index lists a postcode's most recent contributions and parking_id-index
+    finds a contribution by its id. The submission counter lives in the same table under
+    PersistentDatabase.COUNTER_KEY and has neither attribute, so it never shows up in either index.
+    """
+    return {
+        "TableName": table_name,
+        "KeySchema": [
+            {"AttributeName": "postcode", "KeyType": "HASH"},
+            {"AttributeName": "location_key", "KeyType": "RANGE"}
+        ],
+        "AttributeDefinitions": [
+            {"AttributeName": "postcode", "AttributeType": "S"},
+            {"AttributeName": "location_key", "AttributeType": "S"},
+            {"AttributeName": "created_at", "AttributeType": "S"},
+            {"AttributeName": "parking_id", "AttributeType": "N"}
+        ],
+        "LocalSecondaryIndexes": [{
+            "IndexName": "created_at-index",
+            "KeySchema": [
+                {"AttributeName": "postcode", "KeyType": "HASH"},
+                {"AttributeName": "created_at", "KeyType": "RANGE"}
+            ],
+            "Projection": {"ProjectionType": "ALL"}
+        }],
+        "GlobalSecondaryIndexes": [{
+            "IndexName": "parking_id-index",
+            "KeySchema": [{"AttributeName": "parking_id", "KeyType": "HASH"}],
+            "Projection": {"ProjectionType": "ALL"}
+        }],
+        "BillingMode": "PAY_PER_REQUEST"
+    }
+
+
+def insert_new_contribution(table, item: Dict[str, Any]) -> bool:
+    """
+    Puts a contribution item into the DynamoDB table only if its location is new, and adds one to the
+    postcode's count in the same transaction so the count can't drift from the items. False, with
+    nothing written, when the location already exists. Shared by the API and the bulk load scripts.
+    """
+    # The resource's client takes plain Python values, like the Table does
+    client = table.meta.client
+    try:
+        client.transact_write_items(TransactItems=[
+            {'Put': {
+                'TableName': table.name,
+                'Item': item,
+                'ConditionExpression': 'attribute_not_exists(location_key)'
+            }},
+            {'Update': {
+                'TableName': table.name,
+                'Key': {'postcode': item['postcode'], 'location_key': PersistentDatabase.COUNT_LOCATION_KEY},
+                'UpdateExpression': 'ADD #count :one',
+                'ExpressionAttributeNames': {'#count': 'count'},
+                'ExpressionAttributeValues': {':one': 1}
+            }}
+        ])
+    except client.exceptions.TransactionCanceledException as e:
+        reasons = e.response.get('CancellationReasons') or [{}]
+        if reasons[0].get('Code') == 'ConditionalCheckFailed':
+            return False
+        raise
+    return True
+
+
+PARKING_ID_BLOCK_SIZE = 100
+
+
+class ParkingIdAllocator:
+    """
+    Hands out parking ids from blocks leased off the DynamoDB counter item.
+
+    Incrementing the counter once per insert made it a hot key that every write in every process
+    queued on. Instead each process leases block_size ids with one atomic add and serves them
+    locally, so the counter only sees one write per block. Ids are increasing within a process but
+    interleave across processes, and the unused part of a block is lost on restart. Gaps are fine,
+    nothing relies on ids being dense.
+    """
+    def __init__(self, table, key: Dict[str, Any], block_size: int = PARKING_ID_BLOCK_SIZE):
+        self.table = table
+        self.key = key
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._limit = 0
+        self.leases = 0
+        self.allocated = 0
+        self.released = 0
+
+    def _lease(self):
+        response = self.table.update_item(
+            Key=self.key,
+            UpdateExpression='SET #counter = if_not_exists(#counter, :zero) + :block',
+            ExpressionAttributeNames={'#counter': 'counter'},
+            ExpressionAttributeValues={':zero': 0, ':block': self.block_size},
+            ReturnValues='UPDATED_NEW'
+        )
+        self._limit = int(response['Attributes']['counter']) + 1
+        self._next = self._limit - self.block_size
+        self.leases += 1
+
+    def allocate(self) -> int:
+        with self._lock:
+            if self._next >= self._limit:
+                self._lease()
+            parking_id = self._next
+            self._next += 1
+            self.allocated += 1
+            return parking_id
+
+    def release(self, parking_id: int):
+        """Gives back an id that ended up unused, only the latest one so ids stay monotonic"""
+        with self._lock:
+            if parking_id == self._next - 1:
+                self._next = parking_id
+                self.released += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "block_size": self.block_size,
+                "leases": self.leases,
+                "allocated": self.allocated,
+                "released": self.released,
+                "remaining": self._limit - self._next
+            }
+
+
+# Contributions for a postcode change rarely, a process serves its cached feed reads for this long.
+# Writes through the same process invalidate straight away, ones through other processes show up
+# within the TTL.
+CONTRIBUTION_CACHE_TTL = 30.0
+CONTRIBUTION_CACHE_SIZE = 1024
+
+
+class _Flight:
+    """One in progress load, that concurrent misses for the same key wait on"""
+    __slots__ = ("done", "items", "capacity", "error", "stale")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.items = None
+        self.capacity = 0.0
+        self.error = None
+        self.stale = False
+
+
+class ContributionCache:
+    """
+    Read-through cache of the recent contributions for each postcode, in front of DynamoDB.
+
+    Entries expire after ttl seconds and are dropped straight away by invalidate(). Concurrent misses
+    for the same postcode share a single query, the first one loads and the rest wait for it. A write
+    landing while a query is in flight marks it stale, so its possibly outdated result is handed to
+    whoever was already waiting but never stored. load() returns the items and the read capacity
+    units the query consumed, so every hit can be counted as the capacity it saved.
+    """
+    def __init__(self, ttl: float = CONTRIBUTION_CACHE_TTL, max_entries: int = CONTRIBUTION_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, List[Dict[str, Any]], float]]" = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.capacity_consumed = 0.0
+        self.capacity_saved = 0.0
+
+    def get(self, key: str, load) -> List[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.capacity_saved += entry[2]
+                return [dict(item) for item in entry[1]]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            with self._lock:
+                self.capacity_saved += flight.capacity
+            return [dict(item) for item in flight.items]
+
+        try:
+            items, capacity = load()
+        except Exception as error:
+            flight.error = error
+            raise
+        else:
+            flight.items, flight.capacity = items, capacity
+            with self._lock:
+                self.capacity_consumed += capacity
+                if not flight.stale:
+                    self._entries[key] = (time.monotonic() + self.ttl, items, capacity)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            return [dict(item) for item in items]
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+            flight = self._flights.pop(key, None)
+            if flight is not None:
+                flight.stale = True
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ttl": self.ttl,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "invalidations": self.invalidations,
+                "read_capacity_consumed": round(self.capacity_consumed, 2),
+                "read_capacity_saved": round(self.capacity_saved, 2)
+            }
 
 
 class DatabaseInterface(ABC):
@@ -43,71 +652,85 @@ class DatabaseInterface(ABC):
     def get_facilities_for_parking(self, parking_id: int) -> List[Dict[str, Any]]:
         pass
 
+    @abstractmethod
+    def get_facilities_for_parkings(self, parkings: List[Dict[str, Any]]) -> Dict[int, List[Dict[str, Any]]]:
+        """Facilities of every parking returned by get_parking_by_postcode, keyed by parking_id"""
+        pass
+
+    @abstractmethod
+    def get_parking_counts(self, postcodes: List[str]) -> Dict[str, int]:
+        """Number of contributions in each postcode, 0 for postcodes without any"""
+        pass
+
     @abstractmethod
     def get_parking_submissions_count(self) -> int:
         pass
 
+    def get_feed_contributions(self, postcode: str, nearby_postcodes: List[str]) -> Dict[str, Any]:
+        """
+        The contributions half of /v1/postcode/{postcode}/feed: the postcode's recent parking with
+        their facilities, and how many contributions each nearby postcode has. A fixed number of
+        batched reads however many submissions or suburbs there are.
+        """
+        parking = self.get_parking_by_postcode(postcode)
+        facilities = self.get_facilities_for_parkings(parking)
+        try:
+            counts = self.get_parking_counts(nearby_postcodes)
+        except Exception:
+            # The counts are a nice to have, don't fail the whole feed over them
+            counts = {}
+
+        return {
+            "parking_submissions": [
+                {**submission, "facilities": facilities.get(submission["parking_id"], [])}
+                for submission in parking
+            ],
+            "parking_counts": counts
+        }
+
 
 class SQLiteDatabase(DatabaseInterface):
-    def __init__(self, db_path: str):
-        import sqlite3
+    def __init__(self, db_path: str, pool: Optional[SQLiteConnectionPool] = None, query_cache: Optional[QueryCache] = None):
         self.db_path = db_path
+        self.pool = pool or SQLiteConnectionPool(db_path)
+        self.query_cache = query_cache
+        self._verified_addresses = lru_cache(maxsize=VERIFIED_ADDRESS_CACHE_SIZE)(partial(_verify_address, self.fetch_all))
+        self._facilities = lru_cache(maxsize=1)(partial(_load_facilities, self.fetch_all))
 
-    def fetch_all(self, query: str, params: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-        import sqlite3
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+    def _sqlite_fetch_all(self, query: str, params: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        cursor = self.pool.connection().cursor()
         try:
             cursor.execute(query, params or {})
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
         finally:
-            conn.close()
+            cursor.close()
+
+    def fetch_all(self, query: str, params: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        if self.query_cache is not None:
+            return self.query_cache.fetch(self._sqlite_fetch_all, query, params)
+        return self._sqlite_fetch_all(query, params)
 
     def execute(self, query: str, params: Dict[str, Any] = None) -> int:
-        import sqlite3
-        conn = sqlite3.connect(self.db_path)
+        conn = self.pool.connection()
         cursor = conn.cursor()
         try:
             cursor.execute(query, params or {})
             conn.commit()
             return cursor.lastrowid
+        except Exception:
+            # The connection outlives this call, don't leave a half finished transaction on it
+            conn.rollback()
+            raise
         finally:
-            conn.close()
+            cursor.close()
 
     def get_addresses_by_postcode(self, postcode: str, query: Optional[str] = None) -> List[Dict[str, Any]]:
-        if query:
-            return self.fetch_all("""
-                SELECT address, suburb, postcode
-                FROM victorian_addresses
-                WHERE postcode = :postcode
-                  AND LOWER(address) LIKE '%' || LOWER(:query) || '%'
-                ORDER BY address
-                LIMIT 20
-            """, {"postcode": postcode, "query": query})
-        else:
-            return self.fetch_all("""
-                SELECT address, suburb, postcode
-                FROM victorian_addresses
-                WHERE postcode = :postcode
-                ORDER BY address
-                LIMIT 20
-            """, {"postcode": postcode})
+        return _addresses_by_postcode(self.fetch_all, postcode, query)
 
     def verify_address(self, address: str, suburb: str, postcode: str) -> Optional[Dict[str, Any]]:
-        results = self.fetch_all("""
-            SELECT address, suburb, postcode
-            FROM victorian_addresses
-            WHERE UPPER(address) = UPPER(:address)
-              AND UPPER(suburb) = UPPER(:suburb)
-              AND postcode = :postcode
-        """, {
-            "address": address,
-            "suburb": suburb,
-            "postcode": postcode
-        })
-        return results[0] if results else None
+        result = self._verified_addresses(normalise_address_key(address), normalise_address_key(suburb), postcode)
+        return dict(result) if result else None
 
     def insert_parking_contribution(self, data: Dict[str, Any]) -> int:
         return self.execute("""
@@ -116,64 +739,70 @@ class SQLiteDatabase(DatabaseInterface):
         """, data)
 
     def upsert_parking_contribution(self, data: Dict[str, Any], facilities: List[int] = None) -> Dict[str, Any]:
-        facilities = facilities or []
-
-        existing = self.fetch_all("""
-            SELECT parking_id, type, lighting, cctv
-            FROM user_contribution
-            WHERE address = :address AND suburb = :suburb AND postcode = :postcode
-        """, {
+        """
+        Inserts or updates the contribution for an address in one transaction.
+
+        The upsert only touches the row when something changed, so no row coming back means no_change.
+        Whether the address already had a row is looked up first, under the same write lock, so an
+        insert is told apart from an update without anything left over on the pooled connection.
+        """
+        facilities = sorted(set(facilities or []))
+        params = {
             "address": data["address"],
             "suburb": data["suburb"],
-            "postcode": data["postcode"]
-        })
-
-        if not existing:
-            parking_id = self.insert_parking_contribution(data)
-
-            for facility_id in facilities:
-                self.insert_parking_facility(parking_id, facility_id)
-
-            return {"parking_id": parking_id, "action": "inserted"}
+            "postcode": data["postcode"],
+            "type": data["type"],
+            "lighting": data.get("lighting"),
+            "cctv": data.get("cctv")
+        }
 
-        existing_record = existing[0]
-        parking_id = existing_record["parking_id"]
+        conn = self.pool.connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            existing = cursor.execute("""
+                SELECT parking_id
+                FROM user_contribution
+                WHERE address = :address AND suburb = :suburb AND postcode = :postcode
+            """, params).fetchone()
+
+            row = cursor.execute("""
+                INSERT INTO user_contribution (address, suburb, postcode, type, lighting, cctv)
+                VALUES (:address, :suburb, :postcode, :type, :lighting, :cctv)
+                ON CONFLICT (address, suburb, postcode) DO UPDATE
+                SET type = excluded.type, lighting = excluded.lighting, cctv = excluded.cctv, created_at = CURRENT_TIMESTAMP
+                WHERE type IS NOT excluded.type OR lighting IS NOT excluded.lighting OR cctv IS NOT excluded.cctv
+                RETURNING parking_id
+            """, params).fetchone()
+
+            if existing is None:
+                parking_id, action = row[0], "inserted"
+            elif row is None:
+                parking_id, action = existing[0], "no_change"
+            else:
+                parking_id, action = row[0], "updated"
+
+            placeholders = ", ".join("?" for _ in facilities)
+            cursor.execute(f"""
+                DELETE FROM user_contribution_facilities
+                WHERE parking_id = ? AND facility_id NOT IN ({placeholders})
+            """, [parking_id, *facilities])
+            facilities_changed = cursor.rowcount > 0
+            cursor.executemany("""
+                INSERT OR IGNORE INTO user_contribution_facilities (parking_id, facility_id)
+                VALUES (?, ?)
+            """, [(parking_id, facility_id) for facility_id in facilities])
+            facilities_changed = facilities_changed or cursor.rowcount > 0
 
-        needs_update = (
-            existing_record["type"] != data["type"] or
-            existing_record["lighting"] != data.get("lighting") or
-            existing_record["cctv"] != data.get("cctv")
-        )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
 
-        existing_facilities = self.get_facilities_for_parking(parking_id)
-        existing_facility_ids = {f["facility_id"] for f in existing_facilities}
-        new_facility_ids = set(facilities)
-
-        facilities_changed = existing_facility_ids != new_facility_ids
-
-        if needs_update:
-            self.execute("""
-                UPDATE user_contribution
-                SET type = :type, lighting = :lighting, cctv = :cctv, created_at = CURRENT_TIMESTAMP
-                WHERE parking_id = :parking_id
-            """, {
-                **data,
-                "parking_id": parking_id
-            })
+        if action == "no_change" and facilities_changed:
             action = "updated"
-        else:
-            action = "no_change"
-
-        if facilities_changed:
-            self.execute("""
-                DELETE FROM user_contribution_facilities WHERE parking_id = :parking_id
-            """, {"parking_id": parking_id})
-
-            for facility_id in facilities:
-                self.insert_parking_facility(parking_id, facility_id)
-
-            if action == "no_change":
-                action = "updated"
 
         return {"parking_id": parking_id, "action": action}
 
@@ -203,10 +832,44 @@ class SQLiteDatabase(DatabaseInterface):
             WHERE ucf.parking_id = :parking_id
         """, {"parking_id": parking_id})
 
+    def get_facilities_for_parkings(self, parkings: List[Dict[str, Any]]) -> Dict[int, List[Dict[str, Any]]]:
+        parking_ids = [parking["parking_id"] for parking in parkings]
+        if not parking_ids:
+            return {}
+
+        params = {f"p{i}": parking_id for i, parking_id in enumerate(parking_ids)}
+        rows = self.fetch_all(f"""
+            SELECT parking_id, facility_id
+            FROM user_contribution_facilities
+            WHERE parking_id IN ({", ".join(f":{name}" for name in params)})
+        """, params)
+
+        facility_ids = {parking_id: [] for parking_id in parking_ids}
+        for row in rows:
+            facility_ids[row["parking_id"]].append(row["facility_id"])
+
+        catalogue = self._facilities()
+        return {parking_id: _resolve_facilities(catalogue, ids) for parking_id, ids in facility_ids.items()}
+
+    def get_parking_counts(self, postcodes: List[str]) -> Dict[str, int]:
+        counts = {postcode: 0 for postcode in postcodes}
+        if not counts:
+            return counts
+
+        params = {f"p{i}": postcode for i, postcode in enumerate(counts)}
+        rows = self.fetch_all(f"""
+            SELECT postcode, count
+            FROM user_contribution_counts
+            WHERE postcode IN ({", ".join(f":{name}" for name in params)})
+        """, params)
+        for row in rows:
+            counts[row["postcode"]] = row["count"]
+        return counts
+
     def get_parking_submissions_count(self) -> int:
         result = self.fetch_all("""
-            SELECT COUNT(*) as count
-            FROM user_contribution
+            SELECT COALESCE(SUM(count), 0) as count
+            FROM user_contribution_counts
         """)
         return result[0]['count'] if result else 0
 
@@ -214,95 +877,102 @@ class SQLiteDatabase(DatabaseInterface):
 class PersistentDatabase(DatabaseInterface):
     """
     Production database that uses DynamoDB for user_contributions and SQLite for addresses/facilities. The latter is rebuilt after every deployment.
+
+    See contributions_table_definition() for the DynamoDB table layout, every request path is a get_item or query.
     """
-    def __init__(self, db_path: str = None, table_name: str = None, region: str = None):
+    COUNTER_KEY = {'postcode': 'COUNTER', 'location_key': 'COUNTER'}
+    # Sort key of the per-postcode contribution count, real location keys always contain a '#'
+    COUNT_LOCATION_KEY = 'COUNT'
+    BATCH_GET_LIMIT = 100
+    RECENT_INDEX = 'created_at-index'
+    PARKING_ID_INDEX = 'parking_id-index'
+
+    def __init__(
+        self,
+        db_path: str = None,
+        table_name: str = None,
+        region: str = None,
+        pool: Optional[SQLiteConnectionPool] = None,
+        query_cache: Optional[QueryCache] = None
+    ):
         import boto3
 
         self.db_path = db_path or os.environ.get('SQLITE_DB_PATH', '../data/hotspot.db')
+        self.pool = pool or SQLiteConnectionPool(self.db_path)
+        self.query_cache = query_cache
+        self._verified_addresses = lru_cache(maxsize=VERIFIED_ADDRESS_CACHE_SIZE)(partial(_verify_address, self._sqlite_fetch_all))
+        self._facilities = lru_cache(maxsize=1)(partial(_load_facilities, self._sqlite_fetch_all))
 
         self.region = region or os.environ.get('AWS_DEFAULT_REGION', 'ap-southeast-2')
-        self.table_name = table_name or os.environ.get('DYNAMODB_TABLE', 'user_contributions')
+        self.table_name = table_name or os.environ.get('DYNAMODB_TABLE', DEFAULT_CONTRIBUTIONS_TABLE)
 
         self.dynamodb = boto3.resource('dynamodb', region_name=self.region)
         self.table = self.dynamodb.Table(self.table_name)
+        self.ids = ParkingIdAllocator(
+            self.table, self.COUNTER_KEY, int(os.environ.get('PARKING_ID_BLOCK_SIZE', PARKING_ID_BLOCK_SIZE))
+        )
+        # A TTL of 0 turns the cache off and every feed view queries DynamoDB
+        ttl = float(os.environ.get('CONTRIBUTION_CACHE_TTL', CONTRIBUTION_CACHE_TTL))
+        self.contribution_cache = ContributionCache(ttl) if ttl > 0 else None
 
     def _sqlite_fetch_all(self, query: str, params: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        cursor = self.pool.connection().cursor()
         try:
             cursor.execute(query, params or {})
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
         finally:
-            conn.close()
+            cursor.close()
 
     def _sqlite_execute(self, query: str, params: Dict[str, Any] = None) -> int:
-        conn = sqlite3.connect(self.db_path)
+        conn = self.pool.connection()
         cursor = conn.cursor()
         try:
             cursor.execute(query, params or {})
             conn.commit()
             return cursor.lastrowid
+        except Exception:
+            conn.rollback()
+            raise
         finally:
-            conn.close()
+            cursor.close()
 
     def fetch_all(self, query: str, params: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        if self.query_cache is not None:
+            return self.query_cache.fetch(self._sqlite_fetch_all, query, params)
         return self._sqlite_fetch_all(query, params)
 
     def execute(self, query: str, params: Dict[str, Any] = None) -> int:
         return self._sqlite_execute(query, params)
 
     def get_addresses_by_postcode(self, postcode: str, query: Optional[str] = None) -> List[Dict[str, Any]]:
-        if query:
-            return self._sqlite_fetch_all("""
-                SELECT address, suburb, postcode
-                FROM victorian_addresses
-                WHERE postcode = :postcode
-                  AND LOWER(address) LIKE '%' || LOWER(:query) || '%'
-                ORDER BY address
-                LIMIT 20
-            """, {"postcode": postcode, "query": query})
-        else:
-            return self._sqlite_fetch_all("""
-                SELECT address, suburb, postcode
-                FROM victorian_addresses
-                WHERE postcode = :postcode
-                ORDER BY address
-                LIMIT 20
-            """, {"postcode": postcode})
+        return _addresses_by_postcode(self._sqlite_fetch_all, postcode, query)
 
     def verify_address(self, address: str, suburb: str, postcode: str) -> Optional[Dict[str, Any]]:
-        results = self._sqlite_fetch_all("""
-            SELECT address, suburb, postcode
-            FROM victorian_addresses
-            WHERE UPPER(address) = UPPER(:address)
-              AND UPPER(suburb) = UPPER(:suburb)
-              AND postcode = :postcode
-        """, {
-            "address": address,
-            "suburb": suburb,
-            "postcode": postcode
-        })
-        return results[0] if results else None
+        result = self._verified_addresses(normalise_address_key(address), normalise_address_key(suburb), postcode)
+        return dict(result) if result else None
 
-    def insert_parking_contribution(self, data: Dict[str, Any]) -> int:
-        from datetime import datetime
+    def _location(self, data: Dict[str, Any]) -> Dict[str, str]:
+        return {
+            'postcode': data['postcode'],
+            'location_key': contribution_location_key(data['address'], data['suburb'])
+        }
 
-        # Matches the sqllite implementation by auto-incrementing the ID
-        counter_response = self.table.update_item(
-            Key={'postcode': 'COUNTER', 'parking_id': 0},
-            UpdateExpression='SET #counter = if_not_exists(#counter, :zero) + :inc',
-            ExpressionAttributeNames={'#counter': 'counter'},
-            ExpressionAttributeValues={':zero': 0, ':inc': 1},
-            ReturnValues='UPDATED_NEW'
-        )
+    def _find_by_parking_id(self, parking_id: int) -> Optional[Dict[str, Any]]:
+        from boto3.dynamodb.conditions import Key
 
-        parking_id = int(counter_response['Attributes']['counter'])
+        response = self.table.query(
+            IndexName=self.PARKING_ID_INDEX,
+            KeyConditionExpression=Key('parking_id').eq(parking_id),
+            Limit=1
+        )
+        items = response.get('Items', [])
+        return items[0] if items else None
 
+    def _contribution_item(self, data: Dict[str, Any], parking_id: int, facilities: List[int] = None) -> Dict[str, Any]:
         item = {
+            **self._location(data),
             'parking_id': parking_id,
-            'postcode': data['postcode'],
             'address': data['address'],
             'suburb': data['suburb'],
             'type': data['type'],
@@ -313,119 +983,155 @@ class PersistentDatabase(DatabaseInterface):
             item['lighting'] = data['lighting']
         if data.get('cctv') is not None:
             item['cctv'] = data['cctv']
+        if facilities:
+            item['facility_ids'] = facilities
 
+        return item
 
-        self.table.put_item(Item=item)
-
+    def insert_parking_contribution(self, data: Dict[str, Any], facilities: List[int] = None) -> int:
+        """
+        Writes a contribution for an address that doesn't have one yet, together with its postcode's
+        count. Raises ValueError, and writes nothing, when the address already has one.
+        """
+        parking_id = self.ids.allocate()
+        try:
+            inserted = insert_new_contribution(self.table, self._contribution_item(data, parking_id, facilities))
+        except Exception:
+            self.ids.release(parking_id)
+            raise
+        if not inserted:
+            self.ids.release(parking_id)
+            raise ValueError(f"{data['address']}, {data['suburb']} already has a contribution, upsert it instead")
+        self._invalidate(data['postcode'])
         return parking_id
 
-    def upsert_parking_contribution(self, data: Dict[str, Any], facilities: List[int] = None) -> Dict[str, Any]:
-        from boto3.dynamodb.conditions import Attr
-        facilities = facilities or []
-
-        response = self.table.scan(
-            FilterExpression=Attr('address').eq(data['address']) &
-                           Attr('suburb').eq(data['suburb']) &
-                           Attr('postcode').eq(data['postcode'])
-        )
-
-        if not response['Items']:
-            parking_id = self.insert_parking_contribution(data)
-
-            if facilities:
-                self.table.update_item(
-                    Key={
-                        'postcode': data['postcode'],
-                        'parking_id': parking_id
-                    },
-                    UpdateExpression='SET facility_ids = :facilities',
-                    ExpressionAttributeValues={
-                        ':facilities': facilities
-                    }
-                )
-
-            return {"parking_id": parking_id, "action": "inserted"}
-
-        existing_item = response['Items'][0]
-        parking_id = int(existing_item['parking_id'])
-
-        needs_update = (
-            existing_item.get('type') != data['type'] or
-            existing_item.get('lighting') != data.get('lighting') or
-            existing_item.get('cctv') != data.get('cctv')
-        )
-
-        existing_facilities = set(existing_item.get('facility_ids', []))
-        new_facilities = set(facilities)
-        facilities_changed = existing_facilities != new_facilities
-
-        if needs_update or facilities_changed:
-            update_expression = 'SET #type = :type'
-            expression_attribute_names = {'#type': 'type'}
-            expression_attribute_values = {':type': data['type']}
-
-            if data.get('lighting') is not None:
-                update_expression += ', lighting = :lighting'
-                expression_attribute_values[':lighting'] = data['lighting']
-
-            if data.get('cctv') is not None:
-                update_expression += ', cctv = :cctv'
-                expression_attribute_values[':cctv'] = data['cctv']
-
-            if facilities_changed:
-                update_expression += ', facility_ids = :facilities'
-                expression_attribute_values[':facilities'] = facilities
-
-            update_expression += ', created_at = :created_at'
-            expression_attribute_values[':created_at'] = datetime.now().isoformat()
+    def _invalidate(self, postcode: str):
+        if self.contribution_cache is not None:
+            self.contribution_cache.invalidate(postcode)
+
+    @staticmethod
+    def _contribution_update(data: Dict[str, Any], parking_id: int, facilities: List[int]) -> Dict[str, Any]:
+        """
+        update_item() arguments that overwrite an existing contribution when it differs from the stored
+        one, new ones go through insert_new_contribution(). The item keeps its parking_id. Optional
+        attributes that are None are removed rather than left behind.
+        """
+        fields = {
+            'type': data['type'],
+            'lighting': data.get('lighting'),
+            'cctv': data.get('cctv'),
+            'facility_ids': facilities or None
+        }
+        names = {'#parking_id': 'parking_id', '#address': 'address', '#suburb': 'suburb', '#created_at': 'created_at'}
+        values = {
+            ':parking_id': parking_id,
+            ':address': data['address'],
+            ':suburb': data['suburb'],
+            ':created_at': datetime.now().isoformat()
+        }
+        assignments = [
+            '#parking_id = if_not_exists(#parking_id, :parking_id)',
+            '#address = :address',
+            '#suburb = :suburb',
+            '#created_at = :created_at'
+        ]
+        removals = []
+        changes = []
+
+        for i, (attribute, value) in enumerate(fields.items()):
+            name = f'#f{i}'
+            names[name] = attribute
+            if value is None:
+                removals.append(name)
+                changes.append(f'attribute_exists({name})')
+            else:
+                values[f':f{i}'] = value
+                assignments.append(f'{name} = :f{i}')
+                changes.append(f'(attribute_not_exists({name}) OR {name} <> :f{i})')
+
+        update_expression = 'SET ' + ', '.join(assignments)
+        if removals:
+            update_expression += ' REMOVE ' + ', '.join(removals)
+
+        return {
+            'UpdateExpression': update_expression,
+            'ConditionExpression': 'attribute_exists(location_key) AND (' + ' OR '.join(changes) + ')',
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values,
+            'ReturnValues': 'ALL_OLD',
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+        }
 
-            self.table.update_item(
-                Key={
-                    'postcode': data['postcode'],
-                    'parking_id': parking_id
-                },
-                UpdateExpression=update_expression,
-                ExpressionAttributeNames=expression_attribute_names,
-                ExpressionAttributeValues=expression_attribute_values
-            )
+    def upsert_parking_contribution(self, data: Dict[str, Any], facilities: List[int] = None) -> Dict[str, Any]:
+        """
+        Writes the contribution for an address, keyed by the verified address.
+
+        An existing address takes one conditional update_item that only passes when something
+        changed, so a failure with the old item back means no_change. A failure without one means
+        the address is new, and it's put together with its postcode's count in one transaction.
+        If another writer gets the address in first the transaction is cancelled and it's back to
+        the update. The id comes from the local block lease and is handed back unless it's used.
+        """
+        facilities = sorted(set(facilities or []))
+        parking_id = self.ids.allocate()
 
-            return {"parking_id": parking_id, "action": "updated"}
+        try:
+            while True:
+                try:
+                    response = self.table.update_item(
+                        Key=self._location(data), **self._contribution_update(data, parking_id, facilities)
+                    )
+                    break
+                except self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException as e:
+                    if 'Item' in e.response:
+                        self.ids.release(parking_id)
+                        return {"parking_id": int(e.response['Item']['parking_id']['N']), "action": "no_change"}
+                if insert_new_contribution(self.table, self._contribution_item(data, parking_id, facilities)):
+                    self._invalidate(data['postcode'])
+                    return {"parking_id": parking_id, "action": "inserted"}
+        except Exception:
+            self.ids.release(parking_id)
+            raise
 
-        return {"parking_id": parking_id, "action": "no_change"}
+        self._invalidate(data['postcode'])
+        self.ids.release(parking_id)
+        return {"parking_id": int(response['Attributes']['parking_id']), "action": "updated"}
 
     def insert_parking_facility(self, parking_id: int, facility_id: int):
-        from boto3.dynamodb.conditions import Key, Attr
-
-        response = self.table.scan(
-            FilterExpression=Attr('parking_id').eq(parking_id)
-        )
-
-        if response['Items']:
-            item = response['Items'][0]
-            postcode = item['postcode']
+        item = self._find_by_parking_id(parking_id)
 
+        if item:
             facilities = item.get('facility_ids', [])
             if facility_id not in facilities:
                 facilities.append(facility_id)
 
             self.table.update_item(
                 Key={
-                    'postcode': postcode,
-                    'parking_id': parking_id
+                    'postcode': item['postcode'],
+                    'location_key': item['location_key']
                 },
                 UpdateExpression='SET facility_ids = :facilities',
                 ExpressionAttributeValues={
                     ':facilities': facilities
                 }
             )
+            self._invalidate(item['postcode'])
 
     def get_parking_by_postcode(self, postcode: str) -> List[Dict[str, Any]]:
+        if self.contribution_cache is None:
+            return self._query_parking_by_postcode(postcode)[0]
+        return self.contribution_cache.get(postcode, partial(self._query_parking_by_postcode, postcode))
+
+    def _query_parking_by_postcode(self, postcode: str) -> Tuple[List[Dict[str, Any]], float]:
+        """The 20 most recent contributions in the postcode and the read capacity units it took"""
         from boto3.dynamodb.conditions import Key
 
         response = self.table.query(
+            IndexName=self.RECENT_INDEX,
             KeyConditionExpression=Key('postcode').eq(postcode),
             ScanIndexForward=False,
-            Limit=20
+            Limit=20,
+            ReturnConsumedCapacity='TOTAL'
         )
 
         items = response.get('Items', [])
@@ -435,68 +1141,91 @@ class PersistentDatabase(DatabaseInterface):
                 item['parking_id'] = int(item['parking_id'])
             if 'lighting' in item:
                 item['lighting'] = int(item['lighting'])
+            if 'facility_ids' in item:
+                item['facility_ids'] = [int(fid) for fid in item['facility_ids']]
 
         items.sort(key=lambda x: x.get('created_at', x.get('parking_id', 0)), reverse=True)
 
-        return items[:20]
+        return items[:20], float(response.get('ConsumedCapacity', {}).get('CapacityUnits', 0))
 
     def get_facilities_for_parking(self, parking_id: int) -> List[Dict[str, Any]]:
-        from boto3.dynamodb.conditions import Attr
+        item = self._find_by_parking_id(parking_id)
 
-        response = self.table.scan(
-            FilterExpression=Attr('parking_id').eq(parking_id)
-        )
-
-        if not response['Items']:
+        if not item:
             return []
 
-        item = response['Items'][0]
-        facility_ids = item.get('facility_ids', [])
+        return _resolve_facilities(self._facilities(), item.get('facility_ids', []))
 
-        if not facility_ids:
-            return []
+    def get_facilities_for_parkings(self, parkings: List[Dict[str, Any]]) -> Dict[int, List[Dict[str, Any]]]:
+        # The postcode query already returned facility_ids on every item, no need to go back to DynamoDB
+        catalogue = self._facilities()
+        return {
+            parking['parking_id']: _resolve_facilities(catalogue, parking.get('facility_ids', []))
+            for parking in parkings
+        }
 
-        facilities_list = []
-        for fid in facility_ids:
-            facilities = self._sqlite_fetch_all("""
-                SELECT facility_id, facility_name
-                FROM facilities
-                WHERE facility_id = :facility_id
-            """, {"facility_id": int(fid)})
+    def get_parking_counts(self, postcodes: List[str]) -> Dict[str, int]:
+        counts = {postcode: 0 for postcode in postcodes}
+        keys = [{'postcode': postcode, 'location_key': self.COUNT_LOCATION_KEY} for postcode in counts]
 
-            if facilities:
-                facilities_list.append(facilities[0])
+        for start in range(0, len(keys), self.BATCH_GET_LIMIT):
+            request = {self.table_name: {
+                'Keys': keys[start:start + self.BATCH_GET_LIMIT],
+                'ProjectionExpression': 'postcode, #count',
+                'ExpressionAttributeNames': {'#count': 'count'}
+            }}
+            while request:
+                response = self.dynamodb.batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(self.table_name, []):
+                    counts[item['postcode']] = int(item['count'])
+                request = response.get('UnprocessedKeys')
 
-        return facilities_list
+        return counts
 
     def get_parking_submissions_count(self) -> int:
-        try:
-            resp = self.table.get_item(
-                Key={"postcode": "COUNTER", "parking_id": 0},
-                ConsistentRead=True,
-                ProjectionExpression="#c",
-                ExpressionAttributeNames={"#c": "counter"}
-            )
-            counter = resp.get("Item", {}).get("counter")
-            if isinstance(counter, (int, float)):
-                return int(counter)
-        except Exception:
-            pass
+        # Contributions can only be made for known addresses, so summing the count of every address
+        # postcode covers them all
+        postcodes = self._sqlite_fetch_all("SELECT postcode FROM victorian_addresses_postcodes")
+        return sum(self.get_parking_counts([row['postcode'] for row in postcodes]).values())
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
 
-        try:
-            response = self.dynamodb.meta.client.describe_table(TableName=self.table_name)
-            return int(response.get("Table", {}).get("ItemCount", 0))
-        except Exception:
-            return 0
 
 def get_database() -> DatabaseInterface:
     """Factory function to get the appropriate database implementation based on environment"""
     env = os.environ.get('ENVIRONMENT', 'development')
-    from pathlib import Path
 
     db_path = os.environ.get('SQLITE_DB_PATH', '../data/hotspot.db')
     db_path = Path(db_path).resolve()
+
+    # Production never writes to SQLite so the reference data is opened immutable by default,
+    # development keeps the old read/write behaviour unless asked otherwise.
+    read_only = _env_flag('SQLITE_READ_ONLY', env == 'production')
+    pool_options = {}
+    if read_only:
+        pool_options = {
+            "read_only": True,
+            "mmap_size": int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+            "cache_size_kb": int(os.environ.get('SQLITE_CACHE_SIZE_KB', 16 * 1024))
+        }
+
+    # Opt in, sized from the hit and eviction counters logged on shutdown
+    query_cache = None
+    if int(os.environ.get('QUERY_CACHE_ENTRIES', 0)) > 0:
+        query_cache = QueryCache(
+            int(os.environ['QUERY_CACHE_ENTRIES']),
+            int(os.environ.get('QUERY_CACHE_MAX_BYTES', QUERY_CACHE_MAX_BYTES))
+        )
+
     if env == 'production':
-        return PersistentDatabase(str(db_path))
+        return PersistentDatabase(str(db_path), pool=SQLiteConnectionPool(str(db_path), **pool_options), query_cache=query_cache)
     else:
-        return SQLiteDatabase(str(db_path))
+        if read_only:
+            writable_path = os.environ.get('SQLITE_WRITABLE_DB_PATH', str(db_path.with_name('contributions.db')))
+            pool_options["writable_path"] = str(Path(writable_path).resolve())
+        return SQLiteDatabase(str(db_path), pool=SQLiteConnectionPool(str(db_path), **pool_options), query_cache=query_cache)
@@ -0,0 +1,79 @@
+import os
+import re
+import uuid
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from db_interface import BUILD_ID_QUERY, DatabaseInterface
+
+# Routes whose responses only depend on hotspot.db, so they can't change until it's rebuilt
+REFERENCE_PATHS = re.compile(
+    r"^/api/v1/(search|risk/top|risk/compare|lgas(/[^/]+/postcodes)?|models(/[^/]+/[^/]+)?|postcode/[0-9]{4}/thefts)$"
+)
+# Browsers and the front end may reuse a response this long without asking, then revalidate it
+# with If-None-Match, which is answered without touching the database
+DEFAULT_MAX_AGE = 3600
+STALE_WHILE_REVALIDATE = 86400
+# Set to the git sha of the image by the deploy workflow, so a code only deploy changes every ETag
+DEPLOY_ID_ENV = "IMAGE_TAG"
+
+
+def load_build_id(db: DatabaseInterface) -> Optional[str]:
+    """The content hash stamped into hotspot.db by src/data/stamp_build.sql, None if it wasn't built with it"""
+    try:
+        rows = db.fetch_all(BUILD_ID_QUERY)
+    except Exception:
+        return None
+    return rows[0]["value"] if rows else None
+
+
+def load_deploy_id() -> str:
+    """The deployed code's id from IMAGE_TAG, or a new one per process when it isn't set (development)"""
+    return os.environ.get(DEPLOY_ID_ENV) or f"dev-{uuid.uuid4().hex[:12]}"
+
+
+class ReferenceCacheMiddleware:
+    """
+    Strong ETags and Cache-Control for the reference data routes, versioned by the build id of
+    hotspot.db (read from app.state.build_id), the API version and the deploy id, so new data and
+    new code both change them. A matching If-None-Match is
+    answered with a 304 here, before the route or the database are involved. Does nothing until
+    the app has a build id.
+    """
+    def __init__(self, app: ASGIApp, version: str, deploy_id: str, max_age: int = DEFAULT_MAX_AGE):
+        self.app = app
+        self.version = version
+        self.deploy_id = deploy_id
+        self.cache_control = f"public, max-age={max_age}, stale-while-revalidate={STALE_WHILE_REVALIDATE}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not REFERENCE_PATHS.match(scope["path"]):
+            return await self.app(scope, receive, send)
+
+        build_id = getattr(scope["app"].state, "build_id", None)
+        if not build_id:
+            return await self.app(scope, receive, send)
+
+        etag = f'"{build_id}-{self.version}-{self.deploy_id}"'
+        if_none_match = Headers(scope=scope).get("if-none-match", "")
+        # Only the exact ETag, not "*": a 304 here can't know the route would have found the resource
+        if etag in (tag.strip() for tag in if_none_match.split(",")):
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", etag.encode()), (b"cache-control", self.cache_control.encode())]
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_validators(message: Message):
+            # Only successful responses are cacheable, errors and validation failures go out as they are
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = MutableHeaders(scope=message)
+                headers["ETag"] = etag
+                headers["Cache-Control"] = self.cache_control
+            await send(message)
+
+        await self.app(scope, receive, send_with_validators)
@@ -8,8 +8,15 @@ from pathlib import Path
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from db_interface import get_database
-from routes import health, search, bikes, stats, addresses, parking, contact, postcodes
+from db_interface import get_database, DEFAULT_CONTRIBUTIONS_TABLE
+from http_cache import ReferenceCacheMiddleware, load_build_id, load_deploy_id, DEFAULT_MAX_AGE
+from reference_store import ReferenceStore
+from scoring import RiskScorer
+from search_index import SuburbSearchIndex
+from singleflight import SingleFlight
+from spatial_index import PostcodeSpatialIndex
+from summary_refresher import SummaryRefresher, REFRESH_INTERVAL_SECONDS
+from routes import health, search, bikes, stats, addresses, parking, contact, postcodes, risk, lgas
 
 
 logging.basicConfig(
@@ -51,13 +58,37 @@ static_path = Path(args.static).resolve()
 async def lifespan(app: FastAPI):
     if env == 'production':
         logger.info(f"Connected to DynamoDB in {os.environ.get('AWS_DEFAULT_REGION', 'ap-southeast-2')} region")
-        logger.info(f"Using table: {os.environ.get('DYNAMODB_TABLE', 'user_contributions')}")
+        logger.info(f"Using table: {os.environ.get('DYNAMODB_TABLE', DEFAULT_CONTRIBUTIONS_TABLE)}")
     else:
         logger.info(f"Connected to SQLite database: {os.environ.get('SQLITE_DB_PATH')}")
     if static_path.exists():
         logger.info(f"Serving static files from: {static_path}")
+    app.state.build_id = load_build_id(app.state.db)
+    logger.info(f"hotspot.db build id: {app.state.build_id or 'not stamped, reference responses are not cached'}")
+    logger.info(f"Deploy id: {app.state.deploy_id}")
+    app.state.reference = ReferenceStore.load(app.state.db)
+    logger.info(
+        f"Loaded reference store with {app.state.reference.postcodes.size} postcodes and "
+        f"{app.state.reference.models.size} models, bytes held: {app.state.reference.memory_usage()}"
+    )
+    app.state.scorer = RiskScorer.from_store(app.state.reference)
+    app.state.search_index = SuburbSearchIndex.load(app.state.db)
+    logger.info(f"Loaded search index with {len(app.state.search_index)} suburbs")
+    app.state.spatial_index = PostcodeSpatialIndex.load(app.state.db)
+    logger.info(f"Loaded spatial index with {len(app.state.spatial_index)} suburbs")
+    app.state.singleflight = SingleFlight()
+    app.state.statistics = SummaryRefresher(
+        app.state.db, float(os.environ.get("STATISTICS_REFRESH_SECONDS", REFRESH_INTERVAL_SECONDS))
+    )
+    await app.state.statistics.start()
+    logger.info(f"Statistics summary: {app.state.statistics.summary}, refreshed every {app.state.statistics.interval}s")
     yield
     logger.info("Shutting down...")
+    await app.state.statistics.stop()
+    # The same counters GET /api/metrics serves while running
+    for name, values in health.runtime_stats(app.state).items():
+        logger.info(f"{name} stats: {values}")
+    db.pool.close_all()
 
 
 app = FastAPI(
@@ -68,6 +99,13 @@ app = FastAPI(
     lifespan=lifespan
 )
 app.state.db = db
+app.state.deploy_id = load_deploy_id()
+app.add_middleware(
+    ReferenceCacheMiddleware,
+    version=app.version,
+    deploy_id=app.state.deploy_id,
+    max_age=int(os.environ.get("REFERENCE_CACHE_MAX_AGE", DEFAULT_MAX_AGE))
+)
 
 app.include_router(health.router, prefix="/api")
 app.include_router(search.router, prefix="/api")
@@ -77,6 +115,8 @@ app.include_router(addresses.router, prefix="/api")
 app.include_router(parking.router, prefix="/api")
 app.include_router(contact.router, prefix="/api")
 app.include_router(postcodes.router, prefix="/api")
+app.include_router(risk.router, prefix="/api")
+app.include_router(lgas.router, prefix="/api")
 
 if static_path.exists():
     @app.get("/")
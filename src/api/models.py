@@ -129,6 +129,55 @@ class PaginatedRiskResponse(BaseModel):
     """Paginated risk ranking response"""
     items: List[Dict[str, Any]] = Field(..., description="Risk ranking items")
     total: int = Field(..., description="Total number of items")
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to get the next page, null on the last page")
+
+
+class RiskBatchItem(BaseModel):
+    """One postcode to score, optionally with the motorcycle parked there"""
+    postcode: str = Field(..., max_length=10, description="4-digit postcode")
+    brand: Optional[str] = Field(None, max_length=100, description="Motorcycle brand, needs model too")
+    model: Optional[str] = Field(None, max_length=100, description="Motorcycle model, needs brand too")
+
+
+class RiskBatchRequest(BaseModel):
+    """Postcodes (and motorcycles) to score in one request"""
+    items: List[RiskBatchItem] = Field(..., min_length=1, max_length=5000, description="Up to 5000 items")
+
+
+class RiskBatchResult(BaseModel):
+    """Risk for one item of a batch, in the order they were sent"""
+    postcode: str = Field(..., description="Postcode as sent")
+    suburb: Optional[str] = Field(None, description="First suburb of the postcode, null if it isn't known")
+    lga: Optional[str] = Field(None, description="Local government area, null if the postcode isn't known")
+    risk_score: Optional[float] = Field(None, description="Postcode risk from 0 (safe) to 1 (high risk), the default when it isn't known")
+    postcode_found: bool = Field(..., description="False when risk_score is the postcode default")
+    brand: Optional[str] = Field(None, description="Brand as sent")
+    model: Optional[str] = Field(None, description="Model as sent")
+    model_risk: Optional[float] = Field(None, description="Model risk from 0 (safe) to 1 (high risk), the default when it isn't known, null without a motorcycle")
+    model_found: Optional[bool] = Field(None, description="False when model_risk is the model default, null without a motorcycle")
+
+
+class RiskBatchResponse(BaseModel):
+    """Batch risk lookup results"""
+    defaults: Optional[Dict[str, float]] = Field(None, description="model_default_risk and postcode_default_risk")
+    items: List[RiskBatchResult] = Field(..., description="One result per item, in request order")
+
+
+class RiskScoreRequest(BaseModel):
+    """Columns of postcodes (and motorcycles) to score, row n of each column is one row"""
+    postcodes: List[str] = Field(..., min_length=1, max_length=50000, description="4-digit postcodes, up to 50000")
+    brands: Optional[List[Optional[str]]] = Field(None, description="Motorcycle brand per row, same length as postcodes, needs model too")
+    models: Optional[List[Optional[str]]] = Field(None, description="Motorcycle model per row, same length as postcodes, needs brand too")
+
+
+class RiskScoreResponse(BaseModel):
+    """Combined risk columns in row order"""
+    defaults: Optional[Dict[str, float]] = Field(None, description="model_default_risk and postcode_default_risk")
+    postcode_risk: List[float] = Field(..., description="Postcode risk, the default when it isn't known")
+    model_risk: List[Optional[float]] = Field(..., description="Model risk, the default when it isn't known, null without a motorcycle")
+    combined_risk: List[float] = Field(..., description="1 - (1 - postcode_risk) * (1 - model_risk), postcode_risk without a motorcycle")
+    postcode_found: List[bool] = Field(..., description="False when postcode_risk is the default")
+    model_found: List[Optional[bool]] = Field(..., description="False when model_risk is the default, null without a motorcycle")
 
 
 class ContactFormSubmission(BaseModel):
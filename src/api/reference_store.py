@@ -0,0 +1,338 @@
+import base64
+import json
+import math
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from functools import total_ordering
+from itertools import islice
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+from db_interface import DatabaseInterface
+
+# Column types, strings stay in lists (interned so repeated suburbs and LGAs are stored once),
+# numbers go into packed arrays
+TEXT, REAL, INTEGER = "text", "d", "q"
+# Separates rows in a search haystack, never part of a search term
+SEPARATOR = "\x00"
+# Distinct searches whose matches and totals are kept per table
+MATCH_CACHE_SIZE = 256
+
+
+class Table:
+    """
+    A read-only table held column by column. Every sortable column gets its ascending and
+    descending row orders worked out up front, so a sorted page is a slice of an index array.
+    Ties keep the load order in both directions, which makes (value, row id) a unique key for
+    every position and lets a cursor find where it left off with a binary search.
+    """
+    __slots__ = ("size", "columns", "haystacks", "orders", "kinds", "_matches", "_matches_lock")
+
+    def __init__(self, rows: Iterable[Dict[str, Any]], types: Dict[str, str], sortable: Iterable[str] = (),
+                 searchable: Iterable[str] = ()):
+        rows = list(rows)
+        self.size = len(rows)
+        self.kinds = dict(types)
+        self.columns: Dict[str, Any] = {}
+        for name, kind in types.items():
+            if kind == TEXT:
+                self.columns[name] = [sys.intern(row[name]) if row[name] is not None else None for row in rows]
+            else:
+                self.columns[name] = array(kind, (_number(row[name], kind) for row in rows))
+        # Each searchable column lower cased and joined into one string, with where every row starts,
+        # so a LIKE '%q%' filter is a few str.find() calls rather than a Python loop over every row
+        self.haystacks: Dict[str, Tuple[str, array]] = {}
+        for name in searchable:
+            values = [(value or "").lower() for value in self.columns[name]]
+            starts = array("I", [0] * self.size)
+            for i in range(1, self.size):
+                starts[i] = starts[i - 1] + len(values[i - 1]) + 1
+            self.haystacks[name] = (SEPARATOR.join(values), starts)
+        self.orders: Dict[Tuple[str, bool], array] = {}
+        for name in sortable:
+            column, key = self.columns[name], _value_key(types[name])
+            self.orders[(name, False)] = array("I", sorted(range(self.size), key=lambda i: key(column[i])))
+            self.orders[(name, True)] = array("I", sorted(range(self.size), key=lambda i: key(column[i]), reverse=True))
+        # Searches come from the route threadpool, the lock keeps concurrent misses from evicting the same entry
+        self._matches: "OrderedDict[Tuple[str, Tuple[str, ...]], Tuple[bytes, int]]" = OrderedDict()
+        self._matches_lock = threading.Lock()
+
+    def row(self, i: int, names: Iterable[str]) -> Dict[str, Any]:
+        return {name: self.columns[name][i] for name in names}
+
+    def matching(self, q: Optional[str], names: Tuple[str, ...]) -> Tuple[Optional[bytes], int]:
+        """
+        Which rows contain q in any of the named columns and how many do, None when there's nothing
+        to filter on. The table never changes so both are cached per search, a total doesn't need
+        recounting for every page.
+        """
+        if not q:
+            return None, self.size
+        key = (q.lower(), names)
+        with self._matches_lock:
+            cached = self._matches.get(key)
+        if cached is None:
+            # Worked out without the lock, two threads missing on the same search just both do it
+            keep = bytes(self._find(key[0], names))
+            cached = (keep, sum(keep))
+            with self._matches_lock:
+                self._matches[key] = cached
+                while len(self._matches) > MATCH_CACHE_SIZE:
+                    self._matches.popitem(last=False)
+        return cached
+
+    def _find(self, q: str, names: Tuple[str, ...]) -> List[bool]:
+        keep = [False] * self.size
+        if SEPARATOR in q:
+            return keep
+        for name in names:
+            text, starts = self.haystacks[name]
+            if text.count(q) > self.size // 16:
+                # Matches most rows (a single digit of a postcode), checking every row is cheaper
+                keep = [kept or q in value for kept, value in zip(keep, text.split(SEPARATOR))]
+                continue
+            position = text.find(q)
+            while position >= 0:
+                i = bisect_right(starts, position) - 1
+                keep[i] = True
+                # Carry on from the next row, one match per row is enough
+                position = text.find(q, starts[i + 1]) if i + 1 < self.size else -1
+        return keep
+
+    def page(self, sort: str, descending: bool, keep: Optional[bytes], offset: int = 0, limit: Optional[int] = None,
+             after: Optional[Tuple[Any, int]] = None) -> Tuple[List[int], Optional[Tuple[Any, int]]]:
+        """
+        The ids of one page sorted by sort, keeping only rows where keep is true, starting just
+        past the (value, row id) key in after or offset rows in. Also returns the key to carry on
+        from, None on the last page.
+        """
+        order = self.orders[(sort, descending)]
+        start = self.seek(sort, descending, after) if after is not None else 0
+        if keep is None:
+            stop = len(order) if limit is None else start + offset + limit + 1
+            ids = list(order[start + offset:stop])
+        else:
+            stop = None if limit is None else offset + limit + 1
+            ids = list(islice((i for i in order[start:] if keep[i]), offset, stop))
+        if limit is None or len(ids) <= limit:
+            return ids, None
+        ids = ids[:limit]
+        return ids, (self.columns[sort][ids[-1]], ids[-1])
+
+    def seek(self, sort: str, descending: bool, after: Tuple[Any, int]) -> int:
+        """Position in the sort order just past the row with this (value, row id)"""
+        column, key = self.columns[sort], _value_key(self.kinds[sort])
+        wrap = _Descending if descending else (lambda value: value)
+        value, row_id = after
+        try:
+            return bisect_right(
+                self.orders[(sort, descending)], (wrap(key(value)), row_id), key=lambda i: (wrap(key(column[i])), i)
+            )
+        except TypeError as e:
+            # A value of the wrong type for the column, only from a tampered cursor
+            raise ValueError("Invalid cursor") from e
+
+    def memory_usage(self) -> int:
+        total = sys.getsizeof(self.columns) + sys.getsizeof(self.orders) + sys.getsizeof(self.haystacks)
+        total += sum(sys.getsizeof(order) for order in self.orders.values())
+        total += sum(sys.getsizeof(text) + sys.getsizeof(starts) for text, starts in self.haystacks.values())
+        # Interned strings are shared between rows, count each one once
+        strings = set()
+        for column in self.columns.values():
+            total += sys.getsizeof(column)
+            if isinstance(column, list):
+                for value in column:
+                    if value is not None and id(value) not in strings:
+                        strings.add(id(value))
+                        total += sys.getsizeof(value)
+        return total
+
+
+class ReferenceStore:
+    """
+    The postcode_risk, lga_risk, model_risk and default_risk reference tables, loaded once at startup and
+    answered from memory. hotspot.db is rebuilt on every deploy and never written to by the API,
+    so these never go stale while the process is up.
+
+    Filters and sorts follow the SQL they replace: LIKE '%q%' is a case insensitive substring
+    match and LGA aggregates are rounded the same way.
+    """
+    __slots__ = ("postcodes", "lgas", "models", "defaults", "_by_postcode", "_by_model", "_by_lga")
+
+    POSTCODE_TYPES = {
+        "postcode": TEXT, "suburb": TEXT, "lga": TEXT, "long": REAL, "lat": REAL,
+        "motorcycle_theft_rate": REAL, "risk_score": REAL
+    }
+    LGA_TYPES = {
+        "lga": TEXT, "postcode_count": INTEGER, "avg_risk": REAL, "min_risk": REAL, "max_risk": REAL,
+        "risk_rank": INTEGER, "size_rank": INTEGER
+    }
+    MODEL_TYPES = {"brand": TEXT, "model": TEXT, "total": INTEGER, "percentage": REAL, "model_risk": REAL}
+
+    def __init__(self, postcode_rows: Iterable[Dict[str, Any]], lga_rows: Iterable[Dict[str, Any]],
+                 model_rows: Iterable[Dict[str, Any]], defaults: Optional[Dict[str, Any]] = None):
+        self.postcodes = Table(
+            postcode_rows, self.POSTCODE_TYPES,
+            sortable=("postcode", "suburb", "lga", "risk_score"),
+            searchable=("postcode", "suburb", "lga")
+        )
+        self.lgas = Table(
+            lga_rows, self.LGA_TYPES,
+            sortable=("lga", "postcode_count", "avg_risk"),
+            searchable=("lga",)
+        )
+        self.models = Table(
+            model_rows, self.MODEL_TYPES,
+            sortable=("model_risk", "total", "brand", "model"),
+            searchable=("brand", "model")
+        )
+        self.defaults = defaults
+
+        self._by_postcode: Dict[str, int] = {}
+        for i, postcode in enumerate(self.postcodes.columns["postcode"]):
+            self._by_postcode.setdefault(postcode, i)
+        self._by_model: Dict[Tuple[str, str], int] = {}
+        for i, key in enumerate(zip(self.models.columns["brand"], self.models.columns["model"])):
+            self._by_model.setdefault(key, i)
+        # Postcodes of each LGA by risk in either direction, ties by postcode like lga_postcodes used to
+        self._by_lga: Dict[Tuple[str, bool], List[int]] = {}
+        postcodes, risk = self.postcodes.columns["postcode"], self.postcodes.columns["risk_score"]
+        for i in sorted(range(self.postcodes.size), key=postcodes.__getitem__):
+            for descending in (False, True):
+                self._by_lga.setdefault((self.postcodes.columns["lga"][i], descending), []).append(i)
+        for (_, descending), ids in self._by_lga.items():
+            ids.sort(key=risk.__getitem__, reverse=descending)
+
+    @classmethod
+    def load(cls, db: DatabaseInterface) -> "ReferenceStore":
+        postcodes = db.fetch_all("""
+            SELECT postcode, locality as suburb, local_government_area as lga, long, lat,
+                   motorcycle_theft_rate, postcode_risk as risk_score
+            FROM postcode_risk
+            ORDER BY rowid
+        """)
+        # Aggregated and ranked when hotspot.db is built, see src/data/create_indexes.sql
+        lgas = db.fetch_all("""
+            SELECT lga, postcode_count, avg_risk, min_risk, max_risk, risk_rank, size_rank
+            FROM lga_risk
+            ORDER BY rowid
+        """)
+        models = db.fetch_all("""
+            SELECT brand, model, total, percentage, model_risk
+            FROM model_risk
+            ORDER BY rowid
+        """)
+        defaults = db.fetch_all("SELECT * FROM default_risk LIMIT 1")
+        return cls(postcodes, lgas, models, defaults[0] if defaults else None)
+
+    def __len__(self) -> int:
+        return self.postcodes.size + self.models.size
+
+    def postcode(self, postcode: str) -> Optional[Dict[str, Any]]:
+        i = self._by_postcode.get(postcode)
+        if i is None:
+            return None
+        return self.postcodes.row(i, ("postcode", "suburb", "lga", "motorcycle_theft_rate", "risk_score"))
+
+    def top_postcodes(self, search: Optional[str], sort: str, descending: bool, offset: int = 0, limit: int = 20,
+                      after: Optional[Tuple[Any, int]] = None) -> Tuple[List[Dict[str, Any]], int, Optional[Tuple[Any, int]]]:
+        """A page of postcodes, the total matching search and the key of the last row if there are more"""
+        table = self.postcodes
+        keep, total = table.matching(search, ("postcode", "suburb", "lga"))
+        ids, last = table.page(sort, descending, keep, offset, limit, after)
+        return [table.row(i, ("postcode", "suburb", "lga", "risk_score")) for i in ids], total, last
+
+    def top_lgas(self, search: Optional[str], sort: str, descending: bool, offset: int = 0, limit: int = 20,
+                 after: Optional[Tuple[Any, int]] = None) -> Tuple[List[Dict[str, Any]], int, Optional[Tuple[Any, int]]]:
+        """A page of LGA rollups, the total matching search and the key of the last row if there are more"""
+        table = self.lgas
+        keep, total = table.matching(search, ("lga",))
+        ids, last = table.page(sort, descending, keep, offset, limit, after)
+        return [table.row(i, ("lga", "avg_risk", "postcode_count")) for i in ids], total, last
+
+    def lga_rollups(self, q: Optional[str], sort: str, descending: bool) -> List[Dict[str, Any]]:
+        table = self.lgas
+        ids, _ = table.page(sort, descending, table.matching(q, ("lga",))[0])
+        return [table.row(i, tuple(self.LGA_TYPES)) for i in ids]
+
+    def lga_postcodes(self, lga: str, descending: bool) -> List[Dict[str, Any]]:
+        ids = self._by_lga.get((lga, descending), [])
+        return [self.postcodes.row(i, ("postcode", "suburb", "long", "lat", "risk_score")) for i in ids]
+
+    def list_models(self, brand: Optional[str], model: Optional[str], min_total: int, sort: str, descending: bool,
+                    offset: int = 0, limit: int = 100,
+                    after: Optional[Tuple[Any, int]] = None) -> Tuple[List[Dict[str, Any]], int, Optional[Tuple[Any, int]]]:
+        """A page of models, how many pass the filters and the key of the last row if there are more"""
+        table = self.models
+        keep = bytes(total >= min_total for total in table.columns["total"])
+        for name, q in (("brand", brand), ("model", model)):
+            matches, _ = table.matching(q, (name,))
+            if matches is not None:
+                keep = bytes(a and b for a, b in zip(keep, matches))
+        ids, last = table.page(sort, descending, keep, offset, limit, after)
+        return [table.row(i, tuple(self.MODEL_TYPES)) for i in ids], sum(keep), last
+
+    def model(self, brand: str, model: str) -> Optional[Dict[str, Any]]:
+        i = self._by_model.get((brand, model))
+        return self.models.row(i, tuple(self.MODEL_TYPES)) if i is not None else None
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate bytes held by each table, columns, sort orders and strings included"""
+        return {
+            "postcode_risk": self.postcodes.memory_usage(),
+            "lga_risk": self.lgas.memory_usage(),
+            "model_risk": self.models.memory_usage(),
+        }
+
+
+def model_name_key(brand: str, model: str) -> Tuple[str, str]:
+    """Brand and model with case and spacing ignored"""
+    return " ".join((brand or "").split()).lower(), " ".join((model or "").split()).lower()
+
+
+def _number(value: Any, kind: str):
+    if value is None or value == "":
+        return math.nan if kind == REAL else 0
+    return float(value) if kind == REAL else int(value)
+
+
+def encode_cursor(sort: str, descending: bool, search: Any, last: Tuple[Any, int]) -> str:
+    """An opaque cursor for the page after last, tied to the sort and search it was made for"""
+    payload = json.dumps([sort, descending, search, list(last)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, descending: bool, search: Any) -> Tuple[Any, int]:
+    """The (value, row id) key in a cursor, ValueError if it's malformed or from a different query"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        cursor_sort, cursor_descending, cursor_search, (value, row_id) = payload
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if [cursor_sort, cursor_descending, cursor_search] != [sort, descending, search] or not isinstance(row_id, int):
+        raise ValueError("Cursor doesn't match this query")
+    return value, row_id
+
+
+def _value_key(kind: str):
+    # NULL text sorts first like SQLite
+    if kind == TEXT:
+        return lambda value: (value is not None, value or "")
+    return lambda value: value
+
+
+@total_ordering
+class _Descending:
+    """Reverses the comparison of the value it wraps, for binary searching a descending order"""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
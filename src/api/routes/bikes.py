@@ -1,10 +1,21 @@
-from fastapi import APIRouter, Query, Request, HTTPException, Path
+from fastapi import APIRouter, Query, Request, Response, HTTPException, Path
 from fastapi.responses import PlainTextResponse
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from models import MotorcycleModel
+from reference_store import encode_cursor, decode_cursor
 
 router = APIRouter(tags=["Motorcycles"])
 
+# sort values mapped to a reference store column and whether it's descending
+MODEL_SORTS = {
+    "risk_desc": ("model_risk", True),
+    "risk_asc": ("model_risk", False),
+    "total_desc": ("total", True),
+    "total_asc": ("total", False),
+    "brand": ("brand", False),
+    "model": ("model", False)
+}
+
 @router.get(
     "/v1/models",
     summary="List motorcycle models",
@@ -14,26 +25,35 @@ router = APIRouter(tags=["Motorcycles"])
 )
 def list_models(
     request: Request,
+    response: Response,
     brand: str | None = Query(None, description="Filter by brand name"),
     model: str | None = Query(None, description="Filter by model name"),
     min_total: int = Query(0, ge=0, description="Minimum total theft count"),
     sort: str = Query("risk_desc", description="Sort order", pattern="^(risk_desc|risk_asc|total_desc|total_asc|brand|model)$"),
     limit: int = Query(100, ge=1, le=500, description="Maximum results to return"),
     offset: int = Query(0, ge=0, description="Number of results to skip"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page, used instead of offset")
 ) -> List[MotorcycleModel]:
-    db = request.app.state.db
-    clauses, params = ["total >= :min_total"], {"min_total": min_total}
-    if brand: clauses.append("brand LIKE '%' || :brand || '%'"); params["brand"]=brand.lower()
-    if model: clauses.append("model LIKE '%' || :model || '%'"); params["model"]=model.lower()
-    where_sql = "WHERE " + " AND ".join(clauses)
-    sort_sql = {"risk_desc":"model_risk DESC","risk_asc":"model_risk ASC","total_desc":"total DESC","total_asc":"total ASC","brand":"brand ASC","model":"model ASC"}.get(sort,"model_risk DESC")
-    results = db.fetch_all(f"""
-        SELECT brand, model, total, percentage, model_risk
-        FROM model_risk
-        {where_sql}
-        ORDER BY {sort_sql}
-        LIMIT :limit OFFSET :offset
-    """, {**params, "limit": limit, "offset": offset})
+    column, descending = MODEL_SORTS.get(sort, MODEL_SORTS["risk_desc"])
+    filters = [brand, model, min_total]
+    after = None
+    if cursor:
+        try:
+            after, offset = decode_cursor(cursor, column, descending, filters), 0
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        results, total, last = request.app.state.reference.list_models(
+            brand, model, min_total, column, descending=descending, offset=offset, limit=limit, after=after
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # The body stays a plain list, paging details go in headers
+    response.headers["X-Total-Count"] = str(total)
+    if last:
+        response.headers["X-Next-Cursor"] = encode_cursor(column, descending, filters, last)
     return [MotorcycleModel(**result) for result in results]
 
 @router.get(
@@ -48,14 +68,8 @@ def model_detail(
     brand: str = Path(..., description="Motorcycle brand name"),
     model: str = Path(..., description="Motorcycle model name")
 ) -> MotorcycleModel:
-    db = request.app.state.db
-    row = db.fetch_all("""
-        SELECT brand, model, total, percentage, model_risk
-        FROM model_risk
-        WHERE brand = :b AND model = :m
-        LIMIT 1
-    """, {"b": brand.lower(), "m": model.lower()})
-    if not row:
+    row = request.app.state.reference.model(brand.lower(), model.lower())
+    if row is None:
         raise HTTPException(status_code=404, detail="Model not found")
-    return MotorcycleModel(**row[0])
+    return MotorcycleModel(**row)
 
@@ -1,4 +1,6 @@
-from fastapi import APIRouter
+from typing import Any, Dict
+
+from fastapi import APIRouter, Request
 from fastapi.responses import PlainTextResponse
 
 router = APIRouter(tags=["Health"])
@@ -12,3 +14,25 @@ router = APIRouter(tags=["Health"])
 )
 def health() -> str:
     return "ok"
+
+def runtime_stats(state) -> Dict[str, Dict[str, Any]]:
+    """The counters each part of the process keeps, served by /metrics and logged on shutdown"""
+    db = state.db
+    sources = {
+        "statistics_refresher": getattr(state, "statistics", None),
+        "singleflight": getattr(state, "singleflight", None),
+        "sqlite_pool": getattr(db, "pool", None),
+        "parking_ids": getattr(db, "ids", None),
+        "contribution_cache": getattr(db, "contribution_cache", None),
+        "query_cache": getattr(db, "query_cache", None)
+    }
+    return {name: source.stats() for name, source in sources.items() if source is not None}
+
+@router.get(
+    "/metrics",
+    summary="Runtime metrics",
+    description="Counters from this instance since it started: coalesced requests, connection pool, caches and id leases",
+    response_description="Stats of each component, keyed by name. Components that aren't in use are left out"
+)
+def metrics(request: Request) -> Dict[str, Dict[str, Any]]:
+    return runtime_stats(request.app.state)
@@ -1,5 +1,8 @@
-from fastapi import APIRouter, Request, HTTPException, Path
-from typing import List
+from fastapi import APIRouter, Request, HTTPException, Path, Query
+from typing import List, Optional
+from db_interface import DatabaseInterface
+from singleflight import flight_key
+from spatial_index import PostcodeSpatialIndex
 from models import PostcodeFeedResponse, YearlyTheft, ParkingSubmission, SaferSuburb, CurrentLocation, ParkingFacility
 
 router = APIRouter(tags=["Postcodes"])
@@ -13,82 +16,73 @@ router = APIRouter(tags=["Postcodes"])
 )
 def get_postcode_feed(
     request: Request,
-    postcode: str = Path(..., description="Victorian postcode", pattern="^[0-9]{4}$")
+    postcode: str = Path(..., description="Victorian postcode", pattern="^[0-9]{4}$"),
+    k: int = Query(20, ge=1, le=100, description="Number of safer suburbs to return"),
+    radius: Optional[float] = Query(None, gt=0, description="Only suburbs within this many meters"),
+    maxRisk: Optional[float] = Query(None, ge=0, le=1, description="Only suburbs with a risk score below this, defaults to the next risk band down")
 ) -> PostcodeFeedResponse:
-    db = request.app.state.db
-
-    target_postcode = db.fetch_all("""
-        SELECT postcode, locality AS suburb, postcode_risk AS risk_score
-        FROM postcode_risk
-        WHERE postcode = :postcode
-        LIMIT 1
-    """, {"postcode": postcode})
+    # A shared postcode brings everyone in at once, they all wait on the same fan-out
+    feed = request.app.state.singleflight.do(
+        flight_key("feed", postcode=postcode, k=k, radius=radius, max_risk=maxRisk),
+        lambda: build_postcode_feed(
+            request.app.state.db, request.app.state.spatial_index, postcode, k=k, radius=radius, max_risk=maxRisk
+        )
+    )
 
-    if not target_postcode:
+    if feed is None:
         raise HTTPException(status_code=404, detail=f"Postcode {postcode} not found")
 
-    current_risk_score = target_postcode[0]['risk_score']
-    current_suburb = target_postcode[0]['suburb']
-
-    parking_submissions = db.get_parking_by_postcode(postcode)
+    return feed
 
-    for submission in parking_submissions:
-        submission['facilities'] = db.get_facilities_for_parking(submission['parking_id'])
 
+def safer_risk_threshold(risk_score: float) -> float:
     # High Risk: risk > 0.5
-    # Medium Risk: 0.2 < risk <= 0
+    # Medium Risk: 0.2 < risk <= 0.5
     # Low Risk: risk <= 0.2
-
-    if current_risk_score > 0.5:
-        max_risk = 0.5
-    elif current_risk_score > 0.2:
-        max_risk = 0.2
-    else:
-        max_risk = current_risk_score
-
-    nearest_suburbs_query = db.fetch_all("""
-        SELECT
-            pd.secondary_postcode as postcode,
-            pr.locality as suburb,
-            pr.local_government_area as lga,
-            pd.distance_meters as distance_in_meters,
-            pr.postcode_risk as risk_score
-        FROM postcode_distances pd
-        JOIN postcode_risk pr ON pd.secondary_postcode = pr.postcode
-        WHERE pd.primary_postcode = :postcode
-        AND pr.postcode_risk < :max_risk
-        ORDER BY pd.distance_meters ASC
-        LIMIT 20
-    """, {
-        "postcode": postcode,
-        "max_risk": max_risk
-    })
-
-    for suburb_data in nearest_suburbs_query:
-        try:
-            parking_data = db.get_parking_by_postcode(suburb_data['postcode'])
-            suburb_data['parking_count'] = len(parking_data) if parking_data else 0
-        except:
-            suburb_data['parking_count'] = 0
-
-    parking_models = []
-    for submission in parking_submissions:
-        facilities = [ParkingFacility(**f) for f in submission.get('facilities', [])]
-        parking_models.append(ParkingSubmission(
+    if risk_score > 0.5:
+        return 0.5
+    if risk_score > 0.2:
+        return 0.2
+    return risk_score
+
+
+def build_postcode_feed(
+    db: DatabaseInterface,
+    spatial_index: PostcodeSpatialIndex,
+    postcode: str,
+    k: int = 20,
+    radius: Optional[float] = None,
+    max_risk: Optional[float] = None
+) -> Optional[PostcodeFeedResponse]:
+    """
+    Assembles the feed from the in-memory spatial index and db.get_feed_contributions(), a fixed
+    number of reads whatever the postcode
+    """
+    current = spatial_index.location(postcode)
+
+    if current is None:
+        return None
+
+    if max_risk is None:
+        max_risk = safer_risk_threshold(current['risk_score'])
+    nearest = spatial_index.nearest(postcode, k=k, max_risk=max_risk, radius=radius)
+    contributions = db.get_feed_contributions(postcode, [suburb['postcode'] for suburb in nearest])
+
+    parking_models = [
+        ParkingSubmission(
             **{k: v for k, v in submission.items() if k != 'facilities'},
-            facilities=facilities
-        ))
-
-    safer_suburb_models = [SaferSuburb(**suburb) for suburb in nearest_suburbs_query]
+            facilities=[ParkingFacility(**f) for f in submission['facilities']]
+        )
+        for submission in contributions['parking_submissions']
+    ]
+    counts = contributions['parking_counts']
 
     return PostcodeFeedResponse(
-        current=CurrentLocation(
-            postcode=postcode,
-            suburb=current_suburb,
-            risk_score=current_risk_score
-        ),
+        current=CurrentLocation(postcode=postcode, suburb=current['suburb'], risk_score=current['risk_score']),
         parking_submissions=parking_models,
-        nearest_safer_suburbs=safer_suburb_models
+        nearest_safer_suburbs=[
+            SaferSuburb(**suburb, parking_count=counts.get(suburb['postcode'], 0)) for suburb in nearest
+        ]
     )
 
 @router.get(
@@ -102,14 +96,23 @@ def get_postcode_thefts(
     request: Request,
     postcode: str = Path(..., description="Victorian postcode", pattern="^[0-9]{4}$")
 ) -> List[YearlyTheft]:
-    db = request.app.state.db
+    theft_data = request.app.state.singleflight.do(
+        flight_key("thefts", postcode=postcode), lambda: load_postcode_thefts(request.app.state.db, postcode)
+    )
+
+    if theft_data is None:
+        raise HTTPException(status_code=404, detail=f"No theft data found for postcode {postcode}")
+
+    return theft_data
 
+
+def load_postcode_thefts(db: DatabaseInterface, postcode: str) -> Optional[List[YearlyTheft]]:
     postcode_exists = db.fetch_all("""
         SELECT postcode FROM postcode_yearly_thefts WHERE postcode = :postcode LIMIT 1
     """, {"postcode": postcode})
 
     if not postcode_exists:
-        raise HTTPException(status_code=404, detail=f"No theft data found for postcode {postcode}")
+        return None
 
     theft_data = db.fetch_all("""
         SELECT
@@ -1,18 +1,66 @@
-from fastapi import APIRouter, Query, Request
-from fastapi.responses import PlainTextResponse
+import json
+from itertools import islice
+
+from fastapi import APIRouter, Query, Request, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from models import RiskBatchRequest, RiskBatchResponse, RiskScoreRequest, RiskScoreResponse
+from scoring import to_lists
 
 router = APIRouter()
 
+# Batches bigger than this are streamed a chunk of items at a time instead of built up in memory
+BATCH_STREAM_THRESHOLD = 1000
+BATCH_STREAM_CHUNK = 500
+
 @router.get("/v1/risk/compare")
 def risk_compare(request: Request, postcode: str = Query(...)):
-    db = request.app.state.db
-    base = db.fetch_all("""
-        SELECT postcode, locality AS suburb, local_government_area AS lga,
-               motorcycle_theft_rate, postcode_risk AS risk_score
-        FROM postcode_risk WHERE postcode = :pc LIMIT 1
-    """, {"pc": postcode})
-    if not base:
+    store = request.app.state.reference
+    base = store.postcode(postcode)
+    if base is None:
         raise HTTPException(status_code=404, detail="Postcode not found")
-    defaults = db.fetch_all("SELECT * FROM default_risk LIMIT 1")
-    return {"base": base[0], "defaults": (defaults[0] if defaults else None)}
+    return {"base": base, "defaults": store.defaults}
+
+
+@router.post(
+    "/v1/risk/batch",
+    summary="Batch risk lookup",
+    description="Postcode risk, LGA and model risk for many postcodes (and motorcycles) at once, with default_risk for anything unknown",
+    response_description="One result per item in request order, streamed for large batches",
+    response_model=RiskBatchResponse
+)
+def risk_batch(request: Request, body: RiskBatchRequest):
+    store = request.app.state.reference
+    postcodes = [item.postcode for item in body.items]
+    results = request.app.state.scorer.batch(
+        postcodes, [item.brand for item in body.items], [item.model for item in body.items]
+    )
+
+    if len(postcodes) <= BATCH_STREAM_THRESHOLD:
+        return {"defaults": store.defaults, "items": list(results)}
+
+    def stream():
+        # Same JSON document as a small batch, written out as the items are looked up
+        yield f'{{"defaults": {json.dumps(store.defaults)}, "items": ['
+        separator = ""
+        while chunk := list(islice(results, BATCH_STREAM_CHUNK)):
+            yield separator + ", ".join(json.dumps(item) for item in chunk)
+            separator = ", "
+        yield "]}"
+
+    return StreamingResponse(stream(), media_type="application/json")
+
 
+@router.post(
+    "/v1/risk/score",
+    summary="Combined risk scoring",
+    description="Combined location and motorcycle risk for columns of postcodes, brands and models, scored in one vectorised pass",
+    response_description="Risk columns in row order",
+    response_model=RiskScoreResponse
+)
+def risk_score(request: Request, body: RiskScoreRequest):
+    try:
+        scores = request.app.state.scorer.score(body.postcodes, body.brands, body.models)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"defaults": request.app.state.reference.defaults, **to_lists(scores)}
@@ -12,13 +12,13 @@ router = APIRouter(tags=["Search"])
     response_description="List of matching suburbs with risk scores",
     response_model=List[SuburbSearchResult]
 )
-def search(request: Request, q: str = Query(..., description="Search term (suburb name or postcode)", min_length=1)) -> List[SuburbSearchResult]:
-    db = request.app.state.db
-    rows = db.fetch_all("""
-        SELECT locality as suburb, postcode, local_government_area as lga, postcode_risk as risk_score
-        FROM postcode_risk
-        WHERE locality LIKE '%' || :q || '%' OR postcode LIKE '%' || :q || '%'
-        LIMIT 20
-    """, {"q": q})
+def search(
+    request: Request,
+    q: str = Query(..., description="Search term (suburb name or postcode)", min_length=1),
+    sortBy: str | None = Query(None, description="Reorder the matches by this field instead of relevance", pattern="^(suburb|postcode|lga|risk_score)$"),
+    sortOrder: str = Query("asc", description="Sort direction", pattern="^(asc|desc)$")
+) -> List[SuburbSearchResult]:
+    rows = request.app.state.search_index.search(q, limit=20)
+    if sortBy:
+        rows = sorted(rows, key=lambda r: r[sortBy], reverse=sortOrder == "desc")
     return [SuburbSearchResult(label=f"{r['suburb']}, {r['postcode']}", **r) for r in rows]
-
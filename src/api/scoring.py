@@ -0,0 +1,159 @@
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from reference_store import ReferenceStore, model_name_key
+
+# Joins brand and model into one key per row, never part of either. Not NUL, NumPy strings drop
+# trailing NULs
+KEY_SEPARATOR = "\x1f"
+
+
+def postcode_key(postcode: Any) -> str:
+    """A postcode as it's looked up, surrounding whitespace ignored"""
+    return "" if postcode is None else str(postcode).strip()
+
+
+def is_motorcycle(brand: Optional[str], model: Optional[str]) -> bool:
+    """A row only has a motorcycle to score with both a brand and a model"""
+    return bool((brand or "").strip() and (model or "").strip())
+
+
+class RiskScorer:
+    """
+    Postcode, model and combined risk for whole arrays of (postcode, brand, model) at once. Backs both
+    /v1/risk/batch and /v1/risk/score, and the offline score_risk.py, so they all normalise and fall
+    back the same way.
+
+    A postcode's risk is its first locality's, as /v1/risk/compare reports it. Unknown postcodes and
+    models use default_risk, and postcode_found/model_found say when they did. Rows without a
+    motorcycle have no model risk (NaN here, null in responses) and their combined_risk is just the
+    postcode's. Otherwise the two reference scores are treated as independent chances of being
+    targeted, so combined_risk = 1 - (1 - postcode_risk) * (1 - model_risk).
+
+    Scoring factorises the inputs: one pass over the rows finds the distinct postcodes and brand/model
+    pairs, only those are normalised and looked up (a binary search over the sorted reference keys),
+    and the results are gathered back out to every row with NumPy.
+    """
+    def __init__(self, store: ReferenceStore):
+        self.store = store
+        defaults = store.defaults or {}
+        self.postcode_default = float(defaults.get("postcode_default_risk", np.nan))
+        self.model_default = float(defaults.get("model_default_risk", np.nan))
+
+        postcodes: Dict[str, int] = {}
+        for i, postcode in enumerate(store.postcodes.columns["postcode"]):
+            postcodes.setdefault(postcode_key(postcode), i)
+        self._postcode_keys = np.array(sorted(postcodes), dtype=str)
+        self._postcode_rows = np.array([postcodes[key] for key in self._postcode_keys.tolist()], dtype=np.intp)
+
+        models: Dict[str, int] = {}
+        for i, bike in enumerate(zip(store.models.columns["brand"], store.models.columns["model"])):
+            models.setdefault(KEY_SEPARATOR.join(model_name_key(*bike)), i)
+        self._model_keys = np.array(sorted(models), dtype=str)
+        self._model_rows = np.array([models[key] for key in self._model_keys.tolist()], dtype=np.intp)
+
+        # Risk by reference row, with the default on the end for the -1 of anything unknown
+        self._postcode_risk = _risk_column(store.postcodes.columns["risk_score"], self.postcode_default)
+        self._model_risk = _risk_column(store.models.columns["model_risk"], self.model_default)
+
+    @classmethod
+    def from_store(cls, store: ReferenceStore) -> "RiskScorer":
+        return cls(store)
+
+    def score(self, postcodes: Sequence[str], brands: Optional[Sequence[Optional[str]]] = None,
+              models: Optional[Sequence[Optional[str]]] = None) -> Dict[str, np.ndarray]:
+        """
+        Scores every row. brands and models are optional, rows without both mean no motorcycle.
+        Returns postcode_risk, model_risk, combined_risk, postcode_found and model_found arrays in
+        row order, to_lists() turns them into what the API sends.
+        """
+        return self._score(postcodes, brands, models)[0]
+
+    def batch(self, postcodes: Sequence[str], brands: Sequence[Optional[str]],
+              models: Sequence[Optional[str]]) -> Iterator[Dict[str, Any]]:
+        """A /v1/risk/batch result per row, scored together and handed out one at a time"""
+        scores, postcode_rows = self._score(postcodes, brands, models)
+        scores, postcode_rows = to_lists(scores), postcode_rows.tolist()
+        suburbs, lgas = self.store.postcodes.columns["suburb"], self.store.postcodes.columns["lga"]
+        for n, (postcode, brand, model, row) in enumerate(zip(postcodes, brands, models, postcode_rows)):
+            yield {
+                "postcode": postcode,
+                "suburb": suburbs[row] if row >= 0 else None,
+                "lga": lgas[row] if row >= 0 else None,
+                "risk_score": scores["postcode_risk"][n],
+                "postcode_found": scores["postcode_found"][n],
+                "brand": brand,
+                "model": model,
+                "model_risk": scores["model_risk"][n],
+                "model_found": scores["model_found"][n]
+            }
+
+    def _score(self, postcodes, brands, models) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        postcode_rows, model_rows, motorcycle = self._resolve(postcodes, brands, models)
+        postcode_risk = self._postcode_risk[postcode_rows]
+        model_risk = np.where(motorcycle, self._model_risk[model_rows], np.nan)
+        return {
+            "postcode_risk": postcode_risk,
+            "model_risk": model_risk,
+            "combined_risk": 1 - (1 - postcode_risk) * (1 - np.where(motorcycle, model_risk, 0.0)),
+            "postcode_found": postcode_rows >= 0,
+            "model_found": model_rows >= 0
+        }, postcode_rows
+
+    def _resolve(self, postcodes, brands=None, models=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Reference row of each postcode and model (-1 when unknown), and which rows have a motorcycle"""
+        distinct, rows = _factorise(postcodes)
+        size = len(rows)
+        queries = np.array([postcode_key(value) for value in distinct], dtype=str)
+        postcode_rows = _lookup(self._postcode_keys, self._postcode_rows, queries)[rows]
+
+        if brands is None or models is None:
+            return postcode_rows, np.full(size, -1, dtype=np.intp), np.zeros(size, dtype=bool)
+        if len(brands) != size or len(models) != size:
+            raise ValueError("postcodes, brands and models must be the same length")
+        distinct, rows = _factorise(zip(_as_list(brands), _as_list(models)), size)
+        motorcycle = np.array([is_motorcycle(*bike) for bike in distinct], dtype=bool)
+        # A row without a motorcycle gets a key nothing matches
+        queries = np.array([
+            KEY_SEPARATOR.join(model_name_key(*bike)) if ok else KEY_SEPARATOR for bike, ok in zip(distinct, motorcycle)
+        ], dtype=str)
+        model_rows = _lookup(self._model_keys, self._model_rows, queries)[rows]
+        return postcode_rows, model_rows, motorcycle[rows]
+
+
+def to_lists(scores: Dict[str, np.ndarray]) -> Dict[str, List[Any]]:
+    """Score arrays as lists, with model_risk and model_found None for rows without a motorcycle"""
+    lists = {column: values.tolist() for column, values in scores.items()}
+    no_motorcycle = np.isnan(scores["model_risk"])
+    if no_motorcycle.any():
+        for n in np.flatnonzero(no_motorcycle).tolist():
+            lists["model_risk"][n] = lists["model_found"][n] = None
+    return lists
+
+
+def _as_list(values):
+    # Iterating a NumPy array yields NumPy scalars one at a time, a list is much quicker to walk
+    return values.tolist() if isinstance(values, np.ndarray) else values
+
+
+def _factorise(values, size: Optional[int] = None) -> Tuple[list, np.ndarray]:
+    """The distinct values in first seen order, and each row's index into them"""
+    codes: Dict = {}
+    if size is None:
+        values = _as_list(values)
+        size = len(values)
+    rows = np.fromiter(map(lambda value: codes.setdefault(value, len(codes)), values), dtype=np.intp, count=size)
+    return list(codes), rows
+
+
+def _lookup(keys: np.ndarray, rows: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """The row of each query found in the sorted keys, -1 for the rest"""
+    if len(keys) == 0:
+        return np.full(len(queries), -1, dtype=np.intp)
+    i = np.minimum(np.searchsorted(keys, queries), len(keys) - 1)
+    return np.where(keys[i] == queries, rows[i], -1)
+
+
+def _risk_column(column: Sequence[Optional[float]], default: float) -> np.ndarray:
+    return np.array([np.nan if value is None else value for value in column] + [default], dtype=float)
@@ -0,0 +1,125 @@
+from bisect import bisect_left
+from heapq import nsmallest
+from typing import Dict, Any, List, Iterable, Set
+
+from db_interface import DatabaseInterface
+
+# Substrings up to this length are looked up directly in the n-gram map, longer ones intersect
+# the sets of their n-grams and are then verified against the candidates
+MAX_GRAM = 3
+
+
+class SuburbSearchIndex:
+    """
+    In-process search over postcode_risk for /v1/search, built once at startup.
+
+    Localities and postcodes are kept in sorted arrays so prefix matches are a binary search, and
+    every 1..MAX_GRAM character substring maps to the entries containing it for substring matches.
+    Results are the same set the old `locality LIKE '%q%' OR postcode LIKE '%q%'` query returned,
+    but ranked: exact matches, then prefix matches, then any other substring match.
+    """
+    def __init__(self, rows: Iterable[Dict[str, Any]]):
+        self.entries: List[Dict[str, Any]] = []
+        seen = set()
+        for row in rows:
+            key = (row["postcode"], row["suburb"])
+            if key in seen:
+                continue
+            seen.add(key)
+            self.entries.append(row)
+
+        localities = sorted((entry["suburb"].lower(), i) for i, entry in enumerate(self.entries))
+        self._locality_keys = [key for key, _ in localities]
+        self._locality_ids = [i for _, i in localities]
+        # Alphabetical position of each entry, used to order substring matches
+        self._order = [0] * len(self.entries)
+        for pos, i in enumerate(self._locality_ids):
+            self._order[i] = pos
+
+        postcodes = sorted((entry["postcode"], i) for i, entry in enumerate(self.entries))
+        self._postcode_keys = [key for key, _ in postcodes]
+        self._postcode_ids = [i for _, i in postcodes]
+
+        self._grams: Dict[str, Set[int]] = {}
+        for i, entry in enumerate(self.entries):
+            for text in (entry["suburb"].lower(), entry["postcode"]):
+                for gram in _grams(text):
+                    self._grams.setdefault(gram, set()).add(i)
+
+    @classmethod
+    def load(cls, db: DatabaseInterface) -> "SuburbSearchIndex":
+        return cls(db.fetch_all("""
+            SELECT locality as suburb, postcode, local_government_area as lga, postcode_risk as risk_score
+            FROM postcode_risk
+            ORDER BY rowid
+        """))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def search(self, q: str, limit: int = 20) -> List[Dict[str, Any]]:
+        q = q.lower()
+        if not q:
+            return []
+
+        results: List[int] = []
+        seen: Set[int] = set()
+
+        def add(ids: Iterable[int]) -> bool:
+            for i in ids:
+                if i not in seen:
+                    seen.add(i)
+                    results.append(i)
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        exact = self._prefix(self._locality_keys, self._locality_ids, q, limit, exact=True) + \
+            self._prefix(self._postcode_keys, self._postcode_ids, q, limit, exact=True)
+        if add(exact):
+            return self._rows(results)
+
+        # Exact matches are also prefixes, so ask for enough to fill the page after they're skipped
+        wanted = limit + len(results)
+        prefixed = self._prefix(self._locality_keys, self._locality_ids, q, wanted) + \
+            self._prefix(self._postcode_keys, self._postcode_ids, q, wanted)
+        if add(prefixed):
+            return self._rows(results)
+
+        add(nsmallest(limit - len(results), self._substring(q) - seen, key=self._order.__getitem__))
+        return self._rows(results)
+
+    def _prefix(self, keys: List[str], ids: List[int], q: str, limit: int, exact: bool = False) -> List[int]:
+        matches = []
+        for pos in range(bisect_left(keys, q), len(keys)):
+            key = keys[pos]
+            if not key.startswith(q) or (exact and key != q) or len(matches) >= limit:
+                break
+            matches.append(ids[pos])
+        return matches
+
+    def _substring(self, q: str) -> Set[int]:
+        if len(q) <= MAX_GRAM:
+            return self._grams.get(q, set())
+
+        candidates = None
+        for gram in {q[i:i + MAX_GRAM] for i in range(len(q) - MAX_GRAM + 1)}:
+            ids = self._grams.get(gram)
+            if not ids:
+                return set()
+            candidates = set(ids) if candidates is None else candidates & ids
+        return {
+            i for i in candidates
+            if q in self.entries[i]["suburb"].lower() or q in self.entries[i]["postcode"]
+        }
+
+    def _rows(self, ids: List[int]) -> List[Dict[str, Any]]:
+        return [self.entries[i] for i in ids]
+
+
+def _grams(text: str) -> Set[str]:
+    return {
+        text[start:start + size]
+        for size in range(1, MAX_GRAM + 1)
+        for start in range(len(text) - size + 1)
+    }
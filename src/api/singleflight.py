@@ -0,0 +1,76 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def flight_key(route: str, **params: Any) -> Tuple[Hashable, ...]:
+    """Key for a request to route, with its already validated parameters in a fixed order"""
+    return (route, *sorted(params.items()))
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent work. The first caller for a key runs the function, everyone who
+    asks for the same key while it's running waits and gets the same result, or the same exception.
+    Nothing is kept afterwards, the next call for the key runs it again.
+
+    Routes run on FastAPI's threadpool, so waiters block on an Event. The result is shared, callers
+    must treat it as read only.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self._coalesced_by_route: Dict[str, int] = {}
+
+    def do(self, key: Tuple[Hashable, ...], fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+                self._coalesced_by_route[key[0]] = self._coalesced_by_route.get(key[0], 0) + 1
+
+        return self._lead(key, call, fn) if leader else self._wait(call)
+
+    def _lead(self, key, call: _Call, fn: Callable[[], T]) -> T:
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    @staticmethod
+    def _wait(call: _Call):
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+                "coalesced_by_route": dict(self._coalesced_by_route)
+            }
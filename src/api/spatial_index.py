@@ -0,0 +1,180 @@
+import math
+from heapq import heappush, heappushpop
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+from db_interface import DatabaseInterface
+
+EARTH_RADIUS_METERS = 6371000.0
+# Points per KD-tree leaf, scanning a small bucket is cheaper than descending further in Python
+LEAF_SIZE = 16
+
+
+class PostcodeSpatialIndex:
+    """
+    In-process nearest neighbour search over the postcode_risk localities, built once at startup.
+
+    Every locality is placed on the unit sphere and kept in a KD-tree. The straight line (chord)
+    distance between two points on the sphere grows with the great circle distance, so the tree can
+    search in plain 3D and the result is converted back to haversine meters at the end. This replaces
+    the N² postcode_distances table.
+    """
+    def __init__(self, rows: Iterable[Dict[str, Any]]):
+        self.entries: List[Dict[str, Any]] = []
+        # Localities often share their postcode's coordinates, so each distinct point is stored once
+        # with the entries found there
+        self._points: List[Tuple[float, float, float]] = []
+        self._point_entries: List[List[int]] = []
+        point_ids: Dict[Tuple[float, float, float], int] = {}
+        # Where each postcode is measured from, its first locality like the feed's current location
+        self._origins: Dict[str, int] = {}
+        seen = set()
+        for row in rows:
+            key = (row["postcode"], row["suburb"])
+            if key in seen or row["lat"] in (None, "") or row["long"] in (None, ""):
+                continue
+            seen.add(key)
+            point = _unit_vector(float(row["lat"]), float(row["long"]))
+            if point not in point_ids:
+                point_ids[point] = len(self._points)
+                self._points.append(point)
+                self._point_entries.append([])
+            self._point_entries[point_ids[point]].append(len(self.entries))
+            self._origins.setdefault(row["postcode"], len(self.entries))
+            self.entries.append({
+                "postcode": row["postcode"],
+                "suburb": row["suburb"],
+                "lga": row["lga"],
+                "risk_score": row["risk_score"]
+            })
+
+        self._entry_points = [0] * len(self.entries)
+        for point, ids in enumerate(self._point_entries):
+            for i in ids:
+                self._entry_points[i] = point
+        self._risk = [entry["risk_score"] for entry in self.entries]
+        self._postcodes = [entry["postcode"] for entry in self.entries]
+        # Lets a whole point be skipped when nothing there is safe enough
+        self._point_min_risk = [min(self._risk[i] for i in ids) for ids in self._point_entries]
+        # Inner node i splits on _node_axis[i] at _node_split[i] into _node_left[i]/_node_right[i],
+        # leaves have an axis of -1 and their points in _node_bucket[i]
+        self._node_axis: List[int] = []
+        self._node_split: List[float] = []
+        self._node_left: List[int] = []
+        self._node_right: List[int] = []
+        self._node_bucket: List[List[int]] = []
+        self._root = self._build(list(range(len(self._points))), 0)
+
+    @classmethod
+    def load(cls, db: DatabaseInterface) -> "PostcodeSpatialIndex":
+        return cls(db.fetch_all("""
+            SELECT postcode, locality as suburb, local_government_area as lga, postcode_risk as risk_score, lat, long
+            FROM postcode_risk
+            ORDER BY rowid
+        """))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _build(self, ids: List[int], depth: int) -> int:
+        node = len(self._node_axis)
+        self._node_axis.append(-1)
+        self._node_split.append(0.0)
+        self._node_left.append(-1)
+        self._node_right.append(-1)
+        self._node_bucket.append(ids)
+        if len(ids) <= LEAF_SIZE:
+            return node
+
+        axis = depth % 3
+        ids.sort(key=lambda i: self._points[i][axis])
+        middle = len(ids) // 2
+        self._node_axis[node] = axis
+        self._node_split[node] = self._points[ids[middle]][axis]
+        self._node_bucket[node] = []
+        self._node_left[node] = self._build(ids[:middle], depth + 1)
+        self._node_right[node] = self._build(ids[middle:], depth + 1)
+        return node
+
+    def location(self, postcode: str) -> Optional[Dict[str, Any]]:
+        origin = self._origins.get(postcode)
+        return self.entries[origin] if origin is not None else None
+
+    def nearest(
+        self,
+        postcode: str,
+        k: int = 20,
+        max_risk: Optional[float] = None,
+        radius: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        The k localities nearest to postcode, outside of it, with a risk_score below max_risk and no
+        further than radius meters. Each comes back as its entry plus distance_in_meters, closest first.
+        """
+        origin = self._origins.get(postcode)
+        if origin is None or k <= 0:
+            return []
+
+        qx, qy, qz = query = self._points[self._entry_points[origin]]
+        points, point_entries, point_min_risk = self._points, self._point_entries, self._point_min_risk
+        risk, postcodes = self._risk, self._postcodes
+        node_axis, node_split, node_bucket = self._node_axis, self._node_split, self._node_bucket
+        node_left, node_right = self._node_left, self._node_right
+        if max_risk is None:
+            max_risk = math.inf
+
+        # Squared chord distance, anything further than this can't be returned
+        bound = math.inf
+        if radius is not None and radius < math.pi * EARTH_RADIUS_METERS:
+            bound = (2 * math.sin(radius / (2 * EARTH_RADIUS_METERS))) ** 2
+        limit = bound
+        # Max heap of the best k so far as (-distance, -id), the worst one sits on top
+        best: List[Tuple[float, int]] = []
+
+        def visit(node: int):
+            nonlocal bound
+            axis = node_axis[node]
+            if axis < 0:
+                for p in node_bucket[node]:
+                    if point_min_risk[p] >= max_risk:
+                        continue
+                    x, y, z = points[p]
+                    distance = (x - qx) ** 2 + (y - qy) ** 2 + (z - qz) ** 2
+                    if distance > bound:
+                        continue
+                    for i in point_entries[p]:
+                        if postcodes[i] == postcode or risk[i] >= max_risk:
+                            continue
+                        if len(best) < k:
+                            heappush(best, (-distance, -i))
+                        else:
+                            heappushpop(best, (-distance, -i))
+                        if len(best) == k:
+                            bound = min(limit, -best[0][0])
+                return
+
+            diff = query[axis] - node_split[node]
+            if diff < 0:
+                visit(node_left[node])
+                if diff * diff <= bound:
+                    visit(node_right[node])
+            else:
+                visit(node_right[node])
+                if diff * diff <= bound:
+                    visit(node_left[node])
+
+        if self._points:
+            visit(self._root)
+
+        return [
+            {**self.entries[-i], "distance_in_meters": round(_chord_to_meters(-distance), 2)}
+            for distance, i in sorted(best, reverse=True)
+        ]
+
+
+def _unit_vector(lat: float, long: float) -> Tuple[float, float, float]:
+    lat, long = math.radians(lat), math.radians(long)
+    return (math.cos(lat) * math.cos(long), math.cos(lat) * math.sin(long), math.sin(lat))
+
+
+def _chord_to_meters(squared_chord: float) -> float:
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(squared_chord) / 2))
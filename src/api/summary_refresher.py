@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from typing import Dict, Optional
+
+from db_interface import DatabaseInterface
+
+logger = logging.getLogger(__name__)
+
+# How often the submissions count is recomputed in the background
+REFRESH_INTERVAL_SECONDS = 300
+# Stamped into build_info by src/data/stamp_build.sql, these only change with a rebuild
+STATIC_COUNT_QUERIES = {
+    "total_postcodes": "SELECT COUNT(DISTINCT postcode) AS count FROM postcode_risk",
+    "total_addresses": "SELECT COUNT(*) AS count FROM victorian_addresses",
+    "total_lgas": "SELECT COUNT(*) AS count FROM lga_risk"
+}
+
+
+def load_static_counts(db: DatabaseInterface) -> Dict[str, int]:
+    """
+    The rebuild-only counts of the statistics summary from build_info. A database built without
+    stamp_build.sql has them counted here instead, once.
+    """
+    try:
+        rows = db.fetch_all(
+            "SELECT key, value FROM build_info WHERE key IN ('total_postcodes', 'total_addresses', 'total_lgas')"
+        )
+    except Exception:
+        rows = []
+    counts = {row["key"]: int(row["value"]) for row in rows}
+
+    for key, query in STATIC_COUNT_QUERIES.items():
+        if key in counts:
+            continue
+        logger.warning(f"{key} isn't stamped into hotspot.db, counting it at startup")
+        try:
+            counts[key] = db.fetch_all(query)[0]["count"]
+        except Exception as e:
+            logger.warning(f"Could not count {key}: {e}")
+            counts[key] = 0
+    return counts
+
+
+class SummaryRefresher:
+    """
+    Holds /v1/statistics/summary in memory so requests never compute it.
+
+    The static counts are read once by start(), then a background task recomputes the submissions
+    count every interval seconds off the request path. A refresh that fails keeps serving the last
+    good value.
+    """
+    def __init__(self, db: DatabaseInterface, interval: float = REFRESH_INTERVAL_SECONDS):
+        self.db = db
+        self.interval = interval
+        self.summary: Optional[Dict[str, int]] = None
+        self.refreshed_at: Optional[float] = None
+        self.refreshes = 0
+        self.failures = 0
+        self._static: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def refresh(self) -> Dict[str, int]:
+        """Recomputes the summary, blocking, and returns what will be served"""
+        try:
+            submissions = self.db.get_parking_submissions_count()
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Error fetching submission count: {e}")
+            if self.summary is not None:
+                return self.summary
+            submissions = 0
+
+        self.summary = {**self._static, "total_submissions": submissions}
+        self.refreshed_at = time.time()
+        self.refreshes += 1
+        return self.summary
+
+    async def start(self):
+        self._static = await asyncio.to_thread(load_static_counts, self.db)
+        await asyncio.to_thread(self.refresh)
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception:
+                logger.exception("Statistics refresh failed, serving the last summary")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"refreshes": self.refreshes, "failures": self.failures}
@@ -0,0 +1,46 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+DATA = Path(__file__).resolve().parents[2] / "data"
+
+# Allow tests to import the API modules (main, db_interface, ...) directly
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# and the database build's address_keys
+sys.path.insert(0, str(DATA / "scripts"))
+
+from db_interface import SQLiteDatabase  # noqa: E402
+
+CREATE_TABLES = DATA / "create_tables.sql"
+CREATE_INDEXES = DATA / "create_indexes.sql"
+
+
+def contribution(**overrides):
+    """A valid contribution for one address, with any fields swapped out"""
+    return {
+        "address": "1838 ABBEYARD ROAD",
+        "suburb": "ABBEYARD",
+        "postcode": "3737",
+        "type": "off-street",
+        "lighting": 3,
+        "cctv": True,
+        **overrides,
+    }
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A scratch hotspot.db with the tables from create_tables.sql and nothing in them"""
+    db_path = tmp_path / "hotspot.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(CREATE_TABLES.read_text())
+    return db_path
+
+
+@pytest.fixture
+def db(db_path):
+    database = SQLiteDatabase(str(db_path))
+    yield database
+    database.pool.close_all()
@@ -0,0 +1,47 @@
+import sqlite3
+import sys
+
+import pytest
+
+from address_keys import add_address_keys
+from conftest import CREATE_INDEXES, CREATE_TABLES
+from db_interface import SQLiteDatabase, normalise_address_key
+
+# Every character str.split() breaks on, the ASCII ones and the likes of NBSP and the ideographic space
+WHITESPACE = [chr(c) for c in range(sys.maxunicode + 1) if chr(c).isspace()]
+ADDRESSES = [
+    ("1" + " " * 40 + "MAIN STREET", "RICHMOND"),
+    ("2 MAIN" + "\t \r\n" * 10 + "STREET", " RICHMOND" + " " * 17),
+    ("3 Main Street", "North　Melbourne"),
+] + [(f"{n + 10} HIGH{space * 3}STREET", f"SOUTH{space}YARRA") for n, space in enumerate(WHITESPACE)]
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    """A scratch database built the way the Makefile builds hotspot.db, keys from address_keys.py"""
+    path = tmp_path_factory.mktemp("address_keys") / "hotspot.db"
+    with sqlite3.connect(path) as conn:
+        conn.executescript(CREATE_TABLES.read_text())
+        conn.executemany(
+            "INSERT INTO victorian_addresses (address, suburb, postcode) VALUES (?, ?, '3121')", ADDRESSES
+        )
+        add_address_keys(conn)
+        conn.executescript(CREATE_INDEXES.read_text())
+    database = SQLiteDatabase(str(path))
+    yield database
+    database.pool.close_all()
+
+
+def test_stored_keys_are_normalise_address_key(db):
+    rows = db.fetch_all("SELECT address, suburb, address_key, suburb_key FROM victorian_addresses")
+    assert len(rows) == len(ADDRESSES)
+    for row in rows:
+        assert row["address_key"] == normalise_address_key(row["address"])
+        assert row["suburb_key"] == normalise_address_key(row["suburb"])
+
+
+@pytest.mark.parametrize("address, suburb", ADDRESSES)
+def test_every_address_verifies_however_it_is_spaced(db, address, suburb):
+    submitted = " ".join(address.split()).lower()
+    result = db.verify_address(submitted, " ".join(suburb.split()), "3121")
+    assert result == {"address": address, "suburb": suburb, "postcode": "3121"}
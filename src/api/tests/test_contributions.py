@@ -0,0 +1,70 @@
+import sqlite3
+
+import pytest
+
+from conftest import contribution
+
+
+def facility_ids(db, parking_id):
+    return sorted(f["facility_id"] for f in db.get_facilities_for_parking(parking_id))
+
+
+def test_upsert_actions(db):
+    first = db.upsert_parking_contribution(contribution(), [1, 2])
+    assert first["action"] == "inserted"
+
+    assert db.upsert_parking_contribution(contribution(), [2, 1]) == {**first, "action": "no_change"}
+    assert db.upsert_parking_contribution(contribution(type="secure"), [1, 2]) == {**first, "action": "updated"}
+    assert db.upsert_parking_contribution(contribution(type="secure"), [3]) == {**first, "action": "updated"}
+    assert facility_ids(db, first["parking_id"]) == [3]
+
+    other = db.upsert_parking_contribution(contribution(address="1 MAIN STREET"))
+    assert other["action"] == "inserted"
+    assert other["parking_id"] != first["parking_id"]
+    # The same thread inserting last doesn't make a later update look like an insert
+    assert db.upsert_parking_contribution(contribution(address="1 MAIN STREET", cctv=False))["action"] == "updated"
+    assert db.get_parking_submissions_count() == 2
+
+
+def test_insert_after_facilities_is_an_insert(db):
+    for n in range(2):
+        db.upsert_parking_contribution(contribution(address=f"{n} MAIN STREET"))
+    # Leaves the facility rows' last rowid at 4, the parking_id the next new address gets
+    db.upsert_parking_contribution(contribution(), [1, 2, 3, 4])
+
+    assert db.upsert_parking_contribution(contribution(address="3 MAIN STREET")) == {"parking_id": 4, "action": "inserted"}
+
+
+def test_upsert_rolls_back_on_error(db):
+    with pytest.raises(sqlite3.IntegrityError):
+        db.upsert_parking_contribution(contribution(type="garage"), [1])
+    assert db.get_parking_submissions_count() == 0
+    assert db.upsert_parking_contribution(contribution())["action"] == "inserted"
+
+
+def test_facilities_for_parkings_in_one_query(db):
+    first = db.upsert_parking_contribution(contribution(), [3, 1])
+    second = db.upsert_parking_contribution(contribution(address="1 MAIN STREET"))
+
+    facilities = db.get_facilities_for_parkings(db.get_parking_by_postcode("3737"))
+    assert facilities == {
+        first["parking_id"]: [
+            {"facility_id": 1, "facility_name": "Toilet"},
+            {"facility_id": 3, "facility_name": "Lockers"},
+        ],
+        second["parking_id"]: [],
+    }
+    assert db.get_facilities_for_parkings([]) == {}
+
+
+def test_parking_counts_follow_writes(db):
+    for n in range(3):
+        db.upsert_parking_contribution(contribution(address=f"{n} MAIN STREET"))
+    db.upsert_parking_contribution(contribution(address="0 MAIN STREET", type="secure"))
+    db.upsert_parking_contribution(contribution(postcode="3000", suburb="MELBOURNE"))
+
+    assert db.get_parking_counts(["3737", "3000", "3001"]) == {"3737": 3, "3000": 1, "3001": 0}
+    assert db.get_parking_submissions_count() == 4
+
+    db.execute("DELETE FROM user_contribution WHERE postcode = '3000'")
+    assert db.get_parking_counts(["3000"]) == {"3000": 0}
@@ -0,0 +1,287 @@
+import threading
+import time
+
+import pytest
+
+moto = pytest.importorskip("moto")
+
+from conftest import contribution
+from db_interface import (
+    PARKING_ID_BLOCK_SIZE, ContributionCache, ParkingIdAllocator, PersistentDatabase, contributions_table_definition
+)
+
+TABLE_NAME = "user_contributions_test"
+
+
+@pytest.fixture
+def db(db_path, monkeypatch):
+    """PersistentDatabase against a fake DynamoDB, counting every Scan the client sends"""
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"):
+        monkeypatch.setenv(name, "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "ap-southeast-2")
+
+    with moto.mock_aws():
+        database = PersistentDatabase(str(db_path), table_name=TABLE_NAME)
+        database.dynamodb.meta.client.create_table(**contributions_table_definition(TABLE_NAME))
+        database.scans = []
+        database.calls = []
+        events = database.dynamodb.meta.client.meta.events
+        events.register("before-call.dynamodb.Scan", lambda **kwargs: database.scans.append(kwargs))
+        events.register("before-call.dynamodb", lambda model, **kwargs: database.calls.append(model.name))
+        yield database
+        database.pool.close_all()
+
+
+def test_upsert_inserts_then_detects_no_change(db):
+    first = db.upsert_parking_contribution(contribution(), [1])
+    assert first["action"] == "inserted"
+
+    again = db.upsert_parking_contribution(contribution(), [1])
+    assert again == {"parking_id": first["parking_id"], "action": "no_change"}
+    assert db.scans == []
+
+
+def test_upsert_matches_address_regardless_of_case_and_spacing(db):
+    first = db.upsert_parking_contribution(contribution())
+    updated = db.upsert_parking_contribution(
+        contribution(address=" 1838  abbeyard road", suburb="Abbeyard", type="on-street")
+    )
+
+    assert updated == {"parking_id": first["parking_id"], "action": "updated"}
+    assert len(db.get_parking_by_postcode("3737")) == 1
+    assert db.scans == []
+
+
+def test_reads_use_keys_and_indexes(db):
+    first = db.upsert_parking_contribution(contribution(), [1])
+    second = db.upsert_parking_contribution(contribution(address="1 MAIN STREET"))
+    db.upsert_parking_contribution(contribution(postcode="3000", suburb="MELBOURNE"))
+
+    db.insert_parking_facility(first["parking_id"], 2)
+    facilities = db.get_facilities_for_parking(first["parking_id"])
+    assert [f["facility_name"] for f in facilities] == ["Toilet", "Cafe"]
+    assert db.get_facilities_for_parking(999) == []
+
+    recent = db.get_parking_by_postcode("3737")
+    assert [item["parking_id"] for item in recent] == [second["parking_id"], first["parking_id"]]
+
+    db.calls.clear()
+    assert db.get_facilities_for_parkings(recent) == {
+        first["parking_id"]: facilities,
+        second["parking_id"]: [],
+    }
+    assert db.calls == []
+    assert db.scans == []
+
+
+def test_upsert_is_one_conditional_write(db):
+    db.upsert_parking_contribution(contribution(address="1 MAIN STREET"))
+
+    db.calls.clear()
+    first = db.upsert_parking_contribution(contribution(), [2, 1])
+    assert first["action"] == "inserted"
+    # The update finds nothing, then the contribution and the postcode's count go in together
+    assert db.calls == ["UpdateItem", "TransactWriteItems"]
+
+    db.calls.clear()
+    assert db.upsert_parking_contribution(contribution(), [1, 2])["action"] == "no_change"
+    assert db.calls == ["UpdateItem"]
+
+    db.calls.clear()
+    updated = db.upsert_parking_contribution(contribution(lighting=None, cctv=False), [1])
+    assert updated == {"parking_id": first["parking_id"], "action": "updated"}
+    assert db.calls == ["UpdateItem"]
+
+    item = db.table.get_item(Key=db._location(contribution()))["Item"]
+    assert "lighting" not in item
+    assert item["cctv"] is False
+    assert item["facility_ids"] == [1]
+
+
+def test_ids_are_leased_in_blocks(db):
+    ids = [db.upsert_parking_contribution(contribution(address=f"{n} MAIN STREET"))["parking_id"] for n in range(5)]
+    db.upsert_parking_contribution(contribution(address="0 MAIN STREET"))
+
+    assert ids == sorted(ids) and len(set(ids)) == 5
+    assert db.ids.stats() == {
+        "block_size": PARKING_ID_BLOCK_SIZE,
+        "leases": 1,
+        "allocated": 6,
+        "released": 1,
+        "remaining": PARKING_ID_BLOCK_SIZE - 5
+    }
+    assert db.scans == []
+
+
+def test_allocator_refills_after_a_block(db):
+    allocator = ParkingIdAllocator(db.table, db.COUNTER_KEY, block_size=2)
+    other = ParkingIdAllocator(db.table, db.COUNTER_KEY, block_size=2)
+
+    first = [allocator.allocate(), allocator.allocate()]
+    assert other.allocate() not in first
+    assert allocator.allocate() > max(first)
+    assert allocator.stats()["leases"] == 2
+
+    # Only the latest id goes back so the next one is never lower
+    allocator.release(first[0])
+    assert allocator.stats()["released"] == 0
+
+
+def test_parking_counts_are_maintained_on_insert(db):
+    for n in range(3):
+        db.upsert_parking_contribution(contribution(address=f"{n} MAIN STREET"))
+    db.upsert_parking_contribution(contribution(address="0 MAIN STREET", type="secure"))
+    db.upsert_parking_contribution(contribution(postcode="3000", suburb="MELBOURNE"))
+
+    db.calls.clear()
+    postcodes = ["3737", "3000", "3001"] + [f"{n:04d}" for n in range(150)]
+    counts = db.get_parking_counts(postcodes)
+    assert counts["3737"] == 3 and counts["3000"] == 1
+    assert sum(counts.values()) == 4
+    assert db.calls == ["BatchGetItem", "BatchGetItem"]
+
+
+def test_insert_never_overwrites_or_double_counts(db):
+    first = db.insert_parking_contribution(contribution(), [1])
+
+    with pytest.raises(ValueError):
+        db.insert_parking_contribution(contribution(address=" 1838 abbeyard road", type="secure"))
+
+    item = db.table.get_item(Key=db._location(contribution()))["Item"]
+    assert (item["parking_id"], item["type"]) == (first, "off-street")
+    assert db.get_parking_counts(["3737"]) == {"3737": 1}
+    assert db.ids.stats()["released"] == 1
+
+
+def test_upsert_falls_back_to_the_update_when_another_writer_inserts_first(db, monkeypatch):
+    other = db.insert_parking_contribution(contribution())
+    # As if the other insert landed between this upsert's update finding nothing and its transaction
+    updates = iter([db.dynamodb.meta.client.exceptions.ConditionalCheckFailedException(
+        {"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem"
+    )])
+    update_item = db.table.update_item
+
+    def racing_update_item(**kwargs):
+        for error in updates:
+            raise error
+        return update_item(**kwargs)
+
+    monkeypatch.setattr(db.table, "update_item", racing_update_item)
+    assert db.upsert_parking_contribution(contribution(type="secure")) == {"parking_id": other, "action": "updated"}
+    assert db.get_parking_counts(["3737"]) == {"3737": 1}
+
+
+def test_migration_into_a_table_the_api_already_writes_to(db, monkeypatch):
+    import migrate_contributions_ddb
+
+    source = db.dynamodb.create_table(
+        TableName="user_contributions_old",
+        KeySchema=[{"AttributeName": "postcode", "KeyType": "HASH"}, {"AttributeName": "parking_id", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "postcode", "AttributeType": "S"}, {"AttributeName": "parking_id", "AttributeType": "N"}],
+        BillingMode="PAY_PER_REQUEST"
+    )
+    old = [contribution(), contribution(address="1 MAIN STREET"), contribution(postcode="3000", suburb="MELBOURNE")]
+    for n, item in enumerate(old, start=1):
+        source.put_item(Item={**item, "parking_id": n, "created_at": f"2024-01-0{n}T00:00:00"})
+
+    # The API got to the first address in the new table before the migration ran
+    api = db.upsert_parking_contribution(contribution(type="secure"))
+    monkeypatch.setattr("sys.argv", ["migrate", "--source", "user_contributions_old", "--target", TABLE_NAME, "--apply"])
+    migrate_contributions_ddb.main()
+    # and running it again changes nothing
+    migrate_contributions_ddb.main()
+
+    item = db.table.get_item(Key=db._location(contribution()))["Item"]
+    assert (item["parking_id"], item["type"]) == (api["parking_id"], "secure")
+    assert db.get_parking_counts(["3737", "3000"]) == {"3737": 2, "3000": 1}
+
+
+def test_carpark_upload_skips_addresses_that_already_exist(db):
+    import upload_carparks_to_ddb
+
+    existing = db.upsert_parking_contribution(contribution())
+    carpark = {"address": "1838 Abbeyard Road", "suburb": "Abbeyard", "postcode": "3737", "type": "secure"}
+    assert upload_carparks_to_ddb.put_item(db.table, db.ids, carpark) is None
+    assert upload_carparks_to_ddb.put_item(db.table, db.ids, {**carpark, "address": "1 MAIN STREET"}) is not None
+
+    item = db.table.get_item(Key=db._location(contribution()))["Item"]
+    assert (item["parking_id"], item["type"]) == (existing["parking_id"], "off-street")
+    assert db.get_parking_counts(["3737"]) == {"3737": 2}
+
+
+def test_postcode_reads_are_cached_until_a_write(db):
+    first = db.upsert_parking_contribution(contribution())
+
+    db.calls.clear()
+    assert [item["parking_id"] for item in db.get_parking_by_postcode("3737")] == [first["parking_id"]]
+    db.get_parking_by_postcode("3737")[0]["type"] = "changed by the caller"
+    assert db.get_parking_by_postcode("3737")[0]["type"] == "off-street"
+    assert db.calls == ["Query"]
+
+    # Each kind of write through this process drops the postcode straight away
+    second = db.upsert_parking_contribution(contribution(address="1 MAIN STREET"))
+    assert [item["parking_id"] for item in db.get_parking_by_postcode("3737")] == [second["parking_id"], first["parking_id"]]
+    # An update also moves it to the front
+    db.upsert_parking_contribution(contribution(type="secure"))
+    assert db.get_parking_by_postcode("3737")[0]["type"] == "secure"
+    db.insert_parking_facility(first["parking_id"], 2)
+    assert db.get_parking_by_postcode("3737")[0]["facility_ids"] == [2]
+    third = db.insert_parking_contribution(contribution(address="2 MAIN STREET"))
+    assert db.get_parking_by_postcode("3737")[0]["parking_id"] == third
+
+    stats = db.contribution_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (2, 5, 5)
+    assert stats["read_capacity_saved"] > 0
+    assert db.scans == []
+
+
+def test_contribution_cache_expires(db, monkeypatch):
+    db.upsert_parking_contribution(contribution())
+    db.get_parking_by_postcode("3737")
+    later = time.monotonic() + db.contribution_cache.ttl + 1
+    monkeypatch.setattr(time, "monotonic", lambda: later)
+    db.calls.clear()
+    db.get_parking_by_postcode("3737")
+    assert db.calls == ["Query"]
+
+
+def test_concurrent_misses_share_one_query():
+    cache = ContributionCache(ttl=60)
+    started, release = threading.Event(), threading.Event()
+    loads = []
+
+    def load():
+        loads.append(1)
+        started.set()
+        release.wait(5)
+        return [{"parking_id": 1}], 0.5
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("3737", load))) for _ in range(8)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] < 7 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(loads) == 1
+    assert results == [[{"parking_id": 1}]] * 8
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["read_capacity_saved"]) == (1, 7, 3.5)
+
+
+def test_write_during_a_query_keeps_its_result_out_of_the_cache():
+    cache = ContributionCache(ttl=60)
+
+    def load_then_write():
+        cache.invalidate("3737")
+        return [{"parking_id": 1}], 0.5
+
+    assert cache.get("3737", load_then_write) == [{"parking_id": 1}]
+    assert cache.get("3737", lambda: ([{"parking_id": 2}], 0.5)) == [{"parking_id": 2}]
+    assert cache.get("3737", lambda: ([], 0.5)) == [{"parking_id": 2}]
@@ -6,3 +6,13 @@ def test_health():
     response = requests.get(f"{BASE_URL}/api/health")
     assert response.status_code == 200
     assert response.text == "ok"
+
+def test_metrics_are_served_while_running():
+    before = requests.get(f"{BASE_URL}/api/metrics").json()
+    assert {"singleflight", "sqlite_pool", "statistics_refresher"} <= set(before)
+    assert {"calls", "coalesced", "in_flight"} <= set(before["singleflight"])
+
+    # risk/top goes through the single-flight group, so its counter moves without a restart
+    assert requests.get(f"{BASE_URL}/api/v1/risk/top", params={"itemsPerPage": 1}).status_code == 200
+    after = requests.get(f"{BASE_URL}/api/metrics").json()
+    assert after["singleflight"]["calls"] > before["singleflight"]["calls"]
@@ -0,0 +1,113 @@
+"""
+ETag and Cache-Control on the reference data routes, run in-process against a built hotspot.db so
+database calls can be counted. Build the database first (make -C src/data), or point SQLITE_DB_PATH
+at one.
+"""
+import os
+from pathlib import Path
+
+import pytest
+
+DB_PATH = Path(os.environ.get(
+    "SQLITE_DB_PATH",
+    Path(__file__).resolve().parent.parent.parent / "data" / "hotspot.db"
+)).resolve()
+
+if not DB_PATH.exists() or DB_PATH.stat().st_size == 0:
+    pytest.skip(f"hotspot.db not built at {DB_PATH}", allow_module_level=True)
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+from db_interface import SQLiteConnectionPool, SQLiteDatabase
+from http_cache import ReferenceCacheMiddleware, load_build_id
+
+
+class CountingDatabase(SQLiteDatabase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+
+    def fetch_all(self, query, params=None):
+        self.calls += 1
+        return super().fetch_all(query, params)
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    pool = SQLiteConnectionPool(
+        str(DB_PATH),
+        read_only=True,
+        writable_path=str(tmp_path_factory.mktemp("db") / "contributions.db")
+    )
+    db = CountingDatabase(str(DB_PATH), pool=pool)
+    if load_build_id(db) is None:
+        pytest.skip("hotspot.db was built without stamp_build.sql")
+    original_db = main.app.state.db
+    main.app.state.db = db
+    try:
+        with TestClient(main.app) as client:
+            client.db = db
+            yield client
+    finally:
+        main.app.state.db = original_db
+        pool.close_all()
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/api/v1/search", {"q": "rich"}),
+    ("/api/v1/risk/top", {"scope": "lga"}),
+    ("/api/v1/risk/compare", {"postcode": "3000"}),
+    ("/api/v1/lgas", {}),
+    ("/api/v1/models", {"brand": "honda"}),
+    ("/api/v1/postcode/3000/thefts", {}),
+])
+def test_reference_routes_revalidate_without_database_work(client, path, params):
+    response = client.get(path, params=params)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag.startswith('"') and client.app.state.build_id in etag
+    assert "max-age=" in response.headers["Cache-Control"]
+
+    client.db.calls = 0
+    response = client.get(path, params=params, headers={"If-None-Match": f'"stale", {etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert client.db.calls == 0
+
+    response = client.get(path, params=params, headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+
+
+def test_other_routes_and_errors_are_not_cached(client):
+    for path in ("/api/v1/postcode/3000/feed", "/api/v1/statistics/summary", "/api/v1/postcode/0000/thefts"):
+        response = client.get(path)
+        assert "ETag" not in response.headers
+        assert "Cache-Control" not in response.headers
+
+    response = client.get("/api/v1/search")
+    assert response.status_code == 422
+    assert "ETag" not in response.headers
+
+
+def test_wildcard_if_none_match_still_runs_the_route(client):
+    # "*" would say the resource exists, which the route hasn't checked yet
+    for path, status in (("/api/v1/postcode/0000/thefts", 404), ("/api/v1/search", 422), ("/api/v1/lgas", 200)):
+        assert client.get(path, headers={"If-None-Match": "*"}).status_code == status
+
+
+def test_new_deploy_changes_the_etag(client):
+    etag = client.get("/api/v1/lgas").headers["ETag"]
+    assert client.app.state.deploy_id in etag
+
+    # The same data served by different code mustn't revalidate
+    app = FastAPI()
+    app.state.build_id = client.app.state.build_id
+    app.get("/api/v1/lgas")(lambda: [])
+    app.add_middleware(ReferenceCacheMiddleware, version=client.app.version, deploy_id="next-sha")
+    with TestClient(app) as other:
+        response = other.get("/api/v1/lgas", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag and "next-sha" in response.headers["ETag"]
@@ -87,3 +87,22 @@ def test_model_details_valid():
 
 
 
+
+def test_list_models_cursor_pages():
+    params = {"sort": "brand"}
+    everything = requests.get(f"{BASE_URL}/api/v1/models", params=params).json()
+
+    seen, cursor = [], None
+    while True:
+        response = requests.get(f"{BASE_URL}/api/v1/models", params={**params, "limit": 10, "cursor": cursor})
+        assert response.status_code == 200
+        assert int(response.headers["X-Total-Count"]) == len(everything)
+        seen.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == everything
+
+def test_list_models_bad_cursor():
+    response = requests.get(f"{BASE_URL}/api/v1/models", params={"cursor": "garbage"})
+    assert response.status_code == 400
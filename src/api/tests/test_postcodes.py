@@ -75,3 +75,30 @@ def test_feed_postcode_numeric_edge_cases():
 
 
 
+
+
+def test_feed_nearest_count_and_radius():
+    response = requests.get(f"{BASE_URL}/api/v1/postcode/3000/feed", params={"k": 5, "maxRisk": 1})
+    assert response.status_code == 200
+    nearest = response.json()["nearest_safer_suburbs"]
+    assert len(nearest) == 5
+    distances = [suburb["distance_in_meters"] for suburb in nearest]
+    assert distances == sorted(distances)
+
+    response = requests.get(f"{BASE_URL}/api/v1/postcode/3000/feed", params={"k": 100, "radius": 5000, "maxRisk": 1})
+    assert response.status_code == 200
+    nearest = response.json()["nearest_safer_suburbs"]
+    assert nearest and all(suburb["distance_in_meters"] <= 5000 for suburb in nearest)
+    assert all(suburb["postcode"] != "3000" for suburb in nearest)
+
+
+def test_feed_max_risk():
+    response = requests.get(f"{BASE_URL}/api/v1/postcode/3000/feed", params={"maxRisk": 0.1})
+    assert response.status_code == 200
+    assert all(suburb["risk_score"] < 0.1 for suburb in response.json()["nearest_safer_suburbs"])
+
+
+def test_feed_invalid_spatial_params():
+    for params in ({"k": 0}, {"k": 101}, {"radius": 0}, {"maxRisk": 2}):
+        response = requests.get(f"{BASE_URL}/api/v1/postcode/3000/feed", params=params)
+        assert response.status_code == 422
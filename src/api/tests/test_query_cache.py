@@ -0,0 +1,114 @@
+import sqlite3
+
+import pytest
+
+from db_interface import QueryCache, SQLiteDatabase
+
+RISK_QUERY = "SELECT postcode, postcode_risk FROM postcode_risk WHERE postcode = :postcode"
+
+
+def stamp(db_path, build_id):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS build_info (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute("INSERT OR REPLACE INTO build_info (key, value) VALUES ('build_id', ?)", (build_id,))
+
+
+@pytest.fixture
+def db_path(db_path):
+    """The scratch database with some postcode_risk rows, stamped as the first build"""
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO postcode_risk (postcode, locality, local_government_area, postcode_risk) VALUES (?, ?, ?, ?)",
+            [(str(3000 + i), f"SUBURB {i}", "MELBOURNE", i / 100) for i in range(50)]
+        )
+    stamp(db_path, "first")
+    return db_path
+
+
+def cached_db(db_path, **options):
+    return SQLiteDatabase(str(db_path), query_cache=QueryCache(**{"max_entries": 100, **options}))
+
+
+def test_repeated_reads_are_cached(db_path):
+    db = cached_db(db_path)
+    first = db.fetch_all(RISK_QUERY, {"postcode": "3001"})
+    # Same statement with different layout is the same entry
+    again = db.fetch_all("SELECT postcode,  postcode_risk\n  FROM postcode_risk WHERE postcode = :postcode", {"postcode": "3001"})
+    assert again == first == [{"postcode": "3001", "postcode_risk": 0.01}]
+    db.fetch_all(RISK_QUERY, {"postcode": "3002"})
+    stats = db.query_cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 2, 0)
+
+    # Callers get their own copy
+    first[0]["postcode_risk"] = 99
+    assert db.fetch_all(RISK_QUERY, {"postcode": "3001"})[0]["postcode_risk"] == 0.01
+    db.pool.close_all()
+
+
+def test_contributions_are_never_cached(db_path):
+    db = cached_db(db_path)
+    assert db.get_parking_submissions_count() == 0
+    db.upsert_parking_contribution({
+        "address": "1 MAIN STREET", "suburb": "SUBURB 1", "postcode": "3001",
+        "type": "off-street", "lighting": 3, "cctv": True
+    })
+    assert db.get_parking_submissions_count() == 1
+    assert len(db.get_parking_by_postcode("3001")) == 1
+    stats = db.query_cache.stats()
+    assert stats["entries"] == 0 and stats["hits"] == 0 and stats["bypasses"] > 0
+    db.pool.close_all()
+
+
+def test_evicts_least_recently_used(db_path):
+    db = cached_db(db_path, max_entries=3)
+    for postcode in ("3001", "3002", "3003"):
+        db.fetch_all(RISK_QUERY, {"postcode": postcode})
+    db.fetch_all(RISK_QUERY, {"postcode": "3001"})
+    db.fetch_all(RISK_QUERY, {"postcode": "3004"})
+    assert db.query_cache.stats()["evictions"] == 1
+
+    # 3002 was the least recently used
+    db.fetch_all(RISK_QUERY, {"postcode": "3001"})
+    db.fetch_all(RISK_QUERY, {"postcode": "3002"})
+    stats = db.query_cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (3, 2, 5)
+    db.pool.close_all()
+
+
+def test_bounded_by_bytes(db_path):
+    db = cached_db(db_path)
+    db.fetch_all(RISK_QUERY, {"postcode": "3001"})
+    one = db.query_cache.stats()["bytes"]
+    db.pool.close_all()
+
+    db = cached_db(db_path, max_bytes=one * 2)
+    for postcode in ("3001", "3002", "3003"):
+        db.fetch_all(RISK_QUERY, {"postcode": postcode})
+    stats = db.query_cache.stats()
+    assert stats["entries"] == 2 and stats["bytes"] <= one * 2 and stats["evictions"] == 1
+
+    # A result bigger than the whole cache isn't kept at all
+    assert len(db.fetch_all("SELECT * FROM postcode_risk")) == 50
+    assert db.query_cache.stats()["entries"] == 2
+    db.pool.close_all()
+
+
+def test_rebuild_invalidates(db_path):
+    db = cached_db(db_path, check_interval=0)
+    assert db.fetch_all(RISK_QUERY, {"postcode": "3001"})[0]["postcode_risk"] == 0.01
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE postcode_risk SET postcode_risk = 0.5 WHERE postcode = '3001'")
+    # Same build, so the cached result still stands
+    assert db.fetch_all(RISK_QUERY, {"postcode": "3001"})[0]["postcode_risk"] == 0.01
+
+    stamp(db_path, "second")
+    assert db.fetch_all(RISK_QUERY, {"postcode": "3001"})[0]["postcode_risk"] == 0.5
+    assert db.query_cache.stats()["invalidations"] == 1
+    db.pool.close_all()
+
+
+def test_cache_is_opt_in(db_path):
+    db = SQLiteDatabase(str(db_path))
+    assert db.query_cache is None
+    assert db.fetch_all(RISK_QUERY, {"postcode": "3001"}) == [{"postcode": "3001", "postcode_risk": 0.01}]
+    db.pool.close_all()
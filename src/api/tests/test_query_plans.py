@@ -0,0 +1,130 @@
+"""
+Runs EXPLAIN QUERY PLAN over every SQL statement the routes issue against a built hotspot.db and
+fails if any of them falls back to a full table SCAN. Build the database first (make -C src/data),
+or point SQLITE_DB_PATH at one.
+"""
+import os
+import re
+from pathlib import Path
+
+import pytest
+
+DB_PATH = Path(os.environ.get(
+    "SQLITE_DB_PATH",
+    Path(__file__).resolve().parent.parent.parent / "data" / "hotspot.db"
+)).resolve()
+
+if not DB_PATH.exists() or DB_PATH.stat().st_size == 0:
+    pytest.skip(f"hotspot.db not built at {DB_PATH}", allow_module_level=True)
+
+from fastapi.testclient import TestClient
+
+import main
+from db_interface import SQLiteConnectionPool, SQLiteDatabase
+
+# Routes that rank, search or aggregate a whole (small) reference table can't avoid reading all of it
+WHOLE_TABLE_READS = {
+    # In-memory indexes and the reference store, loaded once by the app lifespan, which also sums
+    # the statistics summary's submissions count (then again in the background)
+    "startup": {"postcode_risk", "lga_risk", "model_risk", "default_risk", "user_contribution_counts"},
+    # The facilities catalogue is read once on first use and kept in memory
+    "/api/v1/postcode/3737/feed": {"facilities"},
+}
+
+REQUESTS = [
+    ("GET", "/api/v1/search", {"params": {"q": "rich"}}),
+    ("GET", "/api/v1/search", {"params": {"q": "3000"}}),
+    ("GET", "/api/v1/statistics/summary", {}),
+    ("GET", "/api/v1/risk/top", {"params": {"scope": "postcode", "sortBy": "suburb", "search": "mel"}}),
+    ("GET", "/api/v1/risk/top", {"params": {"scope": "lga", "page": 2}}),
+    ("GET", "/api/v1/models", {"params": {"brand": "honda", "sort": "total_desc"}}),
+    ("GET", "/api/v1/models/honda/cbr", {}),
+    ("GET", "/api/v1/postcode/3000/addresses", {}),
+    ("GET", "/api/v1/postcode/3000/addresses", {"params": {"q": "smith"}}),
+    ("GET", "/api/v1/postcode/3000/addresses", {"params": {"q": "12"}}),
+    ("POST", "/api/v1/parking", {"json": {
+        "address": "1838 ABBEYARDS ROAD",
+        "suburb": "ABBEYARD",
+        "postcode": "3737",
+        "type": "secure",
+        "lighting": 3,
+        "cctv": True,
+        "facilities": [1, 2]
+    }}),
+    ("GET", "/api/v1/postcode/3737/feed", {}),
+    ("GET", "/api/v1/postcode/3000/feed", {}),
+    ("GET", "/api/v1/postcode/3000/thefts", {}),
+]
+
+SCAN_PATTERN = re.compile(r"^SCAN (\w+)")
+
+
+class RecordingDatabase(SQLiteDatabase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.route = None
+        self.statements = []
+
+    def fetch_all(self, query, params=None):
+        self.statements.append((self.route, query, params or {}))
+        return super().fetch_all(query, params)
+
+    def execute(self, query, params=None):
+        self.statements.append((self.route, query, params or {}))
+        return super().execute(query, params)
+
+
+@pytest.fixture(scope="module")
+def recorded(tmp_path_factory):
+    # Read-only mode sends the parking submission to a throwaway file instead of hotspot.db
+    pool = SQLiteConnectionPool(
+        str(DB_PATH),
+        read_only=True,
+        writable_path=str(tmp_path_factory.mktemp("db") / "contributions.db")
+    )
+    db = RecordingDatabase(str(DB_PATH), pool=pool)
+    original_db = main.app.state.db
+    main.app.state.db = db
+    try:
+        db.route = "startup"
+        with TestClient(main.app) as client:
+            for method, path, kwargs in REQUESTS:
+                db.route = path
+                response = client.request(method, path, **kwargs)
+                assert response.status_code in (200, 404), f"{method} {path}: {response.text}"
+    finally:
+        main.app.state.db = original_db
+    yield db
+    pool.close_all()
+
+
+def _route_key(path):
+    if path.startswith("/api/v1/models"):
+        return "/api/v1/models" if path == "/api/v1/models" else "/api/v1/models/{brand}/{model}"
+    return path
+
+
+def test_every_route_was_exercised(recorded):
+    routes = {route for route, _, _ in recorded.statements}
+    # Search, risk rankings, models and the statistics summary are answered from memory without touching SQLite
+    in_memory = ("/api/v1/search", "/api/v1/risk/top", "/api/v1/models", "/api/v1/statistics/summary")
+    assert routes == {"startup"} | {path for _, path, _ in REQUESTS if not path.startswith(in_memory)}
+
+
+def test_no_full_table_scans(recorded):
+    conn = recorded.pool.connection()
+    failures = []
+    for route, query, params in recorded.statements:
+        allowed = WHOLE_TABLE_READS.get(_route_key(route), set())
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+        for row in plan:
+            detail = row["detail"]
+            match = SCAN_PATTERN.match(detail)
+            if not match or detail.startswith("SCAN CONSTANT ROW"):
+                continue
+            # Virtual tables (the FTS5 address index) report constrained lookups as "VIRTUAL TABLE INDEX n:<constraints>"
+            if re.search(r"VIRTUAL TABLE INDEX \d+:\S", detail):
+                continue
+            if match.group(1) not in allowed:
+                failures.append(f"{route}: {detail}\n{query.strip()}")
+    assert not failures, "Full table scans found:\n\n" + "\n\n".join(failures)
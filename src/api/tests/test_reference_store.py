@@ -0,0 +1,188 @@
+import random
+import sqlite3
+import threading
+
+import pytest
+
+import reference_store
+from address_keys import add_address_keys
+from conftest import CREATE_INDEXES, CREATE_TABLES
+from reference_store import ReferenceStore, decode_cursor, encode_cursor
+
+
+@pytest.fixture(scope="module")
+def conn():
+    """Synthetic postcode_risk and model_risk with plenty of ties, compared against the SQL the store replaced"""
+    rng = random.Random(3)
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.executescript(CREATE_TABLES.read_text())
+    conn.executemany(
+        "INSERT INTO postcode_risk (postcode, locality, local_government_area, long, lat, motorcycle_theft_rate, postcode_risk) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (str(3000 + n // 3), f"{rng.choice(['NORTH ', 'EAST ', ''])}SUBURB {n % 50}", rng.choice(["Melbourne", "Yarra", "Casey", ""]),
+             rng.uniform(141, 150), rng.uniform(-39, -34), rng.random() * 50, round(rng.random(), 2))
+            for n in range(300)
+        ]
+    )
+    conn.executemany(
+        "INSERT INTO model_risk (brand, model, total, percentage, model_risk) VALUES (?, ?, ?, ?, ?)",
+        [(rng.choice(["Honda", "Yamaha", "KTM"]), f"M{n}", rng.randint(1, 20), rng.random(), round(rng.random(), 1)) for n in range(60)]
+    )
+    conn.execute("INSERT INTO default_risk VALUES (0.01, 0.2)")
+    # The build stages that derive lga_risk
+    add_address_keys(conn)
+    conn.executescript(CREATE_INDEXES.read_text())
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope="module")
+def store(conn):
+    rows = lambda query: [dict(row) for row in conn.execute(query)]
+    return ReferenceStore(
+        rows("SELECT postcode, locality as suburb, local_government_area as lga, long, lat, motorcycle_theft_rate, postcode_risk as risk_score FROM postcode_risk ORDER BY rowid"),
+        rows("SELECT * FROM lga_risk ORDER BY rowid"),
+        rows("SELECT brand, model, total, percentage, model_risk FROM model_risk ORDER BY rowid"),
+        rows("SELECT * FROM default_risk")[0]
+    )
+
+
+def fetch(conn, query, params=None):
+    return [dict(row) for row in conn.execute(query, params or {})]
+
+
+@pytest.mark.parametrize("search", [None, "north", "30", "yarra", "nothing"])
+@pytest.mark.parametrize("column, sql", [("postcode", "postcode"), ("suburb", "locality"), ("lga", "local_government_area"), ("risk_score", "postcode_risk")])
+@pytest.mark.parametrize("descending", [True, False])
+def test_top_postcodes(conn, store, search, column, sql, descending):
+    where = "WHERE postcode LIKE :s OR locality LIKE :s OR local_government_area LIKE :s" if search else ""
+    expected = fetch(conn, f"""
+        SELECT postcode, locality AS suburb, local_government_area AS lga, postcode_risk AS risk_score
+        FROM postcode_risk {where}
+        ORDER BY {sql} {'DESC' if descending else 'ASC'}, rowid
+        LIMIT 20 OFFSET 10
+    """, {"s": f"%{search}%"})
+    total = fetch(conn, f"SELECT COUNT(*) AS count FROM postcode_risk {where}", {"s": f"%{search}%"})[0]["count"]
+    items, count, _ = store.top_postcodes(search, column, descending, offset=10, limit=20)
+    assert (items, count) == (expected, total)
+
+
+@pytest.mark.parametrize("column", ["lga", "postcode_count", "avg_risk"])
+@pytest.mark.parametrize("descending", [True, False])
+def test_lga_rollups(conn, store, column, descending):
+    expected = fetch(conn, f"""
+        SELECT local_government_area AS lga, COUNT(*) AS postcode_count, ROUND(AVG(postcode_risk), 6) AS avg_risk,
+               MIN(postcode_risk) AS min_risk, MAX(postcode_risk) AS max_risk
+        FROM postcode_risk
+        WHERE local_government_area LIKE '%e%'
+        GROUP BY local_government_area
+        ORDER BY {column} {'DESC' if descending else 'ASC'}, MIN(rowid)
+    """)
+    rollups = store.lga_rollups("E", column, descending)
+    assert [{k: v for k, v in row.items() if not k.endswith("_rank")} for row in rollups] == expected
+    top, total, _ = store.top_lgas(None, column, descending, offset=1, limit=2)
+    assert total == 4 and len(top) == 2
+
+
+def test_lga_ranks(store):
+    rollups = store.lga_rollups(None, "avg_risk", descending=True)
+    assert [row["risk_rank"] for row in rollups] == sorted(row["risk_rank"] for row in rollups)
+    assert rollups[0]["risk_rank"] == 1
+    largest = store.lga_rollups(None, "postcode_count", descending=True)[0]
+    assert largest["size_rank"] == 1
+
+
+@pytest.mark.parametrize("descending", [True, False])
+def test_lga_postcodes(conn, store, descending):
+    expected = fetch(conn, f"""
+        SELECT postcode, locality AS suburb, long, lat, postcode_risk AS risk_score
+        FROM postcode_risk WHERE local_government_area = 'Yarra'
+        ORDER BY postcode_risk {'DESC' if descending else 'ASC'}, postcode ASC, rowid
+    """)
+    assert store.lga_postcodes("Yarra", descending) == expected
+    assert store.lga_postcodes("Nowhere", descending) == []
+
+
+@pytest.mark.parametrize("column", ["model_risk", "total", "brand", "model"])
+@pytest.mark.parametrize("descending", [True, False])
+def test_list_models(conn, store, column, descending):
+    expected = fetch(conn, f"""
+        SELECT brand, model, total, percentage, model_risk FROM model_risk
+        WHERE total >= 5 AND brand LIKE '%' || 'honda' || '%' AND model LIKE '%' || '1' || '%'
+        ORDER BY {column} {'DESC' if descending else 'ASC'}, rowid
+        LIMIT 5 OFFSET 1
+    """)
+    models, _, _ = store.list_models("honda", "1", 5, column, descending, offset=1, limit=5)
+    assert models == expected
+
+
+def test_lookups(store):
+    first = store.postcode("3000")
+    assert set(first) == {"postcode", "suburb", "lga", "motorcycle_theft_rate", "risk_score"}
+    assert store.postcode("9999") is None
+    assert store.defaults == {"model_default_risk": 0.01, "postcode_default_risk": 0.2}
+    assert store.model("KTM", "nothing") is None
+    model = store.list_models(None, None, 0, "model", False, offset=0, limit=1)[0][0]
+    assert store.model(model["brand"], model["model"]) == model
+
+
+def test_memory_usage(store):
+    usage = store.memory_usage()
+    assert set(usage) == {"postcode_risk", "lga_risk", "model_risk"}
+    assert all(size > 0 for size in usage.values())
+
+
+@pytest.mark.parametrize("search", [None, "north", "30"])
+@pytest.mark.parametrize("column", ["suburb", "lga", "risk_score"])
+@pytest.mark.parametrize("descending", [True, False])
+def test_cursor_pages_match_offset_pages(store, search, column, descending):
+    expected, total, _ = store.top_postcodes(search, column, descending, limit=None)
+    pages, after = [], None
+    while True:
+        items, count, last = store.top_postcodes(search, column, descending, limit=7, after=after)
+        assert count == total
+        pages.extend(items)
+        if last is None:
+            break
+        # Only the (value, row id) key is carried between pages
+        after = decode_cursor(encode_cursor(column, descending, search, last), column, descending, search)
+    assert pages == expected
+
+
+def test_cursor_must_match_its_query(store):
+    _, _, last = store.top_postcodes(None, "suburb", True, limit=5)
+    cursor = encode_cursor("suburb", True, None, last)
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "suburb", False, None)
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "suburb", True, "mel")
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor", "suburb", True, None)
+    with pytest.raises(ValueError):
+        store.top_postcodes(None, "suburb", True, after=(5, 1))
+
+
+def test_concurrent_searches_share_the_match_cache(store, monkeypatch):
+    # A tiny cache so nearly every search evicts one while other threads are doing the same
+    monkeypatch.setattr(reference_store, "MATCH_CACHE_SIZE", 4)
+    terms = [f"suburb {n}" for n in range(50)] + ["north", "east", "30", "yarra"]
+    expected = {term: store.postcodes.matching(term, ("suburb", "lga"))[1] for term in terms}
+    errors = []
+
+    def search(seed):
+        rng = random.Random(seed)
+        try:
+            for _ in range(300):
+                term = rng.choice(terms)
+                assert store.postcodes.matching(term, ("suburb", "lga"))[1] == expected[term]
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=search, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(store.postcodes._matches) <= 4
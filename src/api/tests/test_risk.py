@@ -1,3 +1,4 @@
+import pytest
 import requests
 
 BASE_URL = "http://localhost:8000"
@@ -63,3 +64,139 @@ def test_risk_top_invalid_params():
     response = requests.get(f"{BASE_URL}/api/v1/risk/top", params=params)
     assert response.status_code in (200, 422)
 
+
+def test_risk_compare():
+    response = requests.get(f"{BASE_URL}/api/v1/risk/compare", params={"postcode": "3000"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["base"]["postcode"] == "3000"
+    assert 0 <= data["base"]["risk_score"] <= 1
+    assert "postcode_default_risk" in data["defaults"]
+
+def test_risk_compare_unknown_postcode():
+    response = requests.get(f"{BASE_URL}/api/v1/risk/compare", params={"postcode": "0000"})
+    assert response.status_code == 404
+
+def test_lga_rollups():
+    response = requests.get(f"{BASE_URL}/api/v1/lgas", params={"sort": "count_desc"})
+    assert response.status_code == 200
+    data = response.json()
+    counts = [item["postcode_count"] for item in data]
+    assert counts and counts == sorted(counts, reverse=True)
+    for item in data:
+        # avg_risk is rounded to 6 places
+        assert item["min_risk"] - 1e-6 <= item["avg_risk"] <= item["max_risk"] + 1e-6
+
+def test_lga_rollups_search():
+    response = requests.get(f"{BASE_URL}/api/v1/lgas", params={"q": "yarra"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data and all("yarra" in item["lga"].lower() for item in data)
+
+def test_lga_postcodes():
+    response = requests.get(f"{BASE_URL}/api/v1/lgas/Melbourne/postcodes", params={"order": "asc"})
+    assert response.status_code == 200
+    risk_scores = [item["risk_score"] for item in response.json()]
+    assert risk_scores and risk_scores == sorted(risk_scores)
+
+    response = requests.get(f"{BASE_URL}/api/v1/lgas/Nowhere/postcodes")
+    assert response.status_code == 404
+
+def test_risk_top_cursor_pages():
+    params = {"sortBy": "suburb", "sortOrder": "asc", "search": "north", "itemsPerPage": 100}
+    everything = requests.get(f"{BASE_URL}/api/v1/risk/top", params=params).json()
+
+    seen, cursor = [], None
+    while True:
+        response = requests.get(f"{BASE_URL}/api/v1/risk/top", params={**params, "itemsPerPage": 3, "cursor": cursor})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == everything["total"]
+        seen.extend(data["items"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == everything["total"]
+    assert seen[:100] == everything["items"]
+    assert len({item["postcode"] + item["suburb"] for item in seen}) == len(seen)
+
+def test_risk_top_cursor_for_another_query():
+    cursor = requests.get(f"{BASE_URL}/api/v1/risk/top", params={"itemsPerPage": 5}).json()["next_cursor"]
+    assert cursor
+    response = requests.get(f"{BASE_URL}/api/v1/risk/top", params={"cursor": cursor, "sortOrder": "asc"})
+    assert response.status_code == 400
+    response = requests.get(f"{BASE_URL}/api/v1/risk/top", params={"cursor": "garbage"})
+    assert response.status_code == 400
+
+def test_risk_batch():
+    items = [{"postcode": "3000"}, {"postcode": "0000", "brand": "honda", "model": "nothing like it"}, {"postcode": "3000"}]
+    response = requests.post(f"{BASE_URL}/api/v1/risk/batch", json={"items": items})
+    assert response.status_code == 200
+    data = response.json()
+    compare = requests.get(f"{BASE_URL}/api/v1/risk/compare", params={"postcode": "3000"}).json()
+    assert data["defaults"] == compare["defaults"]
+
+    assert len(data["items"]) == 3
+    first = data["items"][0]
+    assert first["postcode_found"] and first["risk_score"] == compare["base"]["risk_score"]
+    assert first["lga"] == compare["base"]["lga"] and first["model_risk"] is None
+    unknown = data["items"][1]
+    assert unknown["risk_score"] == data["defaults"]["postcode_default_risk"] and not unknown["postcode_found"]
+    assert unknown["model_risk"] == data["defaults"]["model_default_risk"] and unknown["model_found"] is False
+    assert data["items"][2] == first
+
+def test_risk_batch_streams_large_batches():
+    items = [{"postcode": str(3000 + n % 1000), "brand": "Honda", "model": "CB300R"} for n in range(5000)]
+    response = requests.post(f"{BASE_URL}/api/v1/risk/batch", json={"items": items})
+    assert response.status_code == 200
+    assert "content-length" not in response.headers
+    data = response.json()
+    assert [item["postcode"] for item in data["items"]] == [item["postcode"] for item in items]
+    assert all(item["model_found"] for item in data["items"])
+
+    response = requests.post(f"{BASE_URL}/api/v1/risk/batch", json={"items": items + [{"postcode": "3000"}]})
+    assert response.status_code == 422
+    response = requests.post(f"{BASE_URL}/api/v1/risk/batch", json={"items": []})
+    assert response.status_code == 422
+
+def test_risk_score():
+    body = {"postcodes": ["3000", "0000", "3000"], "brands": ["Honda", None, "honda"], "models": ["CB300R", None, "nothing like it"]}
+    response = requests.post(f"{BASE_URL}/api/v1/risk/score", json=body)
+    assert response.status_code == 200
+    data = response.json()
+    batch = requests.post(f"{BASE_URL}/api/v1/risk/batch", json={"items": [
+        {"postcode": postcode, "brand": brand, "model": model} for postcode, brand, model in zip(*body.values())
+    ]}).json()
+
+    assert data["defaults"] == batch["defaults"]
+    assert data["postcode_risk"] == [item["risk_score"] for item in batch["items"]]
+    assert data["postcode_found"] == [True, False, True]
+    assert data["model_found"] == [True, None, False]
+    assert data["model_risk"][0] == batch["items"][0]["model_risk"]
+    assert data["model_risk"][1:] == [None, data["defaults"]["model_default_risk"]]
+    for p, m, combined in zip(data["postcode_risk"], data["model_risk"], data["combined_risk"]):
+        assert combined == pytest.approx(1 - (1 - p) * (1 - (m or 0)))
+
+    response = requests.post(f"{BASE_URL}/api/v1/risk/score", json={"postcodes": ["3000"], "brands": ["Honda", "KTM"], "models": ["CB300R", "Duke"]})
+    assert response.status_code == 400
+    response = requests.post(f"{BASE_URL}/api/v1/risk/score", json={"postcodes": []})
+    assert response.status_code == 422
+
+def test_risk_score_and_batch_agree():
+    rows = [
+        (" 3000", "Honda", "CB300R"), ("3000 ", " honda ", "cb300r"), ("0000", "Honda", "Nothing"),
+        ("3121", None, None), ("3121", "Honda", ""), ("3121", "", "CB300R"), ("", "Honda", "CB300R")
+    ]
+    postcodes, brands, models = map(list, zip(*rows))
+    score = requests.post(f"{BASE_URL}/api/v1/risk/score", json={"postcodes": postcodes, "brands": brands, "models": models}).json()
+    batch = requests.post(f"{BASE_URL}/api/v1/risk/batch", json={"items": [
+        {"postcode": postcode, "brand": brand, "model": model} for postcode, brand, model in rows
+    ]}).json()
+
+    assert score["defaults"] == batch["defaults"]
+    for n, item in enumerate(batch["items"]):
+        assert (item["risk_score"], item["postcode_found"], item["model_risk"], item["model_found"]) == (
+            score["postcode_risk"][n], score["postcode_found"][n], score["model_risk"][n], score["model_found"][n]
+        )
+    assert batch["items"][0]["postcode_found"] and batch["items"][0]["model_found"]
+    assert [item["model_found"] for item in batch["items"][3:6]] == [None, None, None]
@@ -0,0 +1,82 @@
+import csv
+import sqlite3
+import subprocess
+import sys
+import pytest
+
+from address_keys import add_address_keys
+from conftest import CREATE_INDEXES, CREATE_TABLES, DATA
+
+SCRIPT = DATA / "scripts" / "score_risk.py"
+SCORE_COLUMNS = ["postcode_risk", "model_risk", "combined_risk", "postcode_found", "model_found", "address_found"]
+
+
+@pytest.fixture(scope="module")
+def db_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("score") / "hotspot.db"
+    with sqlite3.connect(path) as conn:
+        conn.executescript(CREATE_TABLES.read_text())
+        conn.executemany(
+            "INSERT INTO postcode_risk (postcode, locality, local_government_area, long, lat, motorcycle_theft_rate, postcode_risk) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [("3000", "MELBOURNE", "Melbourne", 144.9, -37.8, 9.0, 0.6), ("3121", "RICHMOND", "Yarra", 145.0, -37.8, 7.0, 0.5)]
+        )
+        conn.execute("INSERT INTO model_risk (brand, model, total, percentage, model_risk) VALUES ('Honda', 'CB300R', 10, 0.1, 0.2)")
+        conn.execute("INSERT INTO default_risk VALUES (0.01, 0.2)")
+        conn.executemany(
+            "INSERT INTO victorian_addresses (address, suburb, postcode) VALUES (?, ?, ?)",
+            [("1 MAIN STREET", "RICHMOND", "3121"), ("2 HIGH STREET", "MELBOURNE", "3000")]
+        )
+        add_address_keys(conn)
+        conn.executescript(CREATE_INDEXES.read_text())
+    return path
+
+
+def score(db_path, *args):
+    result = subprocess.run([sys.executable, str(SCRIPT), *map(str, args), "--db", str(db_path)], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result
+
+
+def test_scores_csv_in_chunks_across_processes(db_path, tmp_path):
+    rows = [
+        ["1", "1 main  street", "Richmond", "", "honda", "cb300r"],
+        ["2", "2 HIGH STREET", "MELBOURNE", "3000", "", ""],
+        ["3", "2 HIGH STREET", "MELBOURNE", "3121", "Honda", "Nothing"],
+        ["4", "9 NOWHERE ROAD", "MELBOURNE", "0000", "Honda", "CB300R"]
+    ] * 5
+    with open(tmp_path / "in.csv", "w", newline="") as f:
+        csv.writer(f).writerows([["id", "street", "suburb", "postcode", "brand", "model"]] + rows)
+
+    outputs = []
+    for workers in (1, 2):
+        out = tmp_path / f"out{workers}.csv"
+        score(db_path, tmp_path / "in.csv", out, "--address-column", "street", "--suburb-column", "suburb", "--chunk-size", 3, "--workers", workers)
+        outputs.append(out.read_text())
+    assert outputs[0] == outputs[1]
+
+    with open(tmp_path / "out1.csv", newline="") as f:
+        scored = list(csv.DictReader(f))
+    assert len(scored) == len(rows) and [row["id"] for row in scored] == [row[0] for row in rows]
+    # A row without a postcode is scored with its address's, one without a motorcycle has no model risk
+    assert [[row[name] for name in SCORE_COLUMNS] for row in scored[:4]] == [
+        ["0.5", "0.2", str(1 - 0.5 * 0.8), "True", "True", "True"],
+        ["0.6", "", "0.6", "True", "", "True"],
+        ["0.5", "0.01", str(1 - 0.5 * 0.99), "True", "False", "False"],
+        ["0.2", "0.2", str(1 - 0.8 * 0.8), "False", "True", "False"]
+    ]
+    assert scored[0]["postcode"] == ""
+
+
+def test_parquet_keeps_input_types(db_path, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    table = pa.table({"id": [1, 2, 3], "postcode": ["3000", "3121", None], "brand": ["Honda", None, "Honda"], "model": ["CB300R", None, "CB300R"]})
+    pq.write_table(table, tmp_path / "in.parquet")
+    score(db_path, tmp_path / "in.parquet", tmp_path / "out.parquet", "--chunk-size", 2, "--workers", 1)
+
+    scored = pq.read_table(tmp_path / "out.parquet")
+    assert scored.schema.field("id").type == pa.int64()
+    assert scored.column("combined_risk").to_pylist() == [1 - 0.4 * 0.8, 0.5, 1 - 0.8 * 0.8]
+    assert scored.column("postcode_found").to_pylist() == [True, True, False]
+    assert scored.column("model_found").to_pylist() == [True, None, True]
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from reference_store import ReferenceStore
+from scoring import RiskScorer, to_lists
+
+DEFAULTS = {"model_default_risk": 0.01, "postcode_default_risk": 0.2}
+
+
+@pytest.fixture(scope="module")
+def store():
+    postcodes = [
+        {"postcode": "3000", "suburb": "MELBOURNE", "lga": "Melbourne", "long": 144.9, "lat": -37.8, "motorcycle_theft_rate": 9.0, "risk_score": 0.6},
+        {"postcode": "3000", "suburb": "SOUTHBANK", "lga": "Melbourne", "long": 144.9, "lat": -37.8, "motorcycle_theft_rate": 4.0, "risk_score": 0.3},
+        {"postcode": "3121", "suburb": "RICHMOND", "lga": "Yarra", "long": 145.0, "lat": -37.8, "motorcycle_theft_rate": 7.0, "risk_score": 0.5}
+    ]
+    models = [
+        {"brand": "Honda", "model": "CB300R", "total": 10, "percentage": 0.1, "model_risk": 0.2},
+        {"brand": "Yamaha", "model": "MT 07", "total": 5, "percentage": 0.05, "model_risk": 0.1}
+    ]
+    return ReferenceStore(postcodes, [], models, DEFAULTS)
+
+
+def test_combined_risk_and_fallbacks(store):
+    scores = RiskScorer.from_store(store).score(
+        ["3000", " 3121", "0000", "3000", "3121"],
+        ["honda", "Yamaha", "Honda", None, "Honda"],
+        ["cb300r", "mt  07", "nothing", "CB300R", ""]
+    )
+    # 3000 is its first locality's risk, like /v1/risk/compare, and a row needs brand and model to be a motorcycle
+    assert scores["postcode_risk"].tolist() == [0.6, 0.5, 0.2, 0.6, 0.5]
+    assert scores["postcode_found"].tolist() == [True, True, False, True, True]
+    assert to_lists(scores)["model_risk"] == [0.2, 0.1, 0.01, None, None]
+    assert to_lists(scores)["model_found"] == [True, True, False, None, None]
+    # Without a motorcycle it's just the location's risk
+    np.testing.assert_allclose(scores["combined_risk"], [1 - 0.4 * 0.8, 1 - 0.5 * 0.9, 1 - 0.8 * 0.99, 0.6, 0.5])
+
+
+def test_batch(store):
+    results = list(RiskScorer.from_store(store).batch(
+        ["3000", " 3121", "0000", "3000"], [" HONDA", "Honda", "Honda", "Honda"], ["cb300r  ", "Nope", "CB300R", None]
+    ))
+    assert results[0] == {
+        "postcode": "3000", "suburb": "MELBOURNE", "lga": "Melbourne", "risk_score": 0.6, "postcode_found": True,
+        "brand": " HONDA", "model": "cb300r  ", "model_risk": 0.2, "model_found": True
+    }
+    # Postcodes and motorcycles are echoed as sent, and unknown ones fall back to default_risk
+    assert results[1] == {
+        "postcode": " 3121", "suburb": "RICHMOND", "lga": "Yarra", "risk_score": 0.5, "postcode_found": True,
+        "brand": "Honda", "model": "Nope", "model_risk": 0.01, "model_found": False
+    }
+    assert results[2]["suburb"] is None and results[2]["risk_score"] == 0.2 and not results[2]["postcode_found"]
+    assert results[3] == {**results[0], "brand": "Honda", "model": None, "model_risk": None, "model_found": None}
+
+
+def test_matches_row_at_a_time(store):
+    rng = np.random.default_rng(1)
+    postcodes = rng.choice(["3000", "3121", "3999", ""], 2000).tolist()
+    brands = rng.choice(["Honda", "YAMAHA", "KTM", ""], 2000).tolist()
+    models = rng.choice(["CB300R", "mt 07", "Duke"], 2000).tolist()
+    scorer = RiskScorer.from_store(store)
+    expected = to_lists(scorer.score(np.array(postcodes), brands, models))
+
+    for n in range(2000):
+        single = scorer.score([postcodes[n]], [brands[n]], [models[n]])
+        assert {name: values[0] for name, values in to_lists(single).items()} == {name: values[n] for name, values in expected.items()}
+
+
+def test_locations_only_and_bad_input(store):
+    scorer = RiskScorer.from_store(store)
+    scores = scorer.score(["3121", "3000"])
+    assert to_lists(scores)["model_risk"] == [None, None] and scores["combined_risk"].tolist() == [0.5, 0.6]
+    assert scorer.score([])["combined_risk"].shape == (0,)
+    with pytest.raises(ValueError):
+        scorer.score(["3000", "3121"], ["Honda"], ["CB300R"])
+
+    empty = RiskScorer.from_store(ReferenceStore([], [], [], DEFAULTS)).score(["3000"], ["Honda"], ["CB300R"])
+    assert empty["postcode_risk"].tolist() == [0.2] and empty["model_risk"].tolist() == [0.01]
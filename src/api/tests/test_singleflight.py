@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight, flight_key
+
+
+def run_concurrently(flight, key, fn, callers):
+    """Starts callers threads on the same key while the first one is still inside fn"""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_identical_requests_share_one_call():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def feed():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"postcode": "3000"}
+
+    key = flight_key("feed", postcode="3000", k=20, radius=None, max_risk=None)
+    threads, results, _ = run_concurrently(flight, key, feed, 1)
+    started.wait(5)
+    more, _, _ = run_concurrently(flight, key, feed, 5)
+    deadline = time.monotonic() + 5
+    while flight.stats()["coalesced"] < 5 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads + more:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 1, "coalesced": 5, "in_flight": 0, "coalesced_by_route": {"feed": 5}}
+    # Nothing is kept once it's done
+    assert flight.do(key, lambda: "again") == "again"
+
+
+def test_waiters_get_the_same_exception():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def fails():
+        started.set()
+        release.wait(5)
+        raise LookupError("no theft data")
+
+    threads, _, errors = run_concurrently(flight, flight_key("thefts", postcode="3000"), fails, 1)
+    started.wait(5)
+    more, _, more_errors = run_concurrently(flight, flight_key("thefts", postcode="3000"), fails, 3)
+    deadline = time.monotonic() + 5
+    while flight.stats()["coalesced"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads + more:
+        thread.join(5)
+
+    assert [type(error) for error in errors + more_errors] == [LookupError] * 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_different_params_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight_key("feed", postcode="3000", k=20) == flight_key("feed", k=20, postcode="3000")
+    assert flight_key("feed", postcode="3000", k=20) != flight_key("feed", postcode="3000", k=21)
+
+    assert flight.do(flight_key("thefts", postcode="3000"), lambda: 1) == 1
+    assert flight.do(flight_key("thefts", postcode="3121"), lambda: 2) == 2
+    with pytest.raises(ValueError):
+        flight.do(flight_key("thefts", postcode="3000"), lambda: int("x"))
+    assert flight.stats() == {"calls": 3, "coalesced": 0, "in_flight": 0, "coalesced_by_route": {}}
@@ -0,0 +1,68 @@
+import math
+import random
+
+import pytest
+
+from spatial_index import EARTH_RADIUS_METERS, PostcodeSpatialIndex
+
+
+def haversine(a, b):
+    lat1, long1, lat2, long2 = map(math.radians, (a["lat"], a["long"], b["lat"], b["long"]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((long2 - long1) / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(h))
+
+
+@pytest.fixture(scope="module")
+def rows():
+    rng = random.Random(7)
+    rows = []
+    for n in range(600):
+        postcode = str(3000 + n // 3)
+        # Localities in a postcode often share its coordinates
+        lat, long = (rows[-1]["lat"], rows[-1]["long"]) if n % 3 == 2 else (rng.uniform(-39, -34), rng.uniform(141, 150))
+        rows.append({
+            "postcode": postcode,
+            "suburb": f"SUBURB {n}",
+            "lga": f"LGA {n % 30}",
+            "risk_score": rng.random(),
+            "lat": lat,
+            "long": long,
+        })
+    return rows
+
+
+def brute_force(rows, postcode, k, max_risk=math.inf, radius=math.inf):
+    origin = next(row for row in rows if row["postcode"] == postcode)
+    candidates = [
+        (haversine(origin, row), row["suburb"])
+        for row in rows
+        if row["postcode"] != postcode and row["risk_score"] < max_risk
+    ]
+    return [suburb for distance, suburb in sorted(candidates) if distance <= radius][:k]
+
+
+@pytest.mark.parametrize("k, max_risk, radius", [(20, None, None), (5, 0.3, None), (50, 0.5, 100000), (3, None, 20000)])
+def test_nearest_matches_brute_force(rows, k, max_risk, radius):
+    index = PostcodeSpatialIndex(rows)
+    for postcode in sorted({row["postcode"] for row in rows})[::7]:
+        nearest = index.nearest(postcode, k=k, max_risk=max_risk, radius=radius)
+        expected = brute_force(rows, postcode, k, max_risk or math.inf, radius or math.inf)
+        assert [suburb["suburb"] for suburb in nearest] == expected
+        assert all(suburb["postcode"] != postcode for suburb in nearest)
+
+
+def test_distances_are_haversine_meters(rows):
+    index = PostcodeSpatialIndex(rows)
+    origin = rows[0]
+    by_suburb = {row["suburb"]: row for row in rows}
+    for suburb in index.nearest(origin["postcode"], k=10):
+        assert suburb["distance_in_meters"] == pytest.approx(haversine(origin, by_suburb[suburb["suburb"]]), abs=0.01)
+        assert set(suburb) == {"postcode", "suburb", "lga", "risk_score", "distance_in_meters"}
+
+
+def test_unknown_postcodes_and_missing_coordinates(rows):
+    index = PostcodeSpatialIndex(rows + [{**rows[0], "postcode": "3999", "suburb": "NOWHERE", "lat": "", "long": ""}])
+    assert len(index) == len(rows)
+    assert index.location("3999") is None
+    assert index.nearest("3999") == []
+    assert index.location("3000")["suburb"] == rows[0]["suburb"]
@@ -0,0 +1,108 @@
+-- Applied after the bulk .import so each index is built once over the loaded data rather than
+-- maintained row by row during the import.
+
+-- Re-cluster the addresses by postcode so every postcode is one contiguous rowid range, which lets
+-- the autocomplete index below be searched one postcode at a time.
+-- address_key and suburb_key, the upper cased, whitespace collapsed forms used to verify submitted
+-- addresses, were already added by scripts/address_keys.py with normalise_address_key() itself
+CREATE TABLE victorian_addresses_clustered (
+    address TEXT NOT NULL,
+    suburb TEXT NOT NULL,
+    postcode TEXT NOT NULL,
+    address_key TEXT NOT NULL,
+    suburb_key TEXT NOT NULL
+);
+
+INSERT INTO victorian_addresses_clustered (address, suburb, postcode, address_key, suburb_key)
+SELECT
+    address,
+    suburb,
+    postcode,
+    address_key,
+    suburb_key
+FROM victorian_addresses
+ORDER BY postcode, address;
+
+DROP TABLE victorian_addresses;
+ALTER TABLE victorian_addresses_clustered RENAME TO victorian_addresses;
+
+CREATE TABLE victorian_addresses_postcodes (
+    postcode TEXT PRIMARY KEY,
+    first_rowid INTEGER NOT NULL,
+    last_rowid INTEGER NOT NULL
+) WITHOUT ROWID;
+
+INSERT INTO victorian_addresses_postcodes (postcode, first_rowid, last_rowid)
+SELECT postcode, MIN(rowid), MAX(rowid)
+FROM victorian_addresses
+GROUP BY postcode;
+
+-- Address autocomplete filters by postcode and orders by address
+CREATE INDEX idx_victorian_addresses_postcode
+ON victorian_addresses(postcode, address);
+
+-- verify_address is a single seek on the normalised keys, and without the postcode leading
+-- score_risk.py can find the postcodes of an address too
+CREATE INDEX idx_victorian_addresses_location
+ON victorian_addresses(suburb_key, address_key, postcode);
+
+CREATE INDEX idx_postcode_risk_postcode
+ON postcode_risk(postcode);
+
+-- Per LGA rollups of postcode risk for /v1/lgas and /v1/risk/top?scope=lga, ranked so the riskiest
+-- and the largest LGAs are 1. Rows go in first seen order so ties keep the postcode_risk order.
+CREATE TABLE lga_risk (
+    lga TEXT NOT NULL,
+    postcode_count INTEGER NOT NULL,
+    avg_risk REAL NOT NULL,
+    min_risk REAL NOT NULL,
+    max_risk REAL NOT NULL,
+    risk_rank INTEGER NOT NULL,
+    size_rank INTEGER NOT NULL
+);
+
+INSERT INTO lga_risk (lga, postcode_count, avg_risk, min_risk, max_risk, risk_rank, size_rank)
+SELECT
+    lga,
+    postcode_count,
+    avg_risk,
+    min_risk,
+    max_risk,
+    RANK() OVER (ORDER BY avg_risk DESC),
+    RANK() OVER (ORDER BY postcode_count DESC)
+FROM (
+    SELECT
+        local_government_area AS lga,
+        COUNT(*) AS postcode_count,
+        ROUND(AVG(postcode_risk), 6) AS avg_risk,
+        MIN(postcode_risk) AS min_risk,
+        MAX(postcode_risk) AS max_risk,
+        MIN(rowid) AS first_rowid
+    FROM postcode_risk
+    GROUP BY local_government_area
+)
+ORDER BY first_rowid;
+
+CREATE INDEX idx_postcode_yearly_thefts_postcode
+ON postcode_yearly_thefts(postcode, year);
+
+CREATE INDEX idx_model_risk_brand_model
+ON model_risk(brand, model);
+
+-- Trigram index for address autocomplete, matches any substring of 3+ characters case insensitively.
+-- It reads its content from victorian_addresses so the address text isn't stored twice.
+CREATE VIRTUAL TABLE victorian_addresses_fts USING fts5(
+    address,
+    suburb UNINDEXED,
+    postcode UNINDEXED,
+    content='victorian_addresses',
+    tokenize='trigram'
+);
+
+INSERT INTO victorian_addresses_fts(victorian_addresses_fts) VALUES ('rebuild');
+
+-- Gather statistics so the query planner picks the indexes above
+ANALYZE;
+
+-- Reclaim the pages freed by re-clustering the address table
+VACUUM;
@@ -63,12 +63,6 @@ CREATE TABLE victorian_addresses (
     postcode TEXT NOT NULL
 );
 
-CREATE TABLE postcode_distances (
-    primary_postcode TEXT NOT NULL,
-    secondary_postcode TEXT NOT NULL,
-    distance_meters REAL NOT NULL
-);
-
 CREATE TABLE postcode_yearly_thefts (
     year INTEGER NOT NULL,
     postcode TEXT NOT NULL,
@@ -81,3 +75,20 @@ ON user_contribution(address, suburb, postcode);
 
 CREATE INDEX IF NOT EXISTS idx_user_contribution_postcode
 ON user_contribution(postcode);
+
+-- Contributions per postcode, kept up to date by the triggers below so the feed can count nearby parking without reading user_contribution
+CREATE TABLE user_contribution_counts (
+  postcode TEXT PRIMARY KEY,
+  count INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TRIGGER user_contribution_count_insert AFTER INSERT ON user_contribution
+BEGIN
+  INSERT INTO user_contribution_counts (postcode, count) VALUES (NEW.postcode, 1)
+  ON CONFLICT (postcode) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER user_contribution_count_delete AFTER DELETE ON user_contribution
+BEGIN
+  UPDATE user_contribution_counts SET count = count - 1 WHERE postcode = OLD.postcode;
+END;
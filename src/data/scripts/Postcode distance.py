@@ -5,6 +5,7 @@
 ######################################################################################
 
 # Loading required libraries----------------------------------------------------------
+import argparse
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -12,13 +13,24 @@ from pathlib import Path
 # Retrieving the current working directory---------------------------------------------
 SCRIPT_DIR = Path(__file__).resolve().parent
 
+# Settings----------------------------------------------------------------------------
+# Only the nearest k neighbours of each postcode are kept, the full cross join grew with the
+# square of the number of postcodes and almost all of it was never read
+parser = argparse.ArgumentParser(description = 'Nearest neighbouring postcodes by haversine distance')
+parser.add_argument('--k', type = int, default = 50, help = 'Neighbours to keep per postcode')
+parser.add_argument('--max-radius', type = float, default = None, help = 'Drop neighbours further than this many meters')
+parser.add_argument('--max-memory-mb', type = float, default = 64, help = 'Rough cap on the distance block held in memory at once')
+parser.add_argument('--input', default = f'{SCRIPT_DIR}/Source data/vic_postcodes_area.csv')
+parser.add_argument('--output', default = f'{SCRIPT_DIR}/Cleaned data/postcode_distances.csv')
+args = parser.parse_args()
+
 
 ######################################################################################
 ####                                  Data Loading                                ####
 
 # Loading Postcode datasets-----------------------------------------------------------
 # Loading verified victorian postcode latitude and longitude data
-postcode_area = pd.read_csv(f'{SCRIPT_DIR}/Source data/vic_postcodes_area.csv').drop(columns = ['area_km2'])
+postcode_area = pd.read_csv(args.input).drop(columns = ['area_km2'])
 
 
 ######################################################################################
@@ -43,18 +55,66 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     distance = R * c
     return distance
 
-# Calculating the distance between postcodes data--------------------------------------
-postcode_distance = (postcode_area.
-    rename(columns = lambda x: f'primary_{x}' ).
-    merge(postcode_area.rename(columns = lambda x: f'secondary_{x}'), how = 'cross'). #Creating a cross join to get all combinations of postcodes
-    loc[lambda df: df["primary_postcode"] != df["secondary_postcode"]]. #Removing rows where the primary and secondary postcodes are the same
-    assign(distance_meters = lambda df: haversine_distance(df['primary_lat'], df['primary_long'], df['secondary_lat'], df['secondary_long']).round(2)). #Calculating the distance between the primary and secondary postcodes
-    sort_values(['primary_postcode', 'distance_meters']).
-    drop(columns = ['primary_lat', 'primary_long', 'secondary_lat', 'secondary_long']))
+# Creating a function to place points on the unit sphere, where a larger dot product means a
+# shorter great circle distance
+def unit_vectors(lat, lon):
+    lat = np.radians(np.asarray(lat, dtype = float))
+    lon = np.radians(np.asarray(lon, dtype = float))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+# Bytes per cell of a nearest_neighbours() block: float64 similarity, bool mask, intp argpartition
+BLOCK_BYTES_PER_CELL = 8 + 1 + 8
+
+# Creating a function to find the k nearest neighbours of every point, a block of rows at a time.
+# Works for any frame with lat/long and a key column (postcodes, localities, addresses), points
+# sharing a key are never neighbours of each other. Yields one small frame per block so the whole
+# result never has to sit in memory either.
+def nearest_neighbours(points, key, k, max_radius = None, max_memory_mb = 64):
+    points = points.reset_index(drop = True)
+    xyz = unit_vectors(points['lat'], points['long'])
+    keys = points[key].to_numpy()
+    n = len(points)
+    k = min(k, n - 1)
+    if k <= 0:
+        return
+    # Each cell of a block_size x n block costs a float64 similarity, a bool for the shared key mask
+    # and an intp from argpartition, nothing else the size of the block is ever allocated
+    block_size = max(1, int(max_memory_mb * 1024 * 1024 // (n * BLOCK_BYTES_PER_CELL)))
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        similarity = xyz[start:stop] @ xyz.T
+        # Negated in place, so the smallest are the nearest without a second copy of the block
+        np.negative(similarity, out = similarity)
+        similarity[keys[start:stop, None] == keys[None, :]] = np.inf
+
+        # The k most similar, unordered, then just those k sorted
+        nearest = np.argpartition(similarity, k - 1, axis = 1)[:, :k]
+        valid = np.isfinite(np.take_along_axis(similarity, nearest, axis = 1))
+        primary = np.repeat(np.arange(start, stop), k)[valid.ravel()]
+        secondary = nearest[valid]
+
+        # Exact haversine only on the pairs that are kept
+        block = pd.DataFrame({
+            f'primary_{key}': keys[primary],
+            f'secondary_{key}': keys[secondary],
+            'distance_meters': haversine_distance(
+                points['lat'].to_numpy()[primary], points['long'].to_numpy()[primary],
+                points['lat'].to_numpy()[secondary], points['long'].to_numpy()[secondary]
+            ).round(2)
+        })
+        if max_radius is not None:
+            block = block.loc[lambda df: df['distance_meters'] <= max_radius]
+        yield block.sort_values([f'primary_{key}', 'distance_meters'], kind = 'stable')
 
 
 ########################################################################################
 ####                                    Data Export                                 ####
 
 # Saving postcode distance data---------------------------------------------------------
-postcode_distance.to_csv(f'{SCRIPT_DIR}/Cleaned data/postcode_distances.csv', index = False)
+# Written block by block as they're computed, same columns as before but k rows per postcode
+Path(args.output).parent.mkdir(parents = True, exist_ok = True)
+with open(args.output, 'w', newline = '') as output:
+    pd.DataFrame(columns = ['primary_postcode', 'secondary_postcode', 'distance_meters']).to_csv(output, index = False)
+    for block in nearest_neighbours(postcode_area.sort_values('postcode'), 'postcode', args.k, args.max_radius, args.max_memory_mb):
+        block.to_csv(output, index = False, header = False)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Adds address_key and suburb_key to victorian_addresses in a freshly imported database, computed by
+normalise_address_key() from the API itself so the build and verify_address() can't disagree about
+what counts as the same address. The Makefile runs it between the CSV imports and create_indexes.sql.
+
+Usage:
+  python3 scripts/address_keys.py hotspot.db.tmp
+"""
+
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'api'))
+from db_interface import normalise_address_key
+
+
+def add_address_keys(conn: sqlite3.Connection) -> None:
+    conn.create_function('normalise_address_key', 1, normalise_address_key, deterministic=True)
+    with conn:
+        conn.execute('ALTER TABLE victorian_addresses ADD COLUMN address_key TEXT')
+        conn.execute('ALTER TABLE victorian_addresses ADD COLUMN suburb_key TEXT')
+        conn.execute("""
+            UPDATE victorian_addresses
+            SET address_key = normalise_address_key(address),
+                suburb_key = normalise_address_key(suburb)
+        """)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description='Add the normalised address and suburb keys to victorian_addresses')
+    ap.add_argument('db', help='Database with victorian_addresses imported')
+    args = ap.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        add_address_keys(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Copy user contributions from the old scan-only DynamoDB table into the keyed table used by the API.
+
+The old table was keyed by postcode + parking_id, so finding the contribution for an address meant
+scanning the whole table. The new table is keyed by postcode + location_key (see
+contribution_location_key() in src/api/db_interface.py). Keys can't be changed in place, so this
+creates the new table if needed and copies every item across, along with the per-postcode counts.
+Scanning is fine here, it runs once, before the API is switched over to the new table.
+
+Each item is put only if its address isn't in the new table yet, in the same transaction that adds
+it to its postcode's count, so re-running the migration or the API writing to the new table
+meanwhile never clobbers a row or resets a count.
+
+Usage examples:
+  python src/data/scripts/migrate_contributions_ddb.py
+
+  # Actually write (remove dry-run)
+  python src/data/scripts/migrate_contributions_ddb.py --apply
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import boto3
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'api'))
+from db_interface import (
+    DEFAULT_CONTRIBUTIONS_TABLE,
+    PersistentDatabase,
+    contribution_location_key,
+    contributions_table_definition,
+    insert_new_contribution,
+)
+
+
+def scan_all(table) -> Iterable[Dict]:
+    kwargs = {}
+    while True:
+        resp = table.scan(**kwargs)
+        yield from resp.get('Items', [])
+        if 'LastEvaluatedKey' not in resp:
+            return
+        kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+
+def ensure_table(client, table_name: str) -> None:
+    if table_name in client.list_tables().get('TableNames', []):
+        return
+    client.create_table(**contributions_table_definition(table_name))
+    client.get_waiter('table_exists').wait(TableName=table_name)
+
+
+def plan(items: Iterable[Dict]) -> Tuple[List[Dict], int]:
+    """Returns the items to write and the submission counter, keeping the newest contribution per address"""
+    by_location: Dict[Tuple[str, str], Dict] = {}
+    counter = 0
+    for item in items:
+        if item.get('postcode') == 'COUNTER':
+            counter = max(counter, int(item.get('counter', 0)))
+            continue
+        key = (item['postcode'], contribution_location_key(item['address'], item['suburb']))
+        current = by_location.get(key)
+        if current is None or item.get('created_at', '') > current.get('created_at', ''):
+            by_location[key] = {**item, 'location_key': key[1]}
+        counter = max(counter, int(item['parking_id']))
+    return list(by_location.values()), counter
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description='Migrate user contributions to the keyed DynamoDB table (dry-run by default)')
+    ap.add_argument('--source', default='user_contributions')
+    ap.add_argument('--target', default=DEFAULT_CONTRIBUTIONS_TABLE)
+    ap.add_argument('--region', default='ap-southeast-2')
+    ap.add_argument('--apply', action='store_true', help='Perform writes (otherwise dry-run)')
+    args = ap.parse_args()
+
+    ddb = boto3.resource('dynamodb', region_name=args.region)
+    items, counter = plan(scan_all(ddb.Table(args.source)))
+
+    print(f"{len(items)} contributions to copy from {args.source} to {args.target}, counter at {counter}")
+
+    if not args.apply:
+        print('Dry-run only. Use --apply to migrate.')
+        return
+
+    ensure_table(ddb.meta.client, args.target)
+    target = ddb.Table(args.target)
+    copied = sum(insert_new_contribution(target, item) for item in items)
+
+    # Never move the counter backwards in case the API has already written to the new table
+    try:
+        target.update_item(
+            Key=PersistentDatabase.COUNTER_KEY,
+            UpdateExpression='SET #c = :counter',
+            ConditionExpression='attribute_not_exists(#c) OR #c < :counter',
+            ExpressionAttributeNames={'#c': 'counter'},
+            ExpressionAttributeValues={':counter': counter},
+        )
+    except target.meta.client.exceptions.ConditionalCheckFailedException:
+        pass
+
+    print(f"Copied {copied} items into {args.target}, {len(items) - copied} were already there.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Score CSV or Parquet files of postcodes, motorcycles and addresses offline against a built
+hotspot.db, with the same combined risk as POST /api/v1/risk/score.
+
+Every input row is written back out with postcode_risk, model_risk, combined_risk, postcode_found
+and model_found appended, plus address_found when an address column is given. model_risk and
+model_found are empty for rows without a motorcycle. Addresses are checked
+against victorian_addresses the same way contributions are, and a row without a postcode is scored
+with the postcode of its address.
+
+The input is streamed --chunk-size rows at a time, so memory stays bounded however big the file is.
+Once there's more than one chunk they're scored by --workers processes, each holding its own copy of
+postcode_risk and model_risk (well under a MB) and looking up just its chunk's addresses in
+hotspot.db, and written out in input order with at most two chunks per worker in flight. Parquet needs pyarrow, which isn't an API dependency: uv pip install pyarrow
+
+Usage examples:
+  python src/data/scripts/score_risk.py policies.csv scored.csv
+
+  # Parquet in and out, addresses checked, 8 processes
+  python src/data/scripts/score_risk.py policies.parquet scored.parquet --address-column street --suburb-column suburb --workers 8
+
+  # Different column names, no motorcycle columns
+  python src/data/scripts/score_risk.py sites.csv scored.csv --postcode-column pc --brand-column '' --model-column ''
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import deque
+from itertools import chain, islice
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'api'))
+from db_interface import SQLiteDatabase, normalise_address_key
+from reference_store import ReferenceStore
+from scoring import RiskScorer, to_lists
+
+SCORE_COLUMNS = ('postcode_risk', 'model_risk', 'combined_risk', 'postcode_found', 'model_found')
+DEFAULT_CHUNK_ROWS = 100_000
+
+Chunk = Dict[str, List[Any]]
+
+# Set in each process by load(), workers load their own rather than having them pickled over
+_scorer: Optional[RiskScorer] = None
+_db: Optional[SQLiteDatabase] = None
+
+# Most addresses of a suburb looked up in one query
+ADDRESS_LOOKUP_BATCH = 500
+
+
+def pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("Reading or writing Parquet needs pyarrow, install it with: uv pip install pyarrow")
+    return pyarrow
+
+
+def is_parquet(path: str) -> bool:
+    return Path(path).suffix.lower() in ('.parquet', '.pq')
+
+
+def load(db_path: str, with_addresses: bool) -> None:
+    global _scorer, _db
+    db = SQLiteDatabase(db_path)
+    _scorer = RiskScorer.from_store(ReferenceStore.load(db))
+    if with_addresses:
+        # Kept open, addresses are looked up a chunk at a time rather than the whole table held in memory
+        _db = db
+    else:
+        db.pool.close_all()
+
+
+def address_postcodes(locations: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Tuple[str, ...]]:
+    """Postcodes of each (suburb_key, address_key) in victorian_addresses, seeks on idx_victorian_addresses_location"""
+    # One suburb at a time, SQLite scans the whole index for an IN list of (suburb_key, address_key) pairs
+    by_suburb: Dict[str, List[str]] = {}
+    for suburb_key, address_key in locations:
+        by_suburb.setdefault(suburb_key, []).append(address_key)
+
+    postcodes: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+    for suburb_key, address_keys in by_suburb.items():
+        for start in range(0, len(address_keys), ADDRESS_LOOKUP_BATCH):
+            batch = address_keys[start:start + ADDRESS_LOOKUP_BATCH]
+            rows = _db.fetch_all(f"""
+                SELECT address_key, postcode
+                FROM victorian_addresses
+                WHERE suburb_key = :suburb_key AND address_key IN ({", ".join(f":a{n}" for n in range(len(batch)))})
+            """, {"suburb_key": suburb_key, **{f"a{n}": address_key for n, address_key in enumerate(batch)}})
+            for row in rows:
+                key = (suburb_key, row['address_key'])
+                postcodes[key] = postcodes.get(key, ()) + (row['postcode'],)
+    return postcodes
+
+
+def score_chunk(chunk: Chunk, args: argparse.Namespace) -> Chunk:
+    """The score columns for a chunk, in row order"""
+    postcodes = ['' if value is None else str(value).strip() for value in chunk[args.postcode_column]]
+    scored: Chunk = {}
+    if _db is not None:
+        # Normalising is the slow part, each distinct address is only done once a chunk
+        keys: Dict[Tuple[Any, Any], Tuple[str, str]] = {}
+        for address, suburb in zip(chunk[args.address_column], chunk[args.suburb_column]):
+            if (address, suburb) not in keys:
+                keys[address, suburb] = (normalise_address_key(str(suburb or '')), normalise_address_key(str(address or '')))
+        known = address_postcodes(list(set(keys.values())))
+
+        found = []
+        for n, location in enumerate(zip(chunk[args.address_column], chunk[args.suburb_column])):
+            postcodes_of = known.get(keys[location], ())
+            if not postcodes[n] and postcodes_of:
+                postcodes[n] = postcodes_of[0]
+            found.append(postcodes[n] in postcodes_of)
+        scored['address_found'] = found
+
+    brands = chunk[args.brand_column] if args.brand_column else None
+    models = chunk[args.model_column] if args.model_column else None
+    scores = _scorer.score(postcodes, brands, models)
+    return {**to_lists(scores), **scored}
+
+
+def read_csv(path: str, chunk_rows: int) -> Tuple[List[str], Iterator[Chunk]]:
+    f = open(path, newline='')
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        f.close()
+        raise SystemExit(f"{path} is empty, it needs at least a header row")
+
+    def chunks():
+        with f:
+            while rows := list(islice(reader, chunk_rows)):
+                # Short rows are padded rather than shifting everything after them
+                rows = [row + [''] * (len(header) - len(row)) if len(row) < len(header) else row for row in rows]
+                yield {name: list(values) for name, values in zip(header, zip(*rows))}
+
+    return header, chunks()
+
+
+def read_parquet(path: str, chunk_rows: int) -> Tuple[List[str], Iterator[Chunk]]:
+    parquet = pyarrow().parquet.ParquetFile(path)
+    return parquet.schema_arrow.names, (batch.to_pydict() for batch in parquet.iter_batches(batch_size=chunk_rows))
+
+
+class CsvWriter:
+    def __init__(self, path: str, header: List[str]):
+        self.out = sys.stdout if path == '-' else open(path, 'w', newline='')
+        self.writer = csv.writer(self.out)
+        self.header = header
+        self.writer.writerow(header)
+
+    def write(self, chunk: Chunk) -> None:
+        self.writer.writerows(zip(*(chunk[name] for name in self.header)))
+
+    def close(self) -> None:
+        if self.out is not sys.stdout:
+            self.out.close()
+
+
+class ParquetWriter:
+    def __init__(self, path: str, header: List[str], input_path: str):
+        pa = pyarrow()
+        # Input columns keep their Parquet types, CSV columns are all strings
+        source = pa.parquet.ParquetFile(input_path).schema_arrow if is_parquet(input_path) else None
+        fields = []
+        for name in header:
+            if name in SCORE_COLUMNS + ('address_found',):
+                fields.append(pa.field(name, pa.float64() if name.endswith('_risk') else pa.bool_()))
+            else:
+                fields.append(source.field(name) if source else pa.field(name, pa.string()))
+        self.pa = pa
+        self.schema = pa.schema(fields)
+        self.writer = pa.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, chunk: Chunk) -> None:
+        self.writer.write_table(self.pa.Table.from_pydict(chunk, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def scored_chunks(chunks: Iterator[Chunk], args: argparse.Namespace) -> Iterator[Chunk]:
+    """Each input chunk with its scores added, in input order"""
+    first = next(chunks, None)
+    if first is None:
+        return
+    second = next(chunks, None)
+    with_addresses = bool(args.address_column)
+    if second is None or args.workers <= 1:
+        # Not worth starting processes for
+        load(args.db, with_addresses)
+        for chunk in chain([first], [second] if second is not None else [], chunks):
+            yield {**chunk, **score_chunk(chunk, args)}
+        return
+
+    with Pool(args.workers, initializer=load, initargs=(args.db, with_addresses)) as pool:
+        # Pool.imap would read the whole input ahead of the workers, this keeps a fixed window in flight
+        pending = deque()
+        for chunk in chain([first, second], chunks):
+            pending.append((chunk, pool.apply_async(score_chunk, (chunk, args))))
+            if len(pending) >= args.workers * 2:
+                chunk, result = pending.popleft()
+                yield {**chunk, **result.get()}
+        while pending:
+            chunk, result = pending.popleft()
+            yield {**chunk, **result.get()}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description='Append combined risk scores to every row of a CSV or Parquet file')
+    ap.add_argument('input', help='CSV with a header row, or .parquet')
+    ap.add_argument('output', help="Where to write the scored rows, .parquet for Parquet, '-' for CSV on stdout")
+    ap.add_argument('--db', default=str(Path(__file__).resolve().parents[1] / 'hotspot.db'))
+    ap.add_argument('--postcode-column', default='postcode')
+    ap.add_argument('--brand-column', default='brand', help="Empty to score locations only")
+    ap.add_argument('--model-column', default='model', help="Empty to score locations only")
+    ap.add_argument('--address-column', default='', help="Street address to check against victorian_addresses, needs --suburb-column")
+    ap.add_argument('--suburb-column', default='')
+    ap.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_ROWS, help='Rows read, scored and written at a time')
+    ap.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processes to score with, 1 scores in this one')
+    args = ap.parse_args()
+
+    if bool(args.address_column) != bool(args.suburb_column):
+        ap.error('--address-column and --suburb-column go together')
+    if args.chunk_size < 1:
+        ap.error('--chunk-size must be at least 1')
+    if is_parquet(args.output) and args.output == '-':
+        ap.error('Parquet output needs a file')
+
+    header, chunks = (read_parquet if is_parquet(args.input) else read_csv)(args.input, args.chunk_size)
+    for name in (args.postcode_column, args.brand_column, args.model_column, args.address_column, args.suburb_column):
+        if name and name not in header:
+            ap.error(f"{args.input} has no {name} column")
+
+    # Scoring an already scored file replaces its scores rather than adding a second set
+    added = list(SCORE_COLUMNS) + (['address_found'] if args.address_column else [])
+    output_header = header + [name for name in added if name not in header]
+    writer = ParquetWriter(args.output, output_header, args.input) if is_parquet(args.output) else CsvWriter(args.output, output_header)
+
+    start = time.perf_counter()
+    rows = postcodes_found = models_found = addresses_found = 0
+    try:
+        for chunk in scored_chunks(chunks, args):
+            writer.write(chunk)
+            rows += len(chunk['combined_risk'])
+            postcodes_found += sum(chunk['postcode_found'])
+            models_found += sum(filter(None, chunk['model_found']))
+            addresses_found += sum(chunk.get('address_found', ()))
+            print(f"\rScored {rows} rows", end='', file=sys.stderr)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\rScored {rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s), {postcodes_found} postcodes, "
+          f"{models_found} models" + (f" and {addresses_found} addresses" if args.address_column else "") + " found",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
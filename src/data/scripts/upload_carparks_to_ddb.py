@@ -11,14 +11,23 @@ from __future__ import annotations
 
 import argparse
 import csv
+import sys
 from datetime import datetime
-from typing import Iterable, Dict
+from typing import Iterable, Dict, Optional
 
 import boto3
-from boto3.dynamodb.conditions import Attr
 from botocore.client import BaseClient
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'api'))
+from db_interface import (
+    DEFAULT_CONTRIBUTIONS_TABLE,
+    ParkingIdAllocator,
+    PersistentDatabase,
+    contribution_location_key,
+    insert_new_contribution,
+)
+
 
 def read_rows(path: str) -> Iterable[Dict[str, str]]:
     with open(path, newline='', encoding='utf-8') as f:
@@ -37,46 +46,36 @@ def read_rows(path: str) -> Iterable[Dict[str, str]]:
                 }
 
 
-def ensure_counter_item(table) -> None:
-    table.update_item(
-        Key={'postcode': 'COUNTER', 'parking_id': 0},
-        UpdateExpression='SET #c = if_not_exists(#c, :zero)',
-        ExpressionAttributeNames={'#c': 'counter'},
-        ExpressionAttributeValues={':zero': 0},
-    )
-
-
-def next_id(table) -> int:
-    resp = table.update_item(
-        Key={'postcode': 'COUNTER', 'parking_id': 0},
-        UpdateExpression='SET #c = if_not_exists(#c, :zero) + :one',
-        ExpressionAttributeNames={'#c': 'counter'},
-        ExpressionAttributeValues={':zero': 0, ':one': 1},
-        ReturnValues='UPDATED_NEW',
-    )
-    return int(resp['Attributes']['counter'])
+def location(item: Dict[str, str]) -> Dict[str, str]:
+    return {
+        'postcode': item['postcode'],
+        'location_key': contribution_location_key(item['address'], item['suburb']),
+    }
 
 
 def exists(table, item: Dict[str, str]) -> bool:
-    resp = table.scan(
-        ProjectionExpression='parking_id',
-        FilterExpression=Attr('address').eq(item['address']) &
-                         Attr('suburb').eq(item['suburb']) &
-                         Attr('postcode').eq(item['postcode'])
-    )
-    return bool(resp.get('Items'))
-
-
-def put_item(table, item: Dict[str, str]) -> int:
-    pid = next_id(table)
-    table.put_item(Item={
+    resp = table.get_item(Key=location(item), ProjectionExpression='parking_id')
+    return 'Item' in resp
+
+
+def put_item(table, ids: ParkingIdAllocator, item: Dict[str, str]) -> Optional[int]:
+    """
+    Writes the car park with its postcode's count in one transaction, the same way the API inserts,
+    so a run that stops partway never leaves counts behind. None when the address already exists,
+    e.g. a contribution came in through the API since exists() looked.
+    """
+    pid = ids.allocate()
+    inserted = insert_new_contribution(table, {
+        **location(item),
         'parking_id': pid,
-        'postcode': item['postcode'],
         'address': item['address'],
         'suburb': item['suburb'],
         'type': item['type'],
         'created_at': datetime.now().isoformat(),
     })
+    if not inserted:
+        ids.release(pid)
+        return None
     return pid
 
 
@@ -89,16 +88,13 @@ def main() -> None:
 
     region = 'ap-southeast-2'
     client = boto3.client('dynamodb', region_name=region)
-    table_name = 'user_contributions'
+    table_name = DEFAULT_CONTRIBUTIONS_TABLE
     ddb = boto3.resource('dynamodb', region_name=region)
     table = ddb.Table(table_name)
 
     rows = list(read_rows(args.csv))
     to_insert = []
 
-    if args.apply:
-        ensure_counter_item(table)
-
     for r in rows:
         if exists(table, r):
             continue
@@ -110,12 +106,16 @@ def main() -> None:
         print('Dry-run only. Use --apply to insert.')
         return
 
-    inserted = 0
+    # Lease ids in large blocks so a bulk upload only touches the counter a handful of times
+    ids = ParkingIdAllocator(table, PersistentDatabase.COUNTER_KEY, block_size=1000)
+    inserted = skipped = 0
     for item in to_insert:
-        put_item(table, item)
-        inserted += 1
+        if put_item(table, ids, item) is None:
+            skipped += 1
+        else:
+            inserted += 1
 
-    print(f"Inserted {inserted} items into {table_name}.")
+    print(f"Inserted {inserted} items into {table_name}, {skipped} already existed. Id leases: {ids.stats()}")
 
 
 if __name__ == '__main__':
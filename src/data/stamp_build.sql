@@ -0,0 +1,31 @@
+-- Stamps the finished database with an id derived from its contents, read by the API at startup
+-- to version its HTTP caching (ETags). Run last, by the sqlite3 shell, whose sha3_query() hashes
+-- the result of every statement it's given. The same inputs always give the same build_id, so an
+-- unchanged rebuild doesn't invalidate anyone's cache.
+CREATE TABLE build_info (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+
+INSERT INTO build_info (key, value)
+SELECT 'build_id', lower(substr(hex(sha3_query('
+    SELECT sql FROM sqlite_schema WHERE name != ''build_info'' ORDER BY name;
+    SELECT * FROM postcode_risk ORDER BY rowid;
+    SELECT * FROM lga_risk ORDER BY rowid;
+    SELECT * FROM model_risk ORDER BY rowid;
+    SELECT * FROM default_risk ORDER BY rowid;
+    SELECT * FROM postcode_yearly_thefts ORDER BY rowid;
+    SELECT * FROM victorian_addresses ORDER BY rowid;
+    SELECT * FROM facilities ORDER BY facility_id;
+', 256)), 1, 16));
+
+INSERT INTO build_info (key, value) VALUES ('built_at', strftime('%Y-%m-%dT%H:%M:%SZ', 'now'));
+
+-- The counts behind /v1/statistics/summary that can only change with a rebuild, so the API never
+-- has to count victorian_addresses itself
+INSERT INTO build_info (key, value)
+SELECT 'total_postcodes', COUNT(DISTINCT postcode) FROM postcode_risk
+UNION ALL
+SELECT 'total_addresses', COUNT(*) FROM victorian_addresses
+UNION ALL
+SELECT 'total_lgas', COUNT(*) FROM lga_risk;